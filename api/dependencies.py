@@ -1,28 +1,26 @@
-from src.slotbot.crew import CalendarBookingCrew
-from typing import Dict, Any
-import uuid
+from typing import Optional
 
-# In-memory store for session state (for demonstration)
-# In a production app, this would be a database or cache
-session_store: Dict[str, Any] = {}
+from api.session_store import get_session_store
+from src.slotbot.models import ConversationState
 
-def get_crew_instance(session_id: str) -> CalendarBookingCrew:
+
+def get_conversation(session_id: str) -> Optional[ConversationState]:
+    """
+    Loads the stored conversation state for a session.
+    Returns None if the session is unknown or has expired.
+    """
+    return get_session_store().get(session_id)
+
+
+def save_conversation(session_id: str, conversation: ConversationState) -> None:
     """
-    Retrieves or creates a CalendarBookingCrew instance for a given session ID.
+    Writes a session's conversation state back to the store after a turn.
     """
-    if session_id not in session_store:
-        # Initialize a new crew instance for the session
-        # Note: The crew's internal state (like _session_state_output)
-        # will be managed per instance. For a true multi-user/multi-session
-        # scenario, more robust state management might be needed.
-        session_store[session_id] = {"crew": CalendarBookingCrew()}
-    return session_store[session_id]["crew"]
+    get_session_store().save(session_id, conversation)
+
 
 def create_new_session() -> str:
     """
     Generates a new unique session ID.
     """
-    session_id = str(uuid.uuid4())
-    # Initialize the crew instance for this new session
-    session_store[session_id] = {"crew": CalendarBookingCrew()}
-    return session_id
+    return get_session_store().create()
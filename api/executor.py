@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from src.slotbot.settings import get_settings
+
+
+class ExecutorSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class CrewExecutor:
+    """
+    Runs blocking crew kickoffs off the event loop on a bounded thread pool.
+
+    At most `max_workers` turns run at once and at most `max_queue` more wait for a
+    worker; anything beyond that is rejected immediately so the API can answer with a
+    fast 503 instead of piling up requests. Threads (not processes) are used because
+    crew instances hold per-session state that cannot be pickled.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew-worker")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+
+    def _release(self, _future) -> None:
+        self._slots.release()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> "asyncio.Future[Any]":
+        """
+        Queue `fn` on the pool and return an awaitable for its result.
+
+        Raises ExecutorSaturated straight away (before anything is awaited), which lets
+        streaming routes reject a turn before they start sending a response.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorSaturated()
+        try:
+            future = self._pool.submit(partial(fn, *args, **kwargs))
+        except BaseException:
+            self._slots.release()
+            raise
+        # Release the slot when the work finishes, even if the awaiting request was cancelled.
+        future.add_done_callback(self._release)
+        return asyncio.wrap_future(future)
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run `fn` on the pool and await its result, or raise ExecutorSaturated."""
+        return await self.submit(fn, *args, **kwargs)
+
+    def run_on_each_worker(self, fn: Callable[[], Any], timeout: float = 120.0) -> None:
+        """
+        Call `fn` once on each worker thread, e.g. to build per-thread state ahead of traffic.
+
+        One call per worker is queued like a turn, taking a queue slot, so live requests
+        are never pushed past the limit; with every slot taken, fewer (or no) calls are
+        queued. A call runs `fn` only on a thread that has not run it yet, and no call
+        waits for another, so a worker busy with a turn holds up nobody. The calls are
+        queued together, which normally starts a thread for each; per-thread state should
+        still be built lazily on first use for any thread they miss.
+        Raises the first error `fn` raised.
+        """
+        ran = threading.local()
+
+        def once() -> None:
+            if not getattr(ran, 'done', False):
+                ran.done = True
+                fn()
+
+        futures = []
+        for _ in range(self.max_workers):
+            if not self._slots.acquire(blocking=False):
+                break
+            try:
+                future = self._pool.submit(once)
+            except BaseException:
+                self._slots.release()
+                raise
+            future.add_done_callback(self._release)
+            futures.append(future)
+        for future in futures:
+            future.result(timeout)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor: Optional[CrewExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_crew_executor() -> CrewExecutor:
+    """Return the process-wide crew executor, created on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                settings = get_settings()
+                _executor = CrewExecutor(settings.chat_max_workers, settings.chat_max_queue)
+    return _executor
+
+
+def shutdown_crew_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
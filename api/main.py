@@ -1,16 +1,32 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, Any
-from src.slotbot.crew import CalendarBookingCrew
 from datetime import datetime
 import uuid
 
-# In-memory store for session state (for demonstration)
-# In a production app, this would be a database or cache
-session_store: Dict[str, Any] = {}
+from src.slotbot.log import configure_logging
 
-app = FastAPI()
+configure_logging()
+
+# The crew (CrewAI, the Google client) is not imported here: the app starts serving at
+# once and the warm-up loads it in the background. See api/warmup.py.
+from api.executor import shutdown_crew_executor
+from api.warmup import start_warmup
+from src.slotbot.trace import close_trace_sink
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_warmup()
+    yield
+    shutdown_crew_executor()
+    # Flush queued trace records before the process exits.
+    close_trace_sink()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -33,9 +49,15 @@ class ChatResponse(BaseModel):
 # Import routes
 from api.routes.chat import router as chat_router
 from api.routes.health import router as health_router
+from api.routes.availability import router as availability_router
+from api.routes.bookings import router as bookings_router
+from api.routes.metrics import router as metrics_router
 
 app.include_router(chat_router)
 app.include_router(health_router)
+app.include_router(availability_router)
+app.include_router(bookings_router)
+app.include_router(metrics_router)
 
 # Add a root endpoint for basic check
 @app.get("/")
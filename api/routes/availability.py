@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException
+from datetime import time, timedelta
+import logging
+
+from api.schemas import FreeSlotsRequest, FreeSlotsResponse, FreeSlot
+from src.slotbot.clinicians import UnknownClinicianError, get_clinician_registry
+from src.slotbot.tools.slot_search import MAX_SEARCH_DAYS, search_free_slots
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.post("/availability/free_slots", response_model=FreeSlotsResponse)
+def find_free_slots(request: FreeSlotsRequest):
+    """
+    Returns the first free slots in a window, across every clinician (or the one asked
+    for), using a single calendar lookup. Naive datetimes are clinic-local: each
+    clinician's own time zone.
+    Declared sync so FastAPI runs the blocking Google call in its threadpool.
+    """
+    try:
+        clinicians = get_clinician_registry().select(request.clinician)
+    except UnknownClinicianError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    window_start = request.window_start
+    window_end = request.window_end
+    length = clinicians[0].localize(window_end) - clinicians[0].localize(window_start)
+    if length <= timedelta(0):
+        raise HTTPException(status_code=422, detail="window_end must be after window_start.")
+    if length > timedelta(days=MAX_SEARCH_DAYS):
+        raise HTTPException(status_code=422, detail=f"At most {MAX_SEARCH_DAYS} days per search.")
+
+    working_hours = None
+    if request.working_hours_start or request.working_hours_end:
+        working_hours = (
+            request.working_hours_start or time(0),
+            request.working_hours_end or time(0),
+        )
+
+    try:
+        slots = search_free_slots(
+            clinicians, window_start, window_end,
+            duration=timedelta(minutes=request.duration_minutes),
+            granularity=timedelta(minutes=request.granularity_minutes),
+            working_hours=working_hours,
+            weekdays=request.weekdays,
+            limit=request.max_results,
+        )
+    except Exception as e:
+        logger.exception("Error during free slot search")
+        raise HTTPException(status_code=502, detail=f"Calendar lookup failed: {e}")
+
+    return FreeSlotsResponse(slots=[FreeSlot(start=start, end=end, clinician=clinician.id)
+                                    for start, end, clinician in slots])
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, HTTPException
+from datetime import timedelta
+import logging
+
+from api.schemas import BulkBookingItem, BulkBookingRequest, BulkBookingResponse
+from src.slotbot.bulk_booking import MAX_OCCURRENCES, book_series, expand_recurrence
+from src.slotbot.clinicians import get_clinician_registry
+from src.slotbot.tools.slot_search import choose_clinician
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.post("/bookings/bulk", response_model=BulkBookingResponse)
+def bulk_book(request: BulkBookingRequest):
+    """
+    Books a list of slots or a recurring series with one free/busy lookup and one
+    batched insert, reporting the outcome of every slot. The whole series goes to one
+    clinician: the one asked for, or whoever is free for most of it. Naive datetimes are
+    clinic-local: the clinician's own time zone.
+    Declared sync so FastAPI runs the blocking calendar calls in its threadpool.
+    """
+    try:
+        candidates = get_clinician_registry().select(request.clinician)
+        if request.starts:
+            starts = list(request.starts)
+        elif request.first_start and request.recurrence:
+            first = request.first_start
+            if first.tzinfo is None:
+                # Expand in wall-clock time, placed in the chosen clinician's zone below.
+                starts = [s.replace(tzinfo=None)
+                          for s in expand_recurrence(candidates[0].localize(first), request.recurrence)]
+            else:
+                starts = expand_recurrence(first, request.recurrence)
+        else:
+            raise HTTPException(status_code=422, detail="Send either starts or first_start with recurrence.")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if len(starts) > MAX_OCCURRENCES:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_OCCURRENCES} slots per request.")
+    duration = timedelta(minutes=request.duration_minutes)
+
+    try:
+        # A re-sent series goes back to the clinician that took it the first time.
+        requester = request.session_id or request.patient_email.lower()
+        clinician = choose_clinician(candidates, starts, duration, requester=requester)
+        items = book_series(
+            [clinician.localize(s) for s in starts], duration, request.patient_email,
+            notes=request.notes, requester=requester, clinician=clinician,
+        )
+    except Exception as e:
+        logger.exception("Error during bulk booking")
+        raise HTTPException(status_code=502, detail=f"Calendar booking failed: {e}")
+
+    response_items = [
+        BulkBookingItem(
+            start=item.start, end=item.end, status=item.result.status,
+            event_id=item.result.event.get('id') if item.result.event else None,
+            html_link=item.result.event.get('htmlLink') if item.result.event else None,
+            error=item.result.error,
+        )
+        for item in items
+    ]
+    return BulkBookingResponse(
+        booked=sum(item.status == 'booked' for item in response_items),
+        items=response_items,
+        clinician=clinician.id,
+    )
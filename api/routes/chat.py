@@ -1,23 +1,109 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any
 from datetime import datetime
-import uuid
+import asyncio
+import json
+import logging
+import math
 
 from api.schemas import ChatRequest, ChatResponse
-from src.slotbot.crew import CalendarBookingCrew
-from api.dependencies import get_crew_instance, session_store # Import session_store if needed directly
+from api.dependencies import create_new_session, get_conversation, save_conversation
+from api.executor import ExecutorSaturated, get_crew_executor
+from src.slotbot.llm_gateway import LLMUnavailable
+from src.slotbot.settings import get_settings
+from src.slotbot.turn_context import TurnContext
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def run_turn(inputs: dict, context: TurnContext):
+    """
+    Run one turn on the calling worker thread.
+
+    The pipeline (CrewAI, the Google client) is imported here rather than at startup, so
+    the app serves /health right away; if the warm-up has not loaded it yet, the wait
+    happens on a worker, never on the event loop.
+    """
+    from src.slotbot.crew import run_turn as run_crew_turn
+    return run_crew_turn(inputs, context)
+
+def extract_chatbot_response(crew_result: Any) -> str:
+    """
+    Pulls the user-facing text out of whatever the crew kickoff returned.
+    """
+    chatbot_response = "An error occurred during processing." # Default error message
+
+    # --- Robustly extract chatbot_response ---
+
+    # Check if the result is a TaskOutput object (common in CrewAI)
+    # We need to import TaskOutput or check for its common attributes if not directly importable.
+    # Let's assume TaskOutput has a 'raw' attribute for the string output.
+    # If TaskOutput is not directly importable, you might need to duck-type it by checking for 'raw'.
+    # For example, check if it has a 'raw' attribute and if that attribute is a string.
+    
+    if hasattr(crew_result, 'raw') and isinstance(crew_result.raw, str):
+        # This covers cases where kickoff returns a TaskOutput object
+        chatbot_response = crew_result.raw
+        logger.debug("Extracted response from TaskOutput.raw: %s", chatbot_response)
+    elif isinstance(crew_result, str):
+        # If the result is directly a string
+        chatbot_response = crew_result
+        logger.debug("Crew result is a string: %s", chatbot_response)
+    elif isinstance(crew_result, dict):
+        # If the result is a dictionary, try to find the response.
+        # The 'format_user_response' task description implies it returns a friendly message,
+        # which might be directly in a dict key or the dict itself.
+        if 'response' in crew_result:
+            chatbot_response = crew_result['response']
+            logger.debug("Extracted response from dict['response']: %s", chatbot_response)
+        elif 'chatbot_response' in crew_result: # Another common key
+            chatbot_response = crew_result['chatbot_response']
+            logger.debug("Extracted response from dict['chatbot_response']: %s", chatbot_response)
+        else:
+            # If it's a dict but doesn't contain a recognized response key,
+            # try to stringify it, or assume it's an error.
+            # The Crew Completion message you showed is a string that might be formatted.
+            # If the whole dict represents the output, converting it to string might be an option.
+            chatbot_response = str(crew_result) # Attempt to stringify the whole dictionary
+            logger.debug("Crew result is a dict, but no known keys found. Stringified result: %s", chatbot_response)
+    elif hasattr(crew_result, 'dict') and callable(crew_result.dict):
+        # This might be relevant if CrewOutput has a method to get its dict representation
+        dict_representation = crew_result.dict()
+        if 'response' in dict_representation:
+             chatbot_response = dict_representation['response']
+             logger.debug("Extracted response from CrewOutput.dict()['response']: %s", chatbot_response)
+        elif 'chatbot_response' in dict_representation:
+             chatbot_response = dict_representation['chatbot_response']
+             logger.debug("Extracted response from CrewOutput.dict()['chatbot_response']: %s", chatbot_response)
+        else:
+             # If it's a dict-like object but doesn't have known keys, stringify it.
+             chatbot_response = str(dict_representation)
+             logger.debug("CrewOutput.dict() has no known keys. Stringified: %s", chatbot_response)
+    else:
+        # Fallback for any other unexpected format, including the literal 'CrewOutput' object
+        # If it's an object that doesn't have 'raw', 'get', or dict-like methods,
+        # we can try to get its string representation.
+        chatbot_response = str(crew_result)
+        logger.debug("Unexpected crew result type: %s. Stringified: %s", type(crew_result), chatbot_response)
+
+
+    # Ensure the response is always a string
+    if not isinstance(chatbot_response, str):
+        chatbot_response = str(chatbot_response)
+    return chatbot_response
+
 
 @router.post("/start_chat", response_model=Dict[str, str])
 async def start_chat():
     """
     Starts a new chat session and returns a session ID.
+    The session store is SQLite, so it is called on the threadpool, not the event loop.
     """
-    session_id = str(uuid.uuid4())
-    # Initialize the crew instance for this new session and store it
-    session_store[session_id] = {"crew": CalendarBookingCrew()}
+    session_id = await run_in_threadpool(create_new_session)
     return {"session_id": session_id, "message": "Welcome to SlotBot! How can I help you today?"}
 
 @router.post("/chat", response_model=ChatResponse)
@@ -29,87 +115,126 @@ async def handle_chat(request: ChatRequest):
     session_id = request.session_id
     user_message = request.user_message
 
-    if session_id not in session_store:
+    conversation = await run_in_threadpool(get_conversation, session_id)
+    if conversation is None:
         raise HTTPException(status_code=404, detail="Session not found. Please start a new chat.")
 
-    crew_instance = session_store[session_id]["crew"]
-
     # Prepare inputs for the crew
     inputs = {
         'user_message': user_message,
         'current_date': datetime.now().isoformat()
     }
+    if request.locale:
+        inputs['locale'] = request.locale
 
     try:
-        # Execute the crew's workflow
+        # Execute the crew's workflow on the worker pool so the event loop stays free.
         # The kickoff method returns the output of the final task.
         # This output can be a TaskOutput object, a CrewOutput object, a string, or a dictionary.
-        crew_result = crew_instance.crew().kickoff(inputs=inputs)
-        
-        chatbot_response = "An error occurred during processing." # Default error message
-
-        # --- Robustly extract chatbot_response ---
-
-        # Check if the result is a TaskOutput object (common in CrewAI)
-        # We need to import TaskOutput or check for its common attributes if not directly importable.
-        # Let's assume TaskOutput has a 'raw' attribute for the string output.
-        # If TaskOutput is not directly importable, you might need to duck-type it by checking for 'raw'.
-        # For example, check if it has a 'raw' attribute and if that attribute is a string.
-        
-        if hasattr(crew_result, 'raw') and isinstance(crew_result.raw, str):
-            # This covers cases where kickoff returns a TaskOutput object
-            chatbot_response = crew_result.raw
-            print(f"DEBUG: Extracted response from TaskOutput.raw: {chatbot_response}")
-        elif isinstance(crew_result, str):
-            # If the result is directly a string
-            chatbot_response = crew_result
-            print(f"DEBUG: Crew result is a string: {chatbot_response}")
-        elif isinstance(crew_result, dict):
-            # If the result is a dictionary, try to find the response.
-            # The 'format_user_response' task description implies it returns a friendly message,
-            # which might be directly in a dict key or the dict itself.
-            if 'response' in crew_result:
-                chatbot_response = crew_result['response']
-                print(f"DEBUG: Extracted response from dict['response']: {chatbot_response}")
-            elif 'chatbot_response' in crew_result: # Another common key
-                chatbot_response = crew_result['chatbot_response']
-                print(f"DEBUG: Extracted response from dict['chatbot_response']: {chatbot_response}")
-            else:
-                # If it's a dict but doesn't contain a recognized response key,
-                # try to stringify it, or assume it's an error.
-                # The Crew Completion message you showed is a string that might be formatted.
-                # If the whole dict represents the output, converting it to string might be an option.
-                chatbot_response = str(crew_result) # Attempt to stringify the whole dictionary
-                print(f"DEBUG: Crew result is a dict, but no known keys found. Stringified result: {chatbot_response}")
-        elif hasattr(crew_result, 'dict') and callable(crew_result.dict):
-            # This might be relevant if CrewOutput has a method to get its dict representation
-            dict_representation = crew_result.dict()
-            if 'response' in dict_representation:
-                 chatbot_response = dict_representation['response']
-                 print(f"DEBUG: Extracted response from CrewOutput.dict()['response']: {chatbot_response}")
-            elif 'chatbot_response' in dict_representation:
-                 chatbot_response = dict_representation['chatbot_response']
-                 print(f"DEBUG: Extracted response from CrewOutput.dict()['chatbot_response']: {chatbot_response}")
-            else:
-                 # If it's a dict-like object but doesn't have known keys, stringify it.
-                 chatbot_response = str(dict_representation)
-                 print(f"DEBUG: CrewOutput.dict() has no known keys. Stringified: {chatbot_response}")
-        else:
-            # Fallback for any other unexpected format, including the literal 'CrewOutput' object
-            # If it's an object that doesn't have 'raw', 'get', or dict-like methods,
-            # we can try to get its string representation.
-            chatbot_response = str(crew_result)
-            print(f"DEBUG: Unexpected crew result type: {type(crew_result)}. Stringified: {chatbot_response}")
-
+        # Turns run on the worker's precompiled crew; only the per-turn context is new.
+        context = TurnContext(conversation=conversation, session_id=session_id)
+        crew_result = await get_crew_executor().run(run_turn, inputs, context)
+        await run_in_threadpool(save_conversation, session_id, context.conversation)
 
-        # Ensure the response is always a string
-        if not isinstance(chatbot_response, str):
-            chatbot_response = str(chatbot_response)
+        chatbot_response = extract_chatbot_response(crew_result)
 
         return ChatResponse(session_id=session_id, chatbot_response=chatbot_response)
 
+    except ExecutorSaturated:
+        retry_after = get_settings().chat_retry_after_seconds
+        logger.warning("Chat pool saturated; rejecting turn for session %s", session_id)
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy. Please retry shortly.",
+            headers={"Retry-After": str(retry_after)},
+        )
+    except LLMUnavailable as e:
+        # Out of model quota (or the provider kept failing): a retryable 503, not a server error.
+        logger.warning("LLM unavailable for session %s: %s", session_id, e)
+        raise HTTPException(
+            status_code=503,
+            detail="The assistant is busy. Please retry shortly.",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
     except Exception as e:
-        import traceback
-        print(f"Error during chat processing for session {session_id}: {e}")
-        traceback.print_exc() # Print the full traceback
-        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
\ No newline at end of file
+        logger.exception("Error during chat processing for session %s", session_id)
+        raise HTTPException(status_code=500, detail=f"Internal server error: {e}")
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def handle_chat_stream(request: ChatRequest):
+    """
+    Same turn as /chat, streamed as server-sent events.
+
+    Stage events ('parsed', 'routed', 'calendar_checked' or 'info_requested') arrive as
+    each stage finishes, then one 'token' event per chunk of the final response, and a
+    closing 'done' event carrying the full reply (or 'error' if the turn failed).
+    """
+    session_id = request.session_id
+
+    conversation = await run_in_threadpool(get_conversation, session_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Session not found. Please start a new chat.")
+    inputs = {
+        'user_message': request.user_message,
+        'current_date': datetime.now().isoformat()
+    }
+    if request.locale:
+        inputs['locale'] = request.locale
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_event(event: str, data: Dict[str, Any]) -> None:
+        # Called from the worker thread; hand the event over to the event loop.
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    context = TurnContext(conversation=conversation, session_id=session_id, on_event=on_event)
+    try:
+        turn = get_crew_executor().submit(run_turn, inputs, context)
+    except ExecutorSaturated:
+        retry_after = get_settings().chat_retry_after_seconds
+        logger.warning("Chat pool saturated; rejecting streamed turn for session %s", session_id)
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy. Please retry shortly.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    async def event_stream():
+        while True:
+            next_event = asyncio.ensure_future(events.get())
+            done, _ = await asyncio.wait({next_event, turn}, return_when=asyncio.FIRST_COMPLETED)
+            if next_event not in done:
+                next_event.cancel()
+                break
+            yield _sse(*next_event.result())
+
+        # The turn has finished; flush anything emitted just before it returned.
+        while not events.empty():
+            yield _sse(*events.get_nowait())
+
+        try:
+            crew_result = turn.result()
+            await run_in_threadpool(save_conversation, session_id, context.conversation)
+        except LLMUnavailable as e:
+            logger.warning("LLM unavailable for streamed turn of session %s: %s", session_id, e)
+            yield _sse("error", {"detail": "The assistant is busy. Please retry shortly.",
+                                 "retry_after": max(1, math.ceil(e.retry_after))})
+            return
+        except Exception as e:
+            logger.exception("Error during streamed chat processing for session %s", session_id)
+            yield _sse("error", {"detail": f"Internal server error: {e}"})
+            return
+        yield _sse("done", {"session_id": session_id, "chatbot_response": extract_chatbot_response(crew_result)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,4 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from api.warmup import get_warmup
+from src.slotbot.parse_cache import get_parse_cache
 
 router = APIRouter()
 
@@ -8,3 +12,32 @@ async def health_check():
     Basic health check endpoint.
     """
     return {"status": "ok"}
+
+@router.get("/health/live")
+async def liveness():
+    """
+    Liveness: the process is up and its event loop is serving requests.
+    """
+    return {"status": "ok"}
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    Readiness: 200 once the startup warm-up has loaded the pipeline and compiled the
+    crews, 503 while it is still running or if a required step failed.
+    """
+    warmup = get_warmup()
+    status = warmup.status()
+    if not warmup.ready:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+@router.get("/health/parse_cache")
+async def parse_cache_stats():
+    """
+    Hit, miss, eviction and expiry counters of the parse cache.
+    """
+    cache = get_parse_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+
+from src.slotbot.metrics import render
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Stage latency, LLM call, tool call and Calendar request metrics in Prometheus text format.
+    """
+    return Response(content=render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,10 +1,12 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field
+from typing import Annotated, List, Optional, Dict, Any
+from datetime import datetime, time
 
 class ChatRequest(BaseModel):
     session_id: str
     user_message: str
+    # Language of templated replies, e.g. 'en' or 'ms'; the server default when unset.
+    locale: Optional[str] = None
 
 class ChatResponse(BaseModel):
     session_id: str
@@ -28,3 +30,56 @@ class ChatResponse(BaseModel):
 #     end_time: Optional[datetime] = None
 #     temporal_expression: Optional[str] = None
 #     missing_info: List[str] = []
+
+class FreeSlotsRequest(BaseModel):
+    window_start: datetime
+    window_end: datetime
+    duration_minutes: int = Field(60, gt=0)
+    granularity_minutes: int = Field(30, gt=0)
+    # Local working hours, e.g. 09:00-17:00; omit for the whole window.
+    working_hours_start: Optional[time] = None
+    working_hours_end: Optional[time] = None
+    # Monday=0 ... Sunday=6; omit for every day.
+    weekdays: Optional[List[Annotated[int, Field(ge=0, le=6)]]] = None
+    max_results: int = Field(5, gt=0, le=100)
+    # Clinician id or name; omit for the earliest slots with any clinician.
+    clinician: Optional[str] = None
+
+class FreeSlot(BaseModel):
+    start: datetime
+    end: datetime
+    # Id of the clinician who is free.
+    clinician: Optional[str] = None
+
+class FreeSlotsResponse(BaseModel):
+    slots: List[FreeSlot]
+
+class BulkBookingRequest(BaseModel):
+    patient_email: EmailStr
+    duration_minutes: int = Field(60, gt=0)
+    notes: Optional[str] = None
+    # Either explicit start times ...
+    starts: Optional[List[datetime]] = None
+    # ... or a first start plus an RRULE such as "FREQ=WEEKLY;COUNT=8".
+    first_start: Optional[datetime] = None
+    recurrence: Optional[str] = None
+    # Chat session (or any client key) the bookings belong to; re-sending the same
+    # request with the same key only books what is still missing.
+    session_id: Optional[str] = None
+    # Clinician id or name; omit to book whichever clinician is free for most of the series.
+    clinician: Optional[str] = None
+
+class BulkBookingItem(BaseModel):
+    start: datetime
+    end: datetime
+    # booked | duplicate | conflict | failed
+    status: str
+    event_id: Optional[str] = None
+    html_link: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkBookingResponse(BaseModel):
+    booked: int
+    items: List[BulkBookingItem]
+    # Id of the clinician the series was booked with.
+    clinician: Optional[str] = None
@@ -0,0 +1,184 @@
+"""
+Session stores for the chat API.
+
+A session is persisted as its serialized `ConversationState`, never as a live
+`CalendarBookingCrew`; each turn rebuilds a crew from the stored state and writes the
+updated state back. Two backends are provided:
+
+- `InMemorySessionStore`: per-process, LRU-bounded with a TTL. Fine for a single worker.
+- `SQLiteSessionStore`: a SQLite file shared by every worker on the host, which also
+  survives restarts.
+"""
+
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from src.slotbot.models import ConversationState
+from src.slotbot.settings import get_settings
+
+
+class SessionStore(ABC):
+    """Maps session ids to serialized conversation state, expiring idle sessions."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+
+    def create(self) -> str:
+        """Start a new, empty session and return its id."""
+        session_id = str(uuid.uuid4())
+        self.save(session_id, ConversationState())
+        return session_id
+
+    def get(self, session_id: str) -> Optional[ConversationState]:
+        """Return the session's state, or None if it is unknown or has expired."""
+        payload = self._load(session_id)
+        return None if payload is None else ConversationState.model_validate_json(payload)
+
+    def save(self, session_id: str, state: ConversationState) -> None:
+        """Store the session's state and reset its idle timer."""
+        self._store(session_id, state.model_dump_json(exclude_defaults=True))
+
+    def __contains__(self, session_id: str) -> bool:
+        return self._load(session_id) is not None
+
+    @abstractmethod
+    def _load(self, session_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def _store(self, session_id: str, payload: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store: least recently used sessions are dropped past `max_sessions`."""
+
+    def __init__(self, ttl_seconds: float = 3600.0, max_sessions: int = 10000):
+        super().__init__(ttl_seconds)
+        self.max_sessions = max_sessions
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            saved_at, payload = entry
+            if time.monotonic() - saved_at > self.ttl_seconds:
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return payload
+
+    def _store(self, session_id: str, payload: str) -> None:
+        with self._lock:
+            self._entries[session_id] = (time.monotonic(), payload)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed store shared by all worker processes on the host.
+
+    The database runs in WAL mode so readers in one worker don't block writers in
+    another. Expired rows are ignored on read and purged now and then on write.
+    """
+
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str, ttl_seconds: float = 3600.0):
+        super().__init__(ttl_seconds)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " state TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads; keep one per worker thread.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, session_id: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT state FROM sessions WHERE session_id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.ttl_seconds),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _store(self, session_id: str, payload: str) -> None:
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                (session_id, payload, now),
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+
+    def delete(self, session_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM sessions WHERE updated_at >= ?",
+            (time.time() - self.ttl_seconds,),
+        ).fetchone()
+        return row[0]
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Return the process-wide session store selected by `SLOTBOT_SESSION_STORE`."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                settings = get_settings()
+                if settings.session_store == 'sqlite':
+                    _store = SQLiteSessionStore(settings.session_db_path, ttl_seconds=settings.session_ttl_seconds)
+                else:
+                    _store = InMemorySessionStore(ttl_seconds=settings.session_ttl_seconds,
+                                                  max_sessions=settings.session_max_entries)
+    return _store
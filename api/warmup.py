@@ -0,0 +1,145 @@
+"""
+Startup warm-up, run in the background from the app's lifespan.
+
+The app imports only what it needs to route requests, so it answers `/health/live`
+as soon as uvicorn is up. The warm-up then loads the pipeline (CrewAI, the Google
+client), compiles a crew on every chat worker thread, and builds the Calendar
+client and the session and parse-cache stores, so the first `/chat` does not pay for
+them. `/health/ready` turns ready once the required steps have finished.
+
+A failed optional step (the Calendar client) is logged and left to happen on first
+use; a failed required step leaves the instance not ready.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from src.slotbot.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    run: Callable[[], None]
+    # A failed required step keeps the instance not ready.
+    required: bool = True
+
+
+class Warmup:
+    """Runs its steps once, in order, on a daemon thread, and reports progress."""
+
+    def __init__(self, steps: List[WarmupStep]):
+        self.steps = steps
+        self.state = 'pending'  # then 'running', and 'ready' or 'failed'
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == 'ready'
+
+    def start(self) -> None:
+        if self._thread is None:
+            self.state = 'running'
+            self._thread = threading.Thread(target=self.run, name='warmup', daemon=True)
+            self._thread.start()
+
+    def run(self) -> None:
+        self.state = 'running'
+        failed = False
+        for step in self.steps:
+            started = time.perf_counter()
+            try:
+                step.run()
+            except Exception as e:
+                logger.warning("Warm-up step %s failed: %s", step.name, e)
+                self.errors[step.name] = str(e)
+                failed = failed or step.required
+            finally:
+                self.timings[step.name] = time.perf_counter() - started
+        self.state = 'failed' if failed else 'ready'
+        logger.info("Warm-up %s in %.2fs", self.state, sum(self.timings.values()))
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the warm-up has finished; True if it did within `timeout`."""
+        return self._done.wait(timeout)
+
+    def status(self) -> dict:
+        return {
+            'state': self.state,
+            'timings': {name: round(seconds, 3) for name, seconds in self.timings.items()},
+            'errors': dict(self.errors),
+        }
+
+
+def _load_pipeline() -> None:
+    from src.slotbot import crew  # noqa: F401  (CrewAI, the tools and the Google client)
+    if get_settings().engine == 'compact':
+        from src.slotbot import compact  # noqa: F401
+
+
+def _compile_crews() -> None:
+    from api.executor import get_crew_executor
+    from src.slotbot.crew import get_compiled_crew
+    get_crew_executor().run_on_each_worker(get_compiled_crew)
+
+
+def _build_calendar() -> None:
+    from src.slotbot.calendar_backend import get_calendar_backend
+    from src.slotbot.google_api import Oauth_client
+
+    if get_settings().calendar_backend == 'google':
+        # Without a saved token the client would start the interactive consent flow.
+        if not os.path.exists(Oauth_client.TOKEN_FILE):
+            raise RuntimeError(f"{Oauth_client.TOKEN_FILE} not found; the Calendar client is built on first use")
+        Oauth_client.get_calendar_client()
+    get_calendar_backend()
+
+
+def _open_stores() -> None:
+    from api.session_store import get_session_store
+    from src.slotbot.parse_cache import get_parse_cache
+    get_session_store()
+    get_parse_cache()
+
+
+def default_steps() -> List[WarmupStep]:
+    return [
+        WarmupStep('stores', _open_stores),
+        WarmupStep('pipeline', _load_pipeline),
+        WarmupStep('crews', _compile_crews),
+        WarmupStep('calendar', _build_calendar, required=False),
+    ]
+
+
+_warmup: Optional[Warmup] = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> Warmup:
+    """Return the process-wide warm-up; with `SLOTBOT_WARMUP=0` it has no steps (ready at once)."""
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = Warmup(default_steps() if get_settings().warmup_enabled else [])
+    return _warmup
+
+
+def start_warmup() -> Warmup:
+    """Start the warm-up in the background (once) and return it."""
+    warmup = get_warmup()
+    if warmup.steps:
+        warmup.start()
+    else:
+        warmup.run()
+    return warmup
@@ -0,0 +1,162 @@
+"""
+End-to-end `/chat` throughput and latency, fully offline.
+
+Drives the FastAPI app in-process (httpx over ASGI) with a scripted LLM and an
+in-memory calendar from `benchmarks.fakes`, so numbers are repeatable and cost
+nothing. Each virtual user opens a session and cycles through the scripted
+scenarios; `--concurrency` users run at once until `--turns` turns are done.
+
+Reports requests/s, p50/p95/p99 turn latency, rejected (503) and failed turns and
+peak RSS, and appends the result to a JSONL history (one line per run, tagged with
+the git revision) so regressions between versions show up as a diff against the
+previous run with the same parameters.
+
+    python -m benchmarks.chat_load --turns 200 --concurrency 8 --llm-latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Before crewai is imported: no telemetry round-trips inside the measurements.
+os.environ.setdefault('OTEL_SDK_DISABLED', 'true')
+os.environ.setdefault('CREWAI_DISABLE_TELEMETRY', 'true')
+
+import httpx
+
+from benchmarks.fakes import SCENARIOS, install_fakes
+
+DEFAULT_HISTORY = os.path.join('benchmarks', 'results', 'chat_load.jsonl')
+COMPARED = ('requests_per_second', 'p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mib')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def _user(client: httpx.AsyncClient, turns: List[int], latencies: List[float],
+                statuses: Dict[int, int]) -> None:
+    session_id = (await client.post('/start_chat')).json()['session_id']
+    step = 0
+    while turns[0] > 0:
+        turns[0] -= 1
+        message = SCENARIOS[step % len(SCENARIOS)].message
+        step += 1
+        started = time.perf_counter()
+        response = await client.post('/chat', json={'session_id': session_id, 'user_message': message})
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def run_load(turns: int, concurrency: int) -> Dict[str, object]:
+    from api.main import app
+
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = [turns]
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+        # A warm-up round so crew compilation on the worker threads is not measured.
+        await asyncio.gather(*(_user(client, [1], [], {}) for _ in range(concurrency)))
+        started = time.perf_counter()
+        await asyncio.gather(*(_user(client, remaining, latencies, statuses) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        'turns': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'rejected': statuses.get(503, 0),
+        'failed': sum(n for status, n in statuses.items() if status not in (200, 503)),
+        # ru_maxrss is KiB on Linux.
+        'peak_rss_mib': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def _previous(history: str, params: Dict[str, object]) -> Optional[Dict[str, object]]:
+    if not os.path.exists(history):
+        return None
+    last = None
+    with open(history, encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry.get('params') == params:
+                last = entry
+    return last
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--turns', type=int, default=120, help='measured /chat turns')
+    parser.add_argument('--concurrency', type=int, default=4, help='simultaneous sessions')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='seconds per scripted LLM call')
+    parser.add_argument('--calendar-latency', type=float, default=0.0, help='seconds per fake Calendar request')
+    parser.add_argument('--calendar', choices=('google', 'sqlite'), default='google',
+                        help='fake Google service, or a throwaway local SQLite calendar')
+    parser.add_argument('--engine', choices=('crew', 'compact'), default='crew',
+                        help='turn engine to measure (SLOTBOT_ENGINE)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSONL file results are appended to')
+    parser.add_argument('--label', default='', help='free-form note stored with the result')
+    args = parser.parse_args(argv)
+
+    params = {
+        'turns': args.turns, 'concurrency': args.concurrency, 'calendar': args.calendar, 'engine': args.engine,
+        'llm_latency': args.llm_latency, 'calendar_latency': args.calendar_latency,
+    }
+    os.environ['SLOTBOT_ENGINE'] = args.engine
+    with tempfile.TemporaryDirectory() as tmp:
+        calendar_db = os.path.join(tmp, 'calendar.db') if args.calendar == 'sqlite' else None
+        install_fakes(llm_latency=args.llm_latency, calendar_latency=args.calendar_latency,
+                      calendar_db=calendar_db)
+        result = asyncio.run(run_load(args.turns, args.concurrency))
+
+    previous = _previous(args.history, params)
+    entry = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'label': args.label,
+        'params': params,
+        **result,
+    }
+    os.makedirs(os.path.dirname(args.history) or '.', exist_ok=True)
+    with open(args.history, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
+
+    print(f"{result['turns']} turns at concurrency {args.concurrency} in {result['elapsed_s']} s "
+          f"({result['rejected']} rejected, {result['failed']} failed)")
+    for key in COMPARED:
+        line = f"{key:<22} {result[key]:>10}"
+        if previous is not None and previous.get(key):
+            change = (result[key] - previous[key]) / previous[key] * 100
+            line += f"   {change:+6.1f}% vs {previous.get('revision') or 'previous run'}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
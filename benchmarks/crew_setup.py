@@ -0,0 +1,58 @@
+"""
+Per-turn crew setup cost: building a crew per turn vs. reusing the compiled crew.
+
+No LLM or Calendar calls are made; this times only the work done before the first
+task runs (YAML loading, agent/tool/task construction, per-route Crew assembly).
+
+    python -m benchmarks.crew_setup [turns]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from src.slotbot.crew import CalendarBookingCrew, get_compiled_crew
+
+
+def _route_tasks(crew: CalendarBookingCrew):
+    return [crew.execute_calendar_action(), crew.format_user_response()]
+
+
+def setup_per_turn() -> None:
+    """What every turn paid before: a new crew, its full task graph and a route crew."""
+    crew = CalendarBookingCrew()
+    crew.crew()
+    crew._build_crew(_route_tasks(crew))
+
+
+def setup_compiled() -> None:
+    """What a turn pays now: look up the thread's compiled crew and its cached route crew."""
+    crew = get_compiled_crew()
+    for t in crew.crew().tasks:
+        t.output = None
+    crew._build_crew(_route_tasks(crew))
+
+
+def measure(fn, turns: int):
+    fn()  # warm up imports, provider clients and (for the compiled path) the cache
+    start = time.perf_counter()
+    for _ in range(turns):
+        fn()
+    per_turn_ms = (time.perf_counter() - start) * 1000 / turns
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return per_turn_ms, peak / 1024
+
+
+def main() -> None:
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    for label, fn in (('per-turn construction', setup_per_turn), ('compiled crew', setup_compiled)):
+        ms, kib = measure(fn, turns)
+        print(f"{label:<22} {ms:8.3f} ms/turn   {kib:9.1f} KiB peak allocations")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+"""
+Deterministic stand-ins for Gemini and Google Calendar, for offline benchmarks.
+
+`ScriptedLLM` answers every task of the booking crew from a fixed script: the parse
+task gets the `UserInputParsed` of the matching `Scenario`, the calendar task calls
+the tool its routed action needs and then reports the observation, and the response
+tasks return canned text; the compact engine's single call gets the scenario's parse,
+routing and a canned draft. Each call sleeps for a configurable latency first.
+
+`FakeCalendarService` implements the slice of the Calendar v3 API the Google backend and
+the busy cache use (`events().insert/get/list/delete`, `freebusy().query` and
+`new_batch_http_request()`) in memory.
+`install_fakes()` wires both into the process, or swaps in a throwaway
+`SQLiteCalendarBackend` instead of the fake Google service.
+"""
+
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import httplib2
+from crewai.llms.base_llm import BaseLLM
+from googleapiclient.errors import HttpError
+
+SGT = timezone(timedelta(hours=8))
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """One scripted user message and what the parser should make of it."""
+    message: str
+    intent: str
+    email: Optional[str] = None
+    days_ahead: Optional[int] = None
+    hour: Optional[int] = None
+    temporal_expression: Optional[str] = None
+    missing_info: Tuple[str, ...] = ()
+
+    def parsed(self, today: date) -> Dict[str, Any]:
+        start = end = None
+        if self.days_ahead is not None and self.hour is not None:
+            start = datetime.combine(today + timedelta(days=self.days_ahead), datetime.min.time()).replace(hour=self.hour)
+            end = start + timedelta(hours=1)
+        return {
+            'intent': self.intent,
+            'patient_email': self.email,
+            'start_time': start.isoformat() if start else None,
+            'end_time': end.isoformat() if end else None,
+            'temporal_expression': self.temporal_expression,
+            'missing_info': list(self.missing_info),
+        }
+
+
+# A mix of turns that exercises every route; the first two are left to the LLM parser
+# because the rule-based fast path declines them.
+SCENARIOS: Sequence[Scenario] = (
+    Scenario("hmm is the doc around friday-ish, late in the day maybe?", 'check_availability',
+             temporal_expression='friday late afternoon'),
+    Scenario("could you squeeze me in sometime next week in the evening", 'check_availability',
+             temporal_expression='next week evening'),
+    Scenario("Are you free tomorrow at 3pm?", 'check_availability', days_ahead=1, hour=15),
+    Scenario("Book me in for tomorrow at 10am, my email is bench@example.com", 'book',
+             email='bench@example.com', days_ahead=1, hour=10),
+    Scenario("I'd like to book an appointment the day after tomorrow at 4pm", 'book',
+             days_ahead=2, hour=16, missing_info=('patient_email',)),
+    Scenario("hello there", 'general_query'),
+)
+
+_CONTEXT_RE = re.compile(r"This is the context you're working with:\s*(\{.*?\})\s*(?:\n\n|$)", re.DOTALL)
+
+
+class ScriptedLLM(BaseLLM):
+    """
+    A CrewAI LLM that never leaves the process.
+
+    Replies use CrewAI's text (ReAct) protocol, so agents drive tools exactly as they
+    would with a model that lacks native function calling.
+    """
+
+    latency: float = 0.0
+    scenarios: Sequence[Scenario] = SCENARIOS
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(messages, str):
+            messages = [{'role': 'user', 'content': messages}]
+        prompt = '\n'.join(str(m.get('content', '')) for m in messages)
+        task = getattr(from_task, 'name', None)
+
+        if response_model is not None and response_model.__name__ == 'CompactTurn':
+            return json.dumps(self._compact_turn(prompt))
+
+        if task == 'parse_user_input':
+            return json.dumps(self._parse(prompt))
+        if task == 'execute_calendar_action':
+            replies = [str(m.get('content', '')) for m in messages if m.get('role') == 'assistant']
+            if replies:
+                # CrewAI may append its tool list after the observation; keep only the result line.
+                observation = replies[-1].split('Observation:', 1)[-1].strip().split('\n', 1)[0]
+                return f"Thought: I now know the final answer\nFinal Answer: {observation}"
+            return self._tool_call(prompt)
+        if task == 'collect_missing_information':
+            return "Thought: I now know the final answer\nFinal Answer: Could you please provide your email address?"
+        return "Thought: I now know the final answer\nFinal Answer: Here is the outcome of your request."
+
+    def _parse(self, prompt: str) -> Dict[str, Any]:
+        today = date.today()
+        for scenario in self.scenarios:
+            if scenario.message in prompt:
+                return scenario.parsed(today)
+        return Scenario('', 'general_query').parsed(today)
+
+    def _compact_turn(self, prompt: str) -> Dict[str, Any]:
+        from src.slotbot.models import UserInputParsed
+        from src.slotbot.router import route_session
+
+        parsed = self._parse(prompt)
+        turn = {
+            'parsed': parsed,
+            'session_state': route_session(UserInputParsed(**parsed)).model_dump(),
+            'reply': "Could you please provide your email address?" if parsed['missing_info']
+                     else "Hello! How can I help you with your appointment?",
+        }
+        if parsed['start_time'] is None and parsed['temporal_expression']:
+            tomorrow = date.today() + timedelta(days=1)
+            turn['search_window'] = {'start_date': tomorrow.isoformat(),
+                                     'end_date': (tomorrow + timedelta(days=6)).isoformat(),
+                                     'earliest_time': '17:00', 'latest_time': '21:00'}
+        return turn
+
+    def _tool_call(self, prompt: str) -> str:
+        match = _CONTEXT_RE.search(prompt)
+        parsed = json.loads(match.group(1)) if match else {}
+        start = parsed.get('start_time')
+        if start is None:
+            tomorrow = date.today() + timedelta(days=1)
+            tool, args = 'FindFreeSlotsTool', {
+                'start_date': tomorrow.isoformat(),
+                'end_date': (tomorrow + timedelta(days=6)).isoformat(),
+                'earliest_time': '17:00', 'latest_time': '21:00',
+            }
+        else:
+            start = datetime.fromisoformat(start)
+            args = {'date': start.date().isoformat(), 'time': start.strftime('%H:%M')}
+            if parsed.get('intent') == 'book' and parsed.get('patient_email'):
+                tool = 'BookAppointmentTool'
+                args['patient_email'] = parsed['patient_email']
+            else:
+                tool = 'CheckAvailabilityTool'
+        return f"Thought: I should use {tool}.\nAction: {tool}\nAction Input: {json.dumps(args)}"
+
+
+def _http_error(status: int) -> HttpError:
+    return HttpError(httplib2.Response({'status': status}), b'{}')
+
+
+def _parse_time(value: str, time_zone: Optional[str] = None) -> datetime:
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo:
+        return parsed
+    return parsed.replace(tzinfo=ZoneInfo(time_zone) if time_zone else SGT)
+
+
+class _Request:
+    def __init__(self, service: 'FakeCalendarService', fn, *args):
+        self._service = service
+        self._fn = fn
+        self._args = args
+
+    def execute(self):
+        if self._service.latency:
+            time.sleep(self._service.latency)
+        with self._service.lock:
+            return self._fn(*self._args)
+
+
+class _Events:
+    def __init__(self, service: 'FakeCalendarService'):
+        self._service = service
+
+    def insert(self, calendarId: str, body: dict, **kwargs):
+        return _Request(self._service, self._service._insert, calendarId, dict(body))
+
+    def get(self, calendarId: str, eventId: str, **kwargs):
+        return _Request(self._service, self._service._get, calendarId, eventId)
+
+    def delete(self, calendarId: str, eventId: str, **kwargs):
+        return _Request(self._service, self._service._delete, calendarId, eventId)
+
+    def update(self, calendarId: str, eventId: str, body: dict, **kwargs):
+        return _Request(self._service, self._service._update, calendarId, eventId, dict(body))
+
+    def list(self, calendarId: str, syncToken: Optional[str] = None, **kwargs):
+        return _Request(self._service, self._service._list, calendarId, syncToken)
+
+
+class _Batch:
+    """Runs every added request in one simulated round trip, like `BatchHttpRequest`."""
+
+    def __init__(self, service: 'FakeCalendarService', callback):
+        self._service = service
+        self._callback = callback
+        self._requests: List[Tuple[str, _Request]] = []
+
+    def add(self, request: _Request, request_id: str):
+        self._requests.append((request_id, request))
+
+    def execute(self):
+        if self._service.latency:
+            time.sleep(self._service.latency)
+        for request_id, request in self._requests:
+            try:
+                with self._service.lock:
+                    response = request._fn(*request._args)
+            except HttpError as e:
+                self._callback(request_id, None, e)
+            else:
+                self._callback(request_id, response, None)
+
+
+class _FreeBusy:
+    def __init__(self, service: 'FakeCalendarService'):
+        self._service = service
+
+    def query(self, body: dict):
+        return _Request(self._service, self._service._freebusy, body)
+
+
+class FakeCalendarService:
+    """
+    In-memory calendars with the same request/execute shape as the discovery client.
+
+    Events of every calendar share one dict keyed by event id (booking ids already embed
+    the calendar); each remembers its calendar in `_calendar`.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self._events: Dict[str, dict] = {}
+        # Number of freebusy queries answered, and the calendars each one asked about.
+        self.freebusy_queries: List[List[str]] = []
+        # Each change is stamped with a version; a sync token is the last version seen.
+        self._version = 0
+
+    def events(self) -> _Events:
+        return _Events(self)
+
+    def freebusy(self) -> _FreeBusy:
+        return _FreeBusy(self)
+
+    def new_batch_http_request(self, callback=None) -> _Batch:
+        return _Batch(self, callback)
+
+    def _touch(self, event: dict) -> dict:
+        self._version += 1
+        event['_version'] = self._version
+        self._events[event['id']] = event
+        return event
+
+    def _insert(self, calendar_id: str, body: dict) -> dict:
+        # Like Google: a client-chosen id may be used once, even after the event is deleted.
+        if body.get('id') in self._events:
+            raise _http_error(409)
+        body.setdefault('id', f"evt{len(self._events) + 1}")
+        body['_calendar'] = calendar_id
+        # Google answers with offsets on every dateTime, whatever the request used.
+        for side in ('start', 'end'):
+            body[side] = {**body[side],
+                          'dateTime': _parse_time(body[side]['dateTime'], body[side].get('timeZone')).isoformat()}
+        body['status'] = 'confirmed'
+        body['htmlLink'] = f"https://calendar.invalid/event?eid={body['id']}"
+        return self._touch(body)
+
+    def _get(self, calendar_id: str, event_id: str) -> dict:
+        if self._events.get(event_id, {}).get('_calendar') != calendar_id:
+            raise _http_error(404)
+        return self._events[event_id]
+
+    def _delete(self, calendar_id: str, event_id: str) -> str:
+        self._touch({**self._get(calendar_id, event_id), 'status': 'cancelled'})
+        return ''
+
+    def _update(self, calendar_id: str, event_id: str, body: dict) -> dict:
+        stored = self._get(calendar_id, event_id)
+        for side in ('start', 'end'):
+            body[side] = {**body[side],
+                          'dateTime': _parse_time(body[side]['dateTime'], body[side].get('timeZone')).isoformat()}
+        return self._touch({**body, 'id': event_id, '_calendar': calendar_id,
+                            'status': body.get('status', stored['status']), 'htmlLink': stored['htmlLink']})
+
+    def _list(self, calendar_id: str, sync_token: Optional[str]) -> dict:
+        since = int(sync_token) if sync_token else 0
+        items = [e for e in self._events.values() if e['_version'] > since and e['_calendar'] == calendar_id]
+        if not sync_token:
+            items = [e for e in items if e['status'] != 'cancelled']
+        return {'items': items, 'nextSyncToken': str(self._version)}
+
+    def _freebusy(self, body: dict) -> dict:
+        window_start, window_end = _parse_time(body['timeMin']), _parse_time(body['timeMax'])
+        calendar_ids = [item['id'] for item in body.get('items', [])]
+        self.freebusy_queries.append(calendar_ids)
+        busy: Dict[str, List[Dict[str, str]]] = {calendar_id: [] for calendar_id in calendar_ids}
+        for event in self._events.values():
+            if event['status'] == 'cancelled' or event['_calendar'] not in busy:
+                continue
+            start, end = _parse_time(event['start']['dateTime']), _parse_time(event['end']['dateTime'])
+            if start < window_end and end > window_start:
+                busy[event['_calendar']].append({'start': start.isoformat(), 'end': end.isoformat()})
+        return {'calendars': {calendar_id: {'busy': slots} for calendar_id, slots in busy.items()}}
+
+
+@dataclass
+class FakeCalendarClient:
+    """Stands in for `CalendarClient`: same `service` attribute, nothing to refresh."""
+    service: FakeCalendarService = field(default_factory=FakeCalendarService)
+
+    def close(self) -> None:
+        pass
+
+
+def install_fakes(llm_latency: float = 0.0, calendar_latency: float = 0.0,
+                  calendar_db: Optional[str] = None) -> Tuple[ScriptedLLM, FakeCalendarService]:
+    """
+    Route every crew's LLM calls to a `ScriptedLLM` and Calendar calls to a fake service.
+
+    With `calendar_db`, bookings go to a `SQLiteCalendarBackend` at that path instead.
+    """
+    from src.slotbot import calendar_backend
+    from src.slotbot import crew as crew_module
+    from src.slotbot.compact import CompactEngine
+    from src.slotbot.gateway_llm import gateway_llm
+    from src.slotbot.google_api import Oauth_client
+
+    service = FakeCalendarService(latency=calendar_latency)
+    Oauth_client._client = FakeCalendarClient(service)
+    if calendar_db:
+        calendar_backend._backend = calendar_backend.SQLiteCalendarBackend(calendar_db)
+
+    llm = ScriptedLLM(model='scripted/bench', latency=llm_latency)
+    # Through the gateway, like the real models, so its limits apply to benchmarks too.
+    gated = gateway_llm(llm)
+    compile_crew = crew_module.get_compiled_crew
+
+    def get_compiled_crew():
+        compiled = compile_crew()
+        if isinstance(compiled, CompactEngine):
+            compiled.llm = gated
+        else:
+            for agent in compiled.agents:
+                agent.llm = gated
+        return compiled
+
+    crew_module.get_compiled_crew = get_compiled_crew
+    return llm, service
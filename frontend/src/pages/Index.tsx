@@ -20,11 +20,20 @@ interface ChatSession {
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000';
 
+// Progress text shown while a streamed turn works through its stages.
+const STAGE_LABELS: Record<string, string> = {
+  parsed: 'Understanding your request...',
+  routed: 'Working out what to do next...',
+  calendar_checked: 'Checked the calendar, writing a reply...',
+  info_requested: 'Writing a reply...'
+};
+
 const Index = () => {
   const [session, setSession] = useState<ChatSession | null>(null);
   const [inputMessage, setInputMessage] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const [isConnected, setIsConnected] = useState(false);
+  const [progress, setProgress] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLInputElement>(null);
 
@@ -115,8 +124,22 @@ const Index = () => {
     setInputMessage('');
     setIsLoading(true);
 
+    const botMessageId = (Date.now() + 1).toString();
+    const upsertBotMessage = (content: string) => {
+      setSession(prev => {
+        if (!prev) return null;
+        const exists = prev.messages.some(m => m.id === botMessageId);
+        return {
+          ...prev,
+          messages: exists
+            ? prev.messages.map(m => m.id === botMessageId ? { ...m, content } : m)
+            : [...prev.messages, { id: botMessageId, content, isUser: false, timestamp: new Date() }]
+        };
+      });
+    };
+
     try {
-      const response = await fetch(`${API_BASE_URL}/chat`, {
+      const response = await fetch(`${API_BASE_URL}/chat/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -127,20 +150,47 @@ const Index = () => {
         })
       });
 
-      if (!response.ok) throw new Error('Failed to send message');
-
-      const data = await response.json();
-      const botMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        content: data.chatbot_response,
-        isUser: false,
-        timestamp: new Date()
-      };
-
-      setSession(prev => prev ? {
-        ...prev,
-        messages: [...prev.messages, botMessage]
-      } : null);
+      if (!response.ok || !response.body) throw new Error('Failed to send message');
+
+      // Read server-sent events: stage updates first, then the reply token by token.
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let streamed = '';
+      let finished = false;
+
+      while (!finished) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const frame = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+
+          let event = 'message';
+          let data = '';
+          for (const line of frame.split('\n')) {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+          }
+          const payload = data ? JSON.parse(data) : {};
+
+          if (event === 'token') {
+            streamed += payload.text;
+            setProgress(null);
+            upsertBotMessage(streamed);
+          } else if (event === 'done') {
+            upsertBotMessage(payload.chatbot_response);
+            finished = true;
+          } else if (event === 'error') {
+            throw new Error(payload.detail);
+          } else if (STAGE_LABELS[event]) {
+            setProgress(STAGE_LABELS[event]);
+          }
+        }
+      }
     } catch (error) {
       console.error('Failed to send message:', error);
       // Demo response
@@ -151,19 +201,10 @@ const Index = () => {
         "Thank you for contacting us. How can I assist you today?"
       ];
       
-      const botMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        content: demoResponses[Math.floor(Math.random() * demoResponses.length)],
-        isUser: false,
-        timestamp: new Date()
-      };
-
-      setSession(prev => prev ? {
-        ...prev,
-        messages: [...prev.messages, botMessage]
-      } : null);
+      upsertBotMessage(demoResponses[Math.floor(Math.random() * demoResponses.length)]);
     } finally {
       setIsLoading(false);
+      setProgress(null);
     }
   };
 
@@ -259,6 +300,7 @@ const Index = () => {
                       <div className="w-2 h-2 bg-gray-400 rounded-full animate-bounce" style={{ animationDelay: '0.1s' }}></div>
                       <div className="w-2 h-2 bg-gray-400 rounded-full animate-bounce" style={{ animationDelay: '0.2s' }}></div>
                     </div>
+                    {progress && <p className="text-xs text-gray-500 mt-2">{progress}</p>}
                   </div>
                 </div>
               )}
@@ -0,0 +1,118 @@
+# src/slotbot/bulk_booking.py
+"""
+Booking a series of appointments in one go.
+
+A series is either an explicit list of start times or a first start plus a recurrence
+rule (the RRULE subset clinics use: FREQ=DAILY|WEEKLY, INTERVAL, COUNT, UNTIL, BYDAY).
+All occurrences are checked with one free/busy lookup and the free ones inserted in
+one batch (`CalendarBackend.book_many()`), with a status reported per occurrence.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone, tzinfo
+from typing import Dict, List, Optional, Sequence
+
+from .calendar_backend import BookingResult, appointment_event, booking_event_id, get_calendar_backend
+from .clinicians import Clinician, get_clinician_registry
+
+# Upper bound on occurrences per series (a year of weekly sessions).
+MAX_OCCURRENCES = 52
+
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+
+
+def _parse_until(value: str, tz: Optional[tzinfo]) -> datetime:
+    if len(value) == 8:
+        # A bare date includes the whole day.
+        return datetime.combine(datetime.strptime(value, '%Y%m%d').date(), time.max, tz)
+    moment = datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S')
+    return moment.replace(tzinfo=timezone.utc if value.endswith('Z') else tz)
+
+
+def expand_recurrence(first: datetime, rule: str, max_occurrences: int = MAX_OCCURRENCES) -> List[datetime]:
+    """
+    Return the start times of a series beginning at `first`, e.g. 'FREQ=WEEKLY;COUNT=8'.
+
+    Raises ValueError for unsupported rules and for series without an end (COUNT or
+    UNTIL) or longer than `max_occurrences`.
+    """
+    text = rule.strip().upper()
+    if text.startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    try:
+        parts: Dict[str, str] = dict(part.split('=', 1) for part in text.split(';') if part)
+    except ValueError:
+        raise ValueError(f"Malformed recurrence rule: {rule!r}")
+
+    freq = parts.get('FREQ')
+    if freq not in ('DAILY', 'WEEKLY'):
+        raise ValueError(f"Unsupported recurrence frequency: {freq}")
+    interval = int(parts.get('INTERVAL', '1'))
+    if interval < 1:
+        raise ValueError("INTERVAL must be at least 1")
+    count = int(parts['COUNT']) if 'COUNT' in parts else None
+    until = _parse_until(parts['UNTIL'], first.tzinfo) if 'UNTIL' in parts else None
+    if count is None and until is None:
+        raise ValueError("A recurrence needs COUNT or UNTIL")
+    if count is not None and not 0 < count <= max_occurrences:
+        raise ValueError(f"COUNT must be between 1 and {max_occurrences}")
+    try:
+        # Ordinal prefixes ('1MO') only matter for monthly rules; keep the weekday.
+        byday = sorted({WEEKDAYS[day[-2:]] for day in parts['BYDAY'].split(',')}) if 'BYDAY' in parts else None
+    except KeyError:
+        raise ValueError(f"Unknown weekday in BYDAY={parts['BYDAY']}")
+
+    def candidates():
+        if freq == 'DAILY':
+            step = 0
+            while True:
+                yield first + timedelta(days=step * interval)
+                step += 1
+        week_start = first - timedelta(days=first.weekday())
+        week = 0
+        while True:
+            for day in byday or [first.weekday()]:
+                yield week_start + timedelta(weeks=week * interval, days=day)
+            week += 1
+
+    starts: List[datetime] = []
+    for start in candidates():
+        if start < first or (freq == 'DAILY' and byday and start.weekday() not in byday):
+            continue
+        if until is not None and start > until:
+            break
+        if len(starts) == max_occurrences:
+            raise ValueError(f"The series has more than {max_occurrences} occurrences")
+        starts.append(start)
+        if count is not None and len(starts) == count:
+            break
+    return starts
+
+
+@dataclass
+class SeriesItem:
+    start: datetime
+    end: datetime
+    result: BookingResult
+
+
+def book_series(starts: Sequence[datetime], duration: timedelta, patient_email: str,
+                notes: Optional[str] = None, requester: Optional[str] = None,
+                clinician: Optional[Clinician] = None) -> List[SeriesItem]:
+    """
+    Book one appointment per start time in `clinician`'s calendar (by default the
+    registry's first clinician) and report what happened to each.
+
+    Event ids come from `requester` (the session, or the patient's email) and the slot,
+    so re-submitting a series only books what is still missing.
+    """
+    clinician = clinician or get_clinician_registry().default
+    requester = requester or patient_email.lower()
+    slots = [(start, start + duration) for start in starts]
+    events = []
+    for start, end in slots:
+        event = appointment_event(start, end, patient_email, notes, time_zone=clinician.time_zone)
+        event['id'] = booking_event_id(requester, clinician.calendar_id, start, end)
+        events.append(event)
+    results = get_calendar_backend().book_many(events, clinician.calendar_id)
+    return [SeriesItem(start, end, result) for (start, end), result in zip(slots, results)]
@@ -0,0 +1,567 @@
+# src/slotbot/calendar_backend.py
+"""
+Where appointments are stored.
+
+The calendar tools only talk to a `CalendarBackend`: free/busy, insert, list and
+delete on a calendar id. Events keep the Calendar API's JSON shape (`start`/`end`
+with `dateTime` and `timeZone`, `attendees`, ...) whichever backend holds them.
+
+- `GoogleCalendarBackend` (default) uses the shared Google Calendar client, answering
+  free/busy for the default clinician's calendar from the local busy cache when it can,
+  and for any number of other calendars with one `freebusy` query (`free_busy_many()`).
+- `SQLiteCalendarBackend` keeps the schedule in a local SQLite file, for sites that host
+  their own calendar and as a fast stand-in for load tests.
+
+`SLOTBOT_CALENDAR_BACKEND` selects one (`google` or `sqlite`).
+
+Bookings go through `CalendarBackend.book()`, which checks for conflicts and inserts as
+one step under a per-slot lock. The event id doubles as an idempotency key (see
+`booking_event_id()`), so a retried or double-submitted booking is a no-op.
+"""
+
+import base64
+import hashlib
+import json
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone, tzinfo
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .clinicians import get_clinician_registry
+from .google_api.busy_cache import get_busy_cache, get_calendar_client, parse_rfc3339, query_free_busy
+from .settings import get_settings
+
+BusyInterval = Tuple[datetime, datetime]
+
+DEFAULT_TZ = timezone(timedelta(hours=8))
+# Google accepts at most 50 calls in one batch request.
+GOOGLE_BATCH_LIMIT = 50
+
+
+def event_bounds(event: dict, default_tz: tzinfo = DEFAULT_TZ) -> Optional[BusyInterval]:
+    """
+    Return the aware [start, end) an event occupies, or None if it doesn't block time.
+
+    Naive `dateTime` values are placed in the event's own `timeZone`, falling back to
+    `default_tz`; all-day events cover whole days in `default_tz`.
+    """
+    if event.get('status') == 'cancelled' or event.get('transparency') == 'transparent':
+        return None
+    start, end = event.get('start', {}), event.get('end', {})
+    if 'dateTime' in start and 'dateTime' in end:
+        return _aware(start, default_tz), _aware(end, default_tz)
+    if 'date' in start and 'date' in end:
+        return (
+            datetime.combine(datetime.fromisoformat(start['date']).date(), time(0), default_tz),
+            datetime.combine(datetime.fromisoformat(end['date']).date(), time(0), default_tz),
+        )
+    return None
+
+
+def _aware(moment: dict, default_tz: tzinfo = DEFAULT_TZ) -> datetime:
+    value = parse_rfc3339(moment['dateTime'])
+    if value.tzinfo is not None:
+        return value
+    try:
+        tz = ZoneInfo(moment['timeZone']) if moment.get('timeZone') else default_tz
+    except ZoneInfoNotFoundError:
+        tz = default_tz
+    return value.replace(tzinfo=tz)
+
+
+def booking_event_id(requester: str, calendar_id: str, start: datetime, end: datetime) -> str:
+    """
+    Deterministic event id for one requester (session) booking one slot.
+
+    Retries and double-submits of the same booking get the same id, so the backend can
+    recognise them. Base32hex keeps the id inside Google's allowed alphabet (a-v, 0-9).
+    """
+    key = f"{requester}|{calendar_id}|{start.isoformat()}|{end.isoformat()}"
+    return base64.b32hexencode(hashlib.sha256(key.encode()).digest()[:20]).decode().lower()
+
+
+def appointment_event(start: datetime, end: datetime, patient_email: str, notes: Optional[str] = None,
+                      time_zone: str = 'Asia/Singapore') -> dict:
+    """The Calendar API body of a patient appointment."""
+    return {
+        'summary': 'Appointment',
+        'description': notes if notes else 'General appointment',
+        'start': {'dateTime': start.isoformat(), 'timeZone': time_zone},
+        'end': {'dateTime': end.isoformat(), 'timeZone': time_zone},
+        'attendees': [{'email': patient_email}],
+    }
+
+
+class DuplicateEventError(Exception):
+    """An event with this id already exists in the calendar."""
+
+
+@dataclass
+class BookingResult:
+    # 'booked', 'duplicate' (the same booking already exists; nothing was written),
+    # 'conflict' (the slot is taken) or 'failed' (the calendar rejected the insert).
+    status: str
+    event: Optional[dict] = None
+    conflicts: List[BusyInterval] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+class SlotLocks:
+    """
+    Striped in-process locks over (calendar, 30-minute bucket).
+
+    A slot takes the stripe of every bucket it touches, in index order, so two overlapping
+    slots always contend on at least one lock while unrelated slots rarely do.
+    """
+
+    def __init__(self, stripes: int = 256, bucket: timedelta = timedelta(minutes=30)):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._bucket = bucket.total_seconds()
+
+    def _stripes(self, calendar_id: str, start: datetime, end: datetime) -> List[int]:
+        first = int(start.timestamp() // self._bucket)
+        last = max(int(-(-end.timestamp() // self._bucket)), first + 1)
+        if last - first >= len(self._locks):
+            return list(range(len(self._locks)))
+        return sorted({hash((calendar_id, bucket)) % len(self._locks) for bucket in range(first, last)})
+
+    @contextmanager
+    def hold(self, calendar_id: str, slots: Sequence[BusyInterval]) -> Iterator[None]:
+        """Hold every stripe the given slots touch (taken in index order, so never deadlocks)."""
+        stripes = sorted({i for start, end in slots for i in self._stripes(calendar_id, start, end)})
+        for i in stripes:
+            self._locks[i].acquire()
+        try:
+            yield
+        finally:
+            for i in reversed(stripes):
+                self._locks[i].release()
+
+
+_slot_locks = SlotLocks()
+
+
+class CalendarBackend(ABC):
+    """Free/busy, insert, list and delete on a calendar; events use the Calendar API shape."""
+
+    @abstractmethod
+    def free_busy(self, start: datetime, end: datetime, calendar_id: str = 'primary') -> List[BusyInterval]:
+        """Busy intervals overlapping [start, end)."""
+
+    def free_busy_many(self, start: datetime, end: datetime,
+                       calendar_ids: Sequence[str]) -> Dict[str, List[BusyInterval]]:
+        """
+        Busy intervals overlapping [start, end) for each calendar. A calendar missing from
+        the result could not be read and should be treated as unavailable.
+        """
+        return {calendar_id: self.free_busy(start, end, calendar_id) for calendar_id in dict.fromkeys(calendar_ids)}
+
+    def live_free_busy(self, start: datetime, end: datetime, calendar_id: str = 'primary') -> List[BusyInterval]:
+        """Like `free_busy()`, but read from the calendar itself, never from a cache; bookings check this."""
+        return self.free_busy(start, end, calendar_id)
+
+    @abstractmethod
+    def insert(self, event: dict, calendar_id: str = 'primary') -> dict:
+        """Store a new event and return it with its `id` filled in."""
+
+    @abstractmethod
+    def list_events(self, start: datetime, end: datetime, calendar_id: str = 'primary') -> List[dict]:
+        """Events overlapping [start, end), ordered by start time."""
+
+    @abstractmethod
+    def get_event(self, event_id: str, calendar_id: str = 'primary') -> Optional[dict]:
+        """The event with this id, or None if there is none."""
+
+    def get_events(self, event_ids: Sequence[str], calendar_id: str = 'primary') -> Dict[str, dict]:
+        """The events with these ids that exist (cancelled ones included), keyed by id."""
+        found: Dict[str, dict] = {}
+        for event_id in dict.fromkeys(event_ids):
+            event = self.get_event(event_id, calendar_id)
+            if event is not None:
+                found[event_id] = event
+        return found
+
+    @abstractmethod
+    def delete(self, event_id: str, calendar_id: str = 'primary') -> None:
+        ...
+
+    def restore(self, event: dict, calendar_id: str = 'primary') -> dict:
+        """
+        Write `event` over the cancelled event with the same id and return it. Only needed
+        where `delete()` leaves the event behind as cancelled, keeping its id taken.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not keep cancelled events")
+
+    def insert_many(self, events: Sequence[dict], calendar_id: str = 'primary') -> List[Union[dict, Exception]]:
+        """Insert each event; the result list holds the created event or the error, per event."""
+        results: List[Union[dict, Exception]] = []
+        for event in events:
+            try:
+                results.append(self.insert(event, calendar_id))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def book(self, event: dict, calendar_id: str = 'primary') -> BookingResult:
+        """
+        Insert `event` only if its slot is free.
+
+        The conflict check and the insert run under the slot's lock, so two bookings made
+        through this process can never both take the same time. The check reads the
+        calendar live (`live_free_busy()`), so bookings made elsewhere, by other processes
+        or directly in the calendar, are seen too, not only once a cache catches up. `event['id']` is the
+        idempotency key: booking an id that already exists reports 'duplicate' and writes
+        nothing, unless that event was cancelled, in which case it is restored and the
+        booking reports 'booked'. The existing event is only looked up when the slot is
+        not free or the id is taken.
+        """
+        return self.book_many([event], calendar_id)[0]
+
+    def book_many(self, events: Sequence[dict], calendar_id: str = 'primary') -> List[BookingResult]:
+        """
+        Book a series of events with one free/busy lookup and one `insert_many()`.
+
+        Events that overlap the calendar, or an earlier event of the same series, are
+        reported as conflicts; the rest are inserted together. Same locking and
+        idempotency rules as `book()`.
+        """
+        slots: List[BusyInterval] = []
+        for event in events:
+            bounds = event_bounds(event)
+            if bounds is None:
+                raise ValueError("Event needs a start and end to be booked")
+            slots.append(bounds)
+        if not slots:
+            return []
+
+        results: List[Optional[BookingResult]] = [None] * len(events)
+        with _slot_locks.hold(calendar_id, slots):
+            taken = list(self.live_free_busy(min(s for s, _ in slots), max(e for _, e in slots), calendar_id))
+            free: List[int] = []
+            for i, (start, end) in enumerate(slots):
+                conflicts = [(s, e) for s, e in taken if s < end and e > start]
+                if conflicts:
+                    results[i] = BookingResult('conflict', conflicts=conflicts)
+                else:
+                    free.append(i)
+                    taken.append((start, end))
+
+            id_taken: List[int] = []
+            for i, outcome in zip(free, self.insert_many([events[i] for i in free], calendar_id)):
+                if isinstance(outcome, DuplicateEventError):
+                    results[i] = BookingResult('conflict')
+                    id_taken.append(i)
+                elif isinstance(outcome, Exception):
+                    results[i] = BookingResult('failed', error=str(outcome))
+                else:
+                    results[i] = BookingResult('booked', outcome)
+
+            # A taken slot may be this very booking, made by an earlier attempt.
+            taken_ids = [events[i]['id'] for i, result in enumerate(results)
+                         if result.status == 'conflict' and events[i].get('id')]
+            existing = self.get_events(taken_ids, calendar_id) if taken_ids else {}
+            for i, result in enumerate(results):
+                found = existing.get(events[i].get('id'))
+                if result.status != 'conflict' or found is None:
+                    continue
+                if found.get('status') != 'cancelled':
+                    results[i] = BookingResult('duplicate', found)
+                elif i in id_taken:
+                    # Booked and cancelled before; the slot is free, but the id can only
+                    # be used once, so the cancelled event is brought back instead.
+                    try:
+                        results[i] = BookingResult('booked', self.restore(events[i], calendar_id))
+                    except Exception as e:
+                        results[i] = BookingResult('failed', error=str(e))
+        return results
+
+
+class GoogleCalendarBackend(CalendarBackend):
+    """Google Calendar through the process-wide client; keeps the busy cache in step with writes."""
+
+    def free_busy(self, start: datetime, end: datetime, calendar_id: str = 'primary') -> List[BusyInterval]:
+        busy = self.free_busy_many(start, end, [calendar_id])
+        if calendar_id not in busy:
+            raise RuntimeError(f"Could not read the free/busy of calendar {calendar_id}")
+        return busy[calendar_id]
+
+    def free_busy_many(self, start: datetime, end: datetime,
+                       calendar_ids: Sequence[str]) -> Dict[str, List[BusyInterval]]:
+        """The busy cache answers for its calendar when it covers the window; the rest share one query."""
+        busy: Dict[str, List[BusyInterval]] = {}
+        remote: List[str] = []
+        cache = get_busy_cache()
+        for calendar_id in dict.fromkeys(calendar_ids):
+            cached = cache.busy_between(start, end) if cache is not None and calendar_id == cache.calendar_id else None
+            if cached is None:
+                remote.append(calendar_id)
+            else:
+                busy[calendar_id] = cached
+        if remote:
+            busy.update(query_free_busy(start, end, remote))
+        return busy
+
+    def live_free_busy(self, start: datetime, end: datetime, calendar_id: str = 'primary') -> List[BusyInterval]:
+        """A freebusy query, bypassing the busy cache, which may be up to its staleness limit behind."""
+        busy = query_free_busy(start, end, [calendar_id])
+        if calendar_id not in busy:
+            raise RuntimeError(f"Could not read the free/busy of calendar {calendar_id}")
+        return busy[calendar_id]
+
+    def insert(self, event: dict, calendar_id: str = 'primary') -> dict:
+        from googleapiclient.errors import HttpError
+
+        try:
+            created = get_calendar_client().service.events().insert(calendarId=calendar_id, body=event).execute()
+        except HttpError as e:
+            if e.resp.status == 409:
+                raise DuplicateEventError(event.get('id')) from e
+            raise
+        self._record(created, calendar_id)
+        return created
+
+    def insert_many(self, events: Sequence[dict], calendar_id: str = 'primary') -> List[Union[dict, Exception]]:
+        """All inserts in one batch HTTP request (per 50 events) instead of one round trip each."""
+        from googleapiclient.errors import HttpError
+
+        service = get_calendar_client().service
+        results: List[Union[dict, Exception]] = [None] * len(events)
+
+        def on_done(request_id: str, response: dict, exception: Optional[Exception]) -> None:
+            i = int(request_id)
+            if exception is None:
+                results[i] = response
+                self._record(response, calendar_id)
+            elif isinstance(exception, HttpError) and exception.resp.status == 409:
+                results[i] = DuplicateEventError(events[i].get('id'))
+            else:
+                results[i] = exception
+
+        for first in range(0, len(events), GOOGLE_BATCH_LIMIT):
+            batch = service.new_batch_http_request(callback=on_done)
+            for i in range(first, min(first + GOOGLE_BATCH_LIMIT, len(events))):
+                batch.add(service.events().insert(calendarId=calendar_id, body=events[i]), request_id=str(i))
+            batch.execute()
+        return results
+
+    def get_event(self, event_id: str, calendar_id: str = 'primary') -> Optional[dict]:
+        from googleapiclient.errors import HttpError
+
+        try:
+            return get_calendar_client().service.events().get(calendarId=calendar_id, eventId=event_id).execute()
+        except HttpError as e:
+            if e.resp.status in (404, 410):
+                return None
+            raise
+
+    def get_events(self, event_ids: Sequence[str], calendar_id: str = 'primary') -> Dict[str, dict]:
+        """All lookups in one batch HTTP request (per 50 ids) instead of one round trip each."""
+        from googleapiclient.errors import HttpError
+
+        service = get_calendar_client().service
+        ids = list(dict.fromkeys(event_ids))
+        found: Dict[str, dict] = {}
+        errors: List[Exception] = []
+
+        def on_done(request_id: str, response: dict, exception: Optional[Exception]) -> None:
+            if exception is None:
+                found[ids[int(request_id)]] = response
+            elif not (isinstance(exception, HttpError) and exception.resp.status in (404, 410)):
+                errors.append(exception)
+
+        for first in range(0, len(ids), GOOGLE_BATCH_LIMIT):
+            batch = service.new_batch_http_request(callback=on_done)
+            for i in range(first, min(first + GOOGLE_BATCH_LIMIT, len(ids))):
+                batch.add(service.events().get(calendarId=calendar_id, eventId=ids[i]), request_id=str(i))
+            batch.execute()
+        if errors:
+            raise errors[0]
+        return found
+
+    def list_events(self, start: datetime, end: datetime, calendar_id: str = 'primary') -> List[dict]:
+        service = get_calendar_client().service
+        events: List[dict] = []
+        page_token = None
+        while True:
+            response = service.events().list(
+                calendarId=calendar_id, timeMin=start.isoformat(), timeMax=end.isoformat(),
+                singleEvents=True, orderBy='startTime', pageToken=page_token).execute()
+            events.extend(response.get('items', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return events
+
+    def delete(self, event_id: str, calendar_id: str = 'primary') -> None:
+        get_calendar_client().service.events().delete(calendarId=calendar_id, eventId=event_id).execute()
+        self._record({'id': event_id, 'status': 'cancelled'}, calendar_id)
+
+    def restore(self, event: dict, calendar_id: str = 'primary') -> dict:
+        """Google keeps a deleted event as cancelled; updating it with status 'confirmed' brings it back."""
+        restored = get_calendar_client().service.events().update(
+            calendarId=calendar_id, eventId=event['id'], body={**event, 'status': 'confirmed'}).execute()
+        self._record(restored, calendar_id)
+        return restored
+
+    @staticmethod
+    def _record(event: dict, calendar_id: str) -> None:
+        # Make our own writes visible to availability checks right away.
+        cache = get_busy_cache()
+        if cache is not None and calendar_id == cache.calendar_id:
+            cache.record_event(event)
+
+
+class SQLiteCalendarBackend(CalendarBackend):
+    """
+    Calendar events in a local SQLite file.
+
+    Events are indexed on `(calendar_id, start_ts, end_ts)`. An overlap query seeks to
+    `start - longest event` and scans forward only to `end`, so it costs O(log n) plus
+    the events it returns, and the covering index answers free/busy without touching
+    the table. The longest event per calendar is tracked in `calendar_extents`.
+    """
+
+    def __init__(self, path: str, default_tz: tzinfo = DEFAULT_TZ):
+        self.path = path
+        self.default_tz = default_tz
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                " calendar_id TEXT NOT NULL,"
+                " event_id TEXT NOT NULL,"
+                " start_ts REAL NOT NULL,"
+                " end_ts REAL NOT NULL,"
+                " body TEXT NOT NULL,"
+                " PRIMARY KEY (calendar_id, event_id))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS events_interval ON events (calendar_id, start_ts, end_ts)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS calendar_extents ("
+                " calendar_id TEXT PRIMARY KEY,"
+                " max_length REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads; keep one per worker thread.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _overlapping(self, columns: str, start: datetime, end: datetime, calendar_id: str) -> List[tuple]:
+        lo, hi = start.timestamp(), end.timestamp()
+        return self._connection().execute(
+            f"SELECT {columns} FROM events"
+            " WHERE calendar_id = ? AND start_ts < ? AND end_ts > ?"
+            " AND start_ts >= ? - COALESCE((SELECT max_length FROM calendar_extents WHERE calendar_id = ?), 0)"
+            " ORDER BY start_ts",
+            (calendar_id, hi, lo, lo, calendar_id),
+        ).fetchall()
+
+    def free_busy(self, start: datetime, end: datetime, calendar_id: str = 'primary') -> List[BusyInterval]:
+        return [
+            (datetime.fromtimestamp(s, timezone.utc), datetime.fromtimestamp(e, timezone.utc))
+            for s, e in self._overlapping('start_ts, end_ts', start, end, calendar_id)
+        ]
+
+    def _prepare(self, event: dict) -> Tuple[dict, BusyInterval]:
+        bounds = event_bounds(event, self.default_tz)
+        if bounds is None:
+            raise ValueError("Event needs a start and end to be stored")
+        return {**event, 'id': event.get('id') or uuid.uuid4().hex, 'status': 'confirmed'}, bounds
+
+    @staticmethod
+    def _insert_row(conn: sqlite3.Connection, calendar_id: str, created: dict, bounds: BusyInterval) -> None:
+        start_ts, end_ts = bounds[0].timestamp(), bounds[1].timestamp()
+        try:
+            conn.execute(
+                "INSERT INTO events (calendar_id, event_id, start_ts, end_ts, body) VALUES (?, ?, ?, ?, ?)",
+                (calendar_id, created['id'], start_ts, end_ts, json.dumps(created)),
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateEventError(created['id']) from e
+        conn.execute(
+            "INSERT INTO calendar_extents (calendar_id, max_length) VALUES (?, ?) "
+            "ON CONFLICT(calendar_id) DO UPDATE SET max_length = MAX(max_length, excluded.max_length)",
+            (calendar_id, end_ts - start_ts),
+        )
+
+    def insert(self, event: dict, calendar_id: str = 'primary') -> dict:
+        created, bounds = self._prepare(event)
+        with self._connection() as conn:
+            self._insert_row(conn, calendar_id, created, bounds)
+        return created
+
+    def book_many(self, events: Sequence[dict], calendar_id: str = 'primary') -> List[BookingResult]:
+        """Check and insert in one IMMEDIATE transaction: atomic across every process sharing the file."""
+        prepared = [self._prepare(event) for event in events]
+        results: List[BookingResult] = []
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for created, bounds in prepared:
+                existing = self.get_event(created['id'], calendar_id)
+                if existing is not None:
+                    results.append(BookingResult('duplicate', existing))
+                    continue
+                # Sees this transaction's own inserts, so overlaps within the series count too.
+                conflicts = self.free_busy(*bounds, calendar_id=calendar_id)
+                if conflicts:
+                    results.append(BookingResult('conflict', conflicts=conflicts))
+                    continue
+                self._insert_row(conn, calendar_id, created, bounds)
+                results.append(BookingResult('booked', created))
+        return results
+
+    def get_event(self, event_id: str, calendar_id: str = 'primary') -> Optional[dict]:
+        row = self._connection().execute(
+            "SELECT body FROM events WHERE calendar_id = ? AND event_id = ?", (calendar_id, event_id),
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def list_events(self, start: datetime, end: datetime, calendar_id: str = 'primary') -> List[dict]:
+        return [json.loads(body) for (body,) in self._overlapping('body', start, end, calendar_id)]
+
+    def delete(self, event_id: str, calendar_id: str = 'primary') -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM events WHERE calendar_id = ? AND event_id = ?", (calendar_id, event_id))
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+
+_backend: Optional[CalendarBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_calendar_backend() -> CalendarBackend:
+    """
+    Return the process-wide calendar backend selected by `SLOTBOT_CALENDAR_BACKEND`,
+    taped when `SLOTBOT_CASSETTE` is set (and never built at all when replaying).
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                settings = get_settings()
+                backend: Optional[CalendarBackend]
+                if settings.cassette_path and settings.cassette_mode == 'replay':
+                    backend = None
+                elif settings.calendar_backend == 'sqlite':
+                    backend = SQLiteCalendarBackend(settings.calendar_db_path,
+                                                    default_tz=get_clinician_registry().default.tz)
+                else:
+                    backend = GoogleCalendarBackend()
+                if settings.cassette_path:
+                    from .cassette import CassetteCalendarBackend
+                    backend = CassetteCalendarBackend(backend)
+                _backend = backend
+    return _backend
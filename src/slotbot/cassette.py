@@ -0,0 +1,475 @@
+# src/slotbot/cassette.py
+"""
+Record and replay of a turn's LLM and Calendar traffic.
+
+With `SLOTBOT_CASSETTE` set, every turn run through `crew.run_turn()` (the API, or the
+`train` / `replay` / `test` commands in main.py) is taped. Each LLM call (through the
+gateway wrapper) and each `CalendarBackend` call is recorded, together with the turn's
+inputs and reply. A cassette is a JSON Lines file (gzipped if the name ends in `.gz`),
+one line per turn:
+
+    {"session": "...", "turn": 1, "at": "<UTC start>", "inputs": {...},
+     "llm": [[prompt key, model, response], ...], "calendar": [[call, result], ...],
+     "cache": [[message, parse or null], ...], "reply": "...", "parse_path": "llm",
+     "response_path": "template", "seconds": 2.4}
+
+LLM calls are keyed on their prompt (model, messages and response model) and Calendar
+calls on the method, the calendar/event ids and, for lookups, the window. Parse-cache lookups are taped too, so a
+replay parses each message the way the recording did whatever the cache holds now. Datetimes, intervals, booking results and
+errors are tagged (`{"$dt": ...}`, `{"$t": [...]}`, ...) so they decode to what the live
+call returned.
+
+With `SLOTBOT_CASSETTE_MODE=replay`, turns are answered from the cassette instead, found
+by session id and turn number. No LLM or Calendar request leaves the process and no
+quota is waited for, so whole conversations re-run deterministically at CPU speed.
+Slot searches use the recorded turn's clock. A prompt that no longer matches its
+recording (after a prompt or memory change) gets the turn's next unused reply from the
+same model and is counted as drift. A Calendar call that was never recorded raises
+`CassetteMiss`.
+"""
+
+import gzip
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, TextIO
+
+from .calendar_backend import BookingResult, BusyInterval, CalendarBackend, DuplicateEventError
+from .llm_gateway import LLMUnavailable
+from .models import ConversationState, UserInputParsed
+from .settings import get_settings
+from .turn_context import TurnContext
+
+logger = logging.getLogger(__name__)
+
+TurnRunner = Callable[[dict, TurnContext], Any]
+
+_tape: ContextVar[Optional['TurnTape']] = ContextVar('slotbot_cassette_tape', default=None)
+
+
+class CassetteMiss(LookupError):
+    """A replayed turn made a call (or was a turn) that the cassette has no recording of."""
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, tuple):
+        return {'$t': [_encode(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, BookingResult):
+        return {'$booking': _encode({**asdict(value), 'conflicts': list(value.conflicts)})}
+    if isinstance(value, BaseException):
+        return {'$error': [type(value).__name__, str(value)]}
+    if hasattr(value, 'model_dump_json'):
+        return {'$model': value.model_dump_json()}
+    return value
+
+
+# Errors replayed as their own type; anything else comes back as a RuntimeError.
+_ERRORS: Dict[str, Callable[[str], BaseException]] = {
+    'DuplicateEventError': DuplicateEventError,
+    'LLMUnavailable': lambda message: LLMUnavailable(message, retry_after=1.0),
+}
+
+
+def _decode(value: Any, response_model: Any = None) -> Any:
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if '$dt' in value:
+        return datetime.fromisoformat(value['$dt'])
+    if '$t' in value:
+        return tuple(_decode(v) for v in value['$t'])
+    if '$booking' in value:
+        fields = _decode(value['$booking'])
+        return BookingResult(**{**fields, 'conflicts': [tuple(c) for c in fields['conflicts']]})
+    if '$error' in value:
+        name, message = value['$error']
+        return _ERRORS.get(name, RuntimeError)(message)
+    if '$model' in value:
+        return response_model.model_validate_json(value['$model']) if response_model is not None else value['$model']
+    return {k: _decode(v) for k, v in value.items()}
+
+
+def _raise_or_return(value: Any) -> Any:
+    if isinstance(value, BaseException):
+        raise value
+    return value
+
+
+@dataclass
+class TurnTape:
+    """The recorded traffic of one turn; while replaying, also what has been used of it."""
+    session: Optional[str]
+    turn: int
+    at: str
+    inputs: Dict[str, Any]
+    llm: List[list] = field(default_factory=list)
+    calendar: List[list] = field(default_factory=list)
+    cache: List[list] = field(default_factory=list)
+    reply: Optional[str] = None
+    parse_path: Optional[str] = None
+    response_path: Optional[str] = None
+    seconds: float = 0.0
+    replaying: bool = False
+    # Prompts that no longer matched their recording on the last replay.
+    drift: int = 0
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self.rewind()
+
+    def rewind(self) -> None:
+        """Make every recorded call available again, for a fresh replay of the turn."""
+        self._llm_left: Dict[str, Deque[int]] = defaultdict(deque)
+        for index, (key, _, _) in enumerate(self.llm):
+            self._llm_left[key].append(index)
+        self._llm_used: set = set()
+        self._left: Dict[str, Dict[str, Deque[int]]] = {}
+        for section in ('calendar', 'cache'):
+            self._left[section] = defaultdict(deque)
+            for index, (call, _) in enumerate(getattr(self, section)):
+                self._left[section][call].append(index)
+        self.drift = 0
+
+    @property
+    def started_at(self) -> datetime:
+        return datetime.fromisoformat(self.at)
+
+    def llm_call(self, model: str, key: str, send: Callable[[], Any], response_model: Any = None) -> Any:
+        """Replay the recorded response to this prompt, or send it and record the response."""
+        if not self.replaying:
+            response = self._record(self.llm, send, key, model)
+            return _raise_or_return(response)
+        with self._lock:
+            queue = self._llm_left.get(key)
+            if queue:
+                index = queue.popleft()
+            else:
+                # The prompt changed since it was recorded: take the model's next unused reply.
+                unused = [i for i, (_, m, _) in enumerate(self.llm) if m == model and i not in self._llm_used]
+                if not unused:
+                    raise CassetteMiss(f"No recorded {model} call left in turn {self.turn} of {self.session}")
+                index = unused[0]
+                self._llm_left[self.llm[index][0]].remove(index)
+                self.drift += 1
+            self._llm_used.add(index)
+        return _raise_or_return(_decode(self.llm[index][2], response_model))
+
+    def call(self, section: str, call: str, send: Optional[Callable[[], Any]]) -> Any:
+        """
+        Replay the recorded result of a 'calendar' or 'cache' call, or make it and record
+        the result. Identical calls are answered in the order they were recorded.
+        """
+        entries = getattr(self, section)
+        if not self.replaying:
+            return _raise_or_return(self._record(entries, send, call))
+        with self._lock:
+            queue = self._left[section].get(call)
+            if not queue:
+                raise CassetteMiss(f"No recorded {section} call {call!r} left in turn {self.turn} of {self.session}")
+            index = queue.popleft()
+        return _raise_or_return(_decode(entries[index][1]))
+
+    def _record(self, entries: List[list], send: Callable[[], Any], *key: str) -> Any:
+        try:
+            result = send()
+        except Exception as e:
+            result = e
+        with self._lock:
+            entries.append([*key, _encode(result)])
+        return result
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'session': self.session, 'turn': self.turn, 'at': self.at, 'inputs': self.inputs,
+            'llm': self.llm, 'calendar': self.calendar, 'cache': self.cache, 'reply': self.reply,
+            'parse_path': self.parse_path, 'response_path': self.response_path, 'seconds': round(self.seconds, 3),
+        }, separators=(',', ':'), default=str)
+
+    @classmethod
+    def from_json(cls, line: str) -> 'TurnTape':
+        data = json.loads(line)
+        return cls(session=data['session'], turn=data['turn'], at=data['at'], inputs=data['inputs'],
+                   llm=data.get('llm') or [], calendar=data.get('calendar') or [], cache=data.get('cache') or [],
+                   reply=data.get('reply'),
+                   parse_path=data.get('parse_path'), response_path=data.get('response_path'),
+                   seconds=data.get('seconds') or 0.0)
+
+
+def _open(path: str, mode: str) -> TextIO:
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class Cassette:
+    """A cassette file being recorded ('record', appended to) or replayed ('replay')."""
+
+    def __init__(self, path: str, mode: str = 'record'):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.tapes: List[TurnTape] = []
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            with _open(path, 'r') as f:
+                self.tapes = [TurnTape.from_json(line) for line in f if line.strip()]
+            for tape in self.tapes:
+                tape.replaying = True
+        self._index = {(tape.session, tape.turn): tape for tape in self.tapes}
+
+    def conversations(self) -> Dict[Optional[str], List[TurnTape]]:
+        """The recorded turns, grouped by session in recording order."""
+        grouped: Dict[Optional[str], List[TurnTape]] = {}
+        for tape in self.tapes:
+            grouped.setdefault(tape.session, []).append(tape)
+        for tapes in grouped.values():
+            tapes.sort(key=lambda tape: tape.turn)
+        return grouped
+
+    @contextmanager
+    def turn(self, inputs: dict, context: TurnContext) -> Iterator[TurnTape]:
+        """Tape the turn about to run with `context` (or, replaying, find its recording)."""
+        active = _tape.get()
+        if active is not None:
+            # Already taped by an outer runner.
+            yield active
+            return
+        number = context.conversation.turns + 1
+        if self.mode == 'replay':
+            tape = self._index.get((context.session_id, number))
+            if tape is None:
+                raise CassetteMiss(f"No recording of turn {number} of session {context.session_id}")
+            tape.rewind()
+        else:
+            tape = TurnTape(session=context.session_id, turn=number,
+                            at=datetime.now(timezone.utc).isoformat(), inputs=dict(inputs))
+        token = _tape.set(tape)
+        started = time.perf_counter()
+        try:
+            yield tape
+        finally:
+            _tape.reset(token)
+            if self.mode == 'record':
+                tape.seconds = time.perf_counter() - started
+                tape.parse_path, tape.response_path = context.parse_path, context.response_path
+                self._append(tape)
+
+    def _append(self, tape: TurnTape) -> None:
+        with self._lock:
+            self.tapes.append(tape)
+            self._index[(tape.session, tape.turn)] = tape
+            with _open(self.path, 'a') as f:
+                f.write(tape.to_json() + '\n')
+
+
+def reply_text(result: Any) -> str:
+    """The reply of a turn engine's `kickoff()` result (a crew output or a string)."""
+    return result.raw if hasattr(result, 'raw') else str(result)
+
+
+def run_taped(run: TurnRunner, inputs: dict, context: TurnContext) -> Any:
+    """Run one turn with `run`, taped when a cassette is configured."""
+    cassette = get_cassette()
+    if cassette is None:
+        return run(inputs, context)
+    with cassette.turn(inputs, context) as tape:
+        result = run(inputs, context)
+        if not tape.replaying:
+            tape.reply = reply_text(result)
+    return result
+
+
+def current_tape() -> Optional[TurnTape]:
+    """The tape of the turn running in this context, if any."""
+    return _tape.get()
+
+
+def turn_now() -> datetime:
+    """Now, or the recorded start of the turn being replayed (aware, UTC)."""
+    tape = _tape.get()
+    if tape is not None and tape.replaying:
+        return tape.started_at
+    return datetime.now(timezone.utc)
+
+
+class CassetteCalendarBackend(CalendarBackend):
+    """
+    Tapes every call to `inner` in the running turn's tape. Replaying, the calls are
+    answered from the tape and `inner` is None: nothing reaches a real calendar.
+    """
+
+    def __init__(self, inner: Optional[CalendarBackend]):
+        self.inner = inner
+
+    def _call(self, method: str, ids: Sequence[str], *args: Any) -> Any:
+        send = (lambda: getattr(self.inner, method)(*args)) if self.inner is not None else None
+        tape = _tape.get()
+        if tape is None:
+            if send is None:
+                raise CassetteMiss(f"{method} called outside a replayed turn")
+            return send()
+        return tape.call('calendar', ' '.join([method, *ids]), send)
+
+    @staticmethod
+    def _window(start: datetime, end: datetime) -> List[str]:
+        # Lookups of different windows on the same calendars have different answers.
+        return [start.isoformat(), end.isoformat()]
+
+    def free_busy(self, start: datetime, end: datetime, calendar_id: str = 'primary') -> List[BusyInterval]:
+        return self._call('free_busy', [calendar_id, *self._window(start, end)], start, end, calendar_id)
+
+    def free_busy_many(self, start: datetime, end: datetime,
+                       calendar_ids: Sequence[str]) -> Dict[str, List[BusyInterval]]:
+        return self._call('free_busy_many', [*dict.fromkeys(calendar_ids), *self._window(start, end)],
+                          start, end, calendar_ids)
+
+    def live_free_busy(self, start: datetime, end: datetime, calendar_id: str = 'primary') -> List[BusyInterval]:
+        return self._call('live_free_busy', [calendar_id, *self._window(start, end)], start, end, calendar_id)
+
+    def insert(self, event: dict, calendar_id: str = 'primary') -> dict:
+        return self._call('insert', [calendar_id, event.get('id', '')], event, calendar_id)
+
+    def insert_many(self, events: Sequence[dict], calendar_id: str = 'primary') -> List[Any]:
+        return self._call('insert_many', [calendar_id, *(e.get('id', '') for e in events)], events, calendar_id)
+
+    def list_events(self, start: datetime, end: datetime, calendar_id: str = 'primary') -> List[dict]:
+        return self._call('list_events', [calendar_id, *self._window(start, end)], start, end, calendar_id)
+
+    def get_event(self, event_id: str, calendar_id: str = 'primary') -> Optional[dict]:
+        return self._call('get_event', [calendar_id, event_id], event_id, calendar_id)
+
+    def get_events(self, event_ids: Sequence[str], calendar_id: str = 'primary') -> Dict[str, dict]:
+        return self._call('get_events', [calendar_id, *event_ids], event_ids, calendar_id)
+
+    def delete(self, event_id: str, calendar_id: str = 'primary') -> None:
+        return self._call('delete', [calendar_id, event_id], event_id, calendar_id)
+
+    def restore(self, event: dict, calendar_id: str = 'primary') -> dict:
+        return self._call('restore', [calendar_id, event.get('id', '')], event, calendar_id)
+
+    def book(self, event: dict, calendar_id: str = 'primary') -> BookingResult:
+        return self._call('book', [calendar_id, event.get('id', '')], event, calendar_id)
+
+    def book_many(self, events: Sequence[dict], calendar_id: str = 'primary') -> List[BookingResult]:
+        return self._call('book_many', [calendar_id, *(e.get('id', '') for e in events)], events, calendar_id)
+
+
+class CassetteParseCache:
+    """
+    Tapes the lookups of a `ParseCache` made during a turn. Replaying, lookups are
+    answered from the tape and nothing is stored, so the cache's contents do not matter.
+    """
+
+    def __init__(self, inner: Any):
+        self.inner = inner
+
+    def get(self, message: str, current_date: str) -> Optional[UserInputParsed]:
+        tape = _tape.get()
+        if tape is None:
+            return self.inner.get(message, current_date)
+        found = tape.call('cache', message, lambda: self.inner.get(message, current_date))
+        # Recorded as the model's JSON.
+        return UserInputParsed.model_validate_json(found) if isinstance(found, str) else found
+
+    def put(self, message: str, current_date: str, parsed: UserInputParsed) -> None:
+        tape = _tape.get()
+        if tape is None or not tape.replaying:
+            self.inner.put(message, current_date, parsed)
+
+    def stats(self) -> Dict[str, int]:
+        return self.inner.stats()
+
+
+@dataclass
+class ReplayedTurn:
+    """How one recorded turn replayed."""
+    session: Optional[str]
+    turn: int
+    expected: Optional[str]
+    reply: Optional[str]
+    seconds: float
+    recorded_seconds: float
+    drift: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.reply == self.expected
+
+
+def replay_cassette(cassette: Cassette, run: TurnRunner) -> List[ReplayedTurn]:
+    """
+    Re-run every recorded conversation from the start with `run` (e.g. `crew.run_turn`),
+    answered from `cassette`, and report each turn against its recording.
+    """
+    if cassette.mode != 'replay':
+        raise ValueError("replay_cassette() needs a cassette opened with mode='replay'")
+    results: List[ReplayedTurn] = []
+    for session, tapes in cassette.conversations().items():
+        conversation = ConversationState()
+        for tape in tapes:
+            context = TurnContext(conversation=conversation, session_id=session)
+            started = time.perf_counter()
+            reply = error = None
+            try:
+                with cassette.turn(tape.inputs, context):
+                    reply = reply_text(run(tape.inputs, context))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            results.append(ReplayedTurn(session=session, turn=tape.turn, expected=tape.reply, reply=reply,
+                                        seconds=time.perf_counter() - started, recorded_seconds=tape.seconds,
+                                        drift=tape.drift, error=error))
+            if error is not None:
+                # Later turns depend on this one's memory; the rest of the conversation cannot replay.
+                break
+            conversation = context.conversation
+    return results
+
+
+def record_conversations(conversations: Sequence[Sequence[str]], run: TurnRunner,
+                         session_prefix: str = 'conversation', locale: Optional[str] = None) -> List[str]:
+    """
+    Run each conversation (a list of user messages) live with `run`, which tapes them when
+    a recording cassette is configured, and return the replies.
+    """
+    replies: List[str] = []
+    for number, messages in enumerate(conversations, start=1):
+        conversation = ConversationState()
+        for message in messages:
+            inputs = {'user_message': message, 'current_date': datetime.now().isoformat()}
+            if locale:
+                inputs['locale'] = locale
+            context = TurnContext(conversation=conversation, session_id=f"{session_prefix}-{number}")
+            replies.append(reply_text(run(inputs, context)))
+            conversation = context.conversation
+    return replies
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Return the process-wide cassette from `SLOTBOT_CASSETTE`, or None when taping is off."""
+    global _cassette
+    settings = get_settings()
+    if _cassette is None and settings.cassette_path:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(settings.cassette_path, settings.cassette_mode)
+                logger.info("Cassette %s opened for %s", settings.cassette_path, settings.cassette_mode)
+    return _cassette
@@ -0,0 +1,143 @@
+# src/slotbot/clinicians.py
+"""
+The clinicians a deployment books for, and the calendar each one's schedule lives in.
+
+`SLOTBOT_CLINICIANS` points at a YAML file listing them:
+
+    clinicians:
+      - id: tan
+        name: Dr Tan
+        calendar_id: tan@clinic.example
+        time_zone: Asia/Singapore
+      - id: lim
+        name: Dr Lim
+        calendar_id: lim@clinic.example
+
+Without it there is a single clinician on the `primary` calendar, in
+`SLOTBOT_TIME_ZONE` (default `Asia/Singapore`), which is how a solo practice ran before.
+Times patients give ('10am') are wall-clock times in the clinician's own time zone.
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime, tzinfo
+from typing import Iterator, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import yaml
+
+from .settings import get_settings
+
+_TITLE_RE = re.compile(r"^(?:dr|doctor|prof|professor)\b\.?\s*")
+# What patients (and the parser) say when they have no preference.
+ANY_CLINICIAN = ('any', 'anyone', 'any clinician', 'any doctor', 'whoever')
+
+
+def _normalize(name: str) -> str:
+    name = ' '.join(name.lower().split())
+    return _TITLE_RE.sub('', name).strip()
+
+
+@dataclass(frozen=True)
+class Clinician:
+    id: str
+    name: str
+    calendar_id: str
+    time_zone: str = 'Asia/Singapore'
+
+    @property
+    def tz(self) -> tzinfo:
+        return ZoneInfo(self.time_zone)
+
+    @property
+    def aliases(self) -> Tuple[str, ...]:
+        """Lower-case ways a patient may refer to this clinician: the id and the name without a title."""
+        return tuple(dict.fromkeys((self.id.lower(), _normalize(self.name))))
+
+    def localize(self, moment: datetime) -> datetime:
+        """A naive wall-clock time placed in this clinician's time zone; aware times are converted."""
+        return moment.replace(tzinfo=self.tz) if moment.tzinfo is None else moment.astimezone(self.tz)
+
+
+class UnknownClinicianError(ValueError):
+    """No clinician in the registry matches the given name or id."""
+
+
+class ClinicianRegistry:
+    """Clinicians in their configured order; the first one is the default."""
+
+    def __init__(self, clinicians: Sequence[Clinician]):
+        if not clinicians:
+            raise ValueError("The clinician registry needs at least one clinician")
+        self._clinicians = list(clinicians)
+        ids = [c.id for c in self._clinicians]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Clinician ids must be unique")
+        for clinician in self._clinicians:
+            # Fail at startup, not on the first booking, on a misspelt zone.
+            clinician.tz
+
+    @classmethod
+    def from_yaml(cls, path: str, default_time_zone: str = 'Asia/Singapore') -> "ClinicianRegistry":
+        with open(path, encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        return cls([
+            Clinician(id=str(entry['id']), name=str(entry.get('name') or entry['id']),
+                      calendar_id=str(entry.get('calendar_id') or 'primary'),
+                      time_zone=str(entry.get('time_zone') or default_time_zone))
+            for entry in data.get('clinicians') or []
+        ])
+
+    def __iter__(self) -> Iterator[Clinician]:
+        return iter(self._clinicians)
+
+    def __len__(self) -> int:
+        return len(self._clinicians)
+
+    @property
+    def default(self) -> Clinician:
+        return self._clinicians[0]
+
+    def get(self, key: str) -> Clinician:
+        """The clinician with this id, calendar id or name ('Dr Tan', 'tan'); raises UnknownClinicianError."""
+        wanted = _normalize(key)
+        for clinician in self._clinicians:
+            if wanted in clinician.aliases or wanted == clinician.calendar_id.lower():
+                return clinician
+        known = ', '.join(c.name for c in self._clinicians)
+        raise UnknownClinicianError(f"No clinician named {key!r}; the clinicians are {known}")
+
+    def select(self, key: Optional[str] = None) -> List[Clinician]:
+        """
+        [the named clinician], or every clinician when `key` is empty or 'any'. A solo
+        practice has only one clinician to give, whatever name the patient used.
+        """
+        if not key or len(self._clinicians) == 1 or _normalize(key) in ANY_CLINICIAN:
+            return list(self._clinicians)
+        return [self.get(key)]
+
+    def describe(self) -> str:
+        """The clinicians as a line for LLM prompts."""
+        if len(self._clinicians) == 1:
+            return "a single clinician (leave `clinician` null)"
+        return '; '.join(f"{c.name} (id {c.id})" for c in self._clinicians)
+
+
+_registry: Optional[ClinicianRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_clinician_registry() -> ClinicianRegistry:
+    """Return the process-wide registry loaded from `SLOTBOT_CLINICIANS`."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                settings = get_settings()
+                if settings.clinicians_path:
+                    _registry = ClinicianRegistry.from_yaml(settings.clinicians_path, settings.time_zone)
+                else:
+                    _registry = ClinicianRegistry([Clinician('default', 'the clinician', 'primary',
+                                                             settings.time_zone)])
+    return _registry
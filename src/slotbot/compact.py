@@ -0,0 +1,249 @@
+# src/slotbot/compact.py
+"""
+Compact turn engine: at most one structured LLM call per turn instead of the crew.
+
+The call returns a `CompactTurn` (parsed request, session state, search window or
+recurrence, and a reply draft). The calendar tools are then called directly from
+Python, and the reply comes from the response templates, or from the draft when no
+calendar action ran. Messages the fast parser or the parse cache resolve make no LLM
+call at all.
+
+Selected with `SLOTBOT_ENGINE=compact`. `kickoff(inputs, context)` matches
+`CalendarBookingCrew.kickoff`, and turns report the same events, stage timings and
+traces, so the two engines can be compared behind the same API.
+"""
+
+import logging
+import os
+import time
+from typing import Optional, Tuple
+
+import yaml
+from crewai import LLM
+
+from .clinicians import get_clinician_registry
+from .crew import TurnContext, observe_timings, trace_artifacts
+from .fast_parser import fast_parse
+from .gateway_llm import gateway_llm
+from .llm_gateway import lane_for, llm_lane, set_llm_lane
+from .log import correlation
+from .memory import apply_carried_slots, history_prompt, is_fresh, remember_turn
+from .metrics import TOOL_CALL_DURATION, install_crewai_listeners
+from .models import CompactTurn, ConversationState, SessionState, UserInputParsed
+from .parse_cache import get_parse_cache
+from .prefetch import serving, start_prefetch
+from .responses import fallback_response, render_response
+from .router import route_session
+from .settings import get_settings
+from .tools.calendar_tools import (BookAppointmentTool, BookSeriesTool, CancelAppointmentTool, CheckAvailabilityTool,
+                                   FindFreeSlotsTool)
+
+logger = logging.getLogger(__name__)
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), 'config')
+
+
+def _load_config(name: str) -> dict:
+    with open(os.path.join(CONFIG_DIR, name), encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+def default_model() -> str:
+    """`SLOTBOT_COMPACT_LLM`, or the model the crew's parser agent uses."""
+    return get_settings().compact_llm or _load_config('agents.yaml')['nlp_parser']['llm']
+
+
+class CompactEngine:
+    """Runs a turn with one structured LLM call and direct tool calls."""
+
+    def __init__(self, llm=None, conversation: Optional[ConversationState] = None):
+        self.llm = gateway_llm(llm if llm is not None else LLM(model=default_model()))
+        self.context = TurnContext(conversation=conversation or ConversationState())
+        self._prompts = _load_config('compact.yaml')
+        self._check = CheckAvailabilityTool()
+        self._search = FindFreeSlotsTool()
+        self._book = BookAppointmentTool()
+        self._book_series = BookSeriesTool()
+        self._cancel = CancelAppointmentTool()
+        install_crewai_listeners()
+
+    @property
+    def conversation(self) -> ConversationState:
+        return self.context.conversation
+
+    def _emit(self, event: str, data: dict) -> None:
+        if self.context.on_event is not None:
+            self.context.on_event(event, data)
+
+    def kickoff(self, inputs: dict, context: Optional[TurnContext] = None) -> str:
+        """Run one turn and return the reply; same contract as `CalendarBookingCrew.kickoff`."""
+        self.context = context if context is not None else TurnContext(conversation=self.conversation)
+        with correlation(self.context.session_id, self.context.conversation.turns + 1), \
+                llm_lane(lane_for(self.context.conversation)):
+            turn_started = time.perf_counter()
+            self.context.timings = {}
+            try:
+                return self._run_turn(inputs, self.context)
+            finally:
+                if self.context.prefetch is not None:
+                    self.context.prefetch.close()
+                self.context.timings['turn'] = time.perf_counter() - turn_started
+                observe_timings(self.context)
+
+    def _call(self, inputs: dict) -> Optional[CompactTurn]:
+        """The turn's single LLM call; None if its output cannot be read."""
+        values = {
+            'current_date': inputs.get('current_date', ''),
+            'user_message': inputs.get('user_message', ''),
+            'conversation_history': history_prompt(self.context.conversation),
+            'clinicians': get_clinician_registry().describe(),
+        }
+        messages = [
+            {'role': 'system', 'content': self._prompts['system'].format_map(values)},
+            {'role': 'user', 'content': self._prompts['user'].format_map(values)},
+        ]
+        raw = self.llm.call(messages, response_model=CompactTurn)
+        if isinstance(raw, CompactTurn):
+            return raw
+        try:
+            return CompactTurn.model_validate_json(raw[raw.find('{'):raw.rfind('}') + 1])
+        except ValueError as e:
+            logger.warning("Could not read the compact LLM output (%s); treating as a general query", e)
+            return None
+
+    def _parse(self, inputs: dict, context: TurnContext) -> Tuple[UserInputParsed, Optional[CompactTurn]]:
+        """Resolve the message with the fast parser or the parse cache if possible, else the LLM."""
+        message, current_date = inputs.get('user_message', ''), inputs.get('current_date', '')
+        if get_settings().fast_parser_enabled:
+            result = fast_parse(message, current_date, pending_intent=context.conversation.slots.pending_intent,
+                                clinicians=list(get_clinician_registry()))
+            if result.is_confident:
+                context.parse_path = 'fast'
+                return result.parsed, None
+        cache = get_parse_cache()
+        if cache is not None:
+            parsed = cache.get(message, current_date)
+            # A range search needs the search window, which only the LLM call provides.
+            if parsed is not None and route_session(parsed).next_action != 'search_availability':
+                context.parse_path = 'cache'
+                return parsed, None
+
+        context.parse_path = 'compact'
+        # Read the days the message mentions while the LLM call runs.
+        context.prefetch = start_prefetch(message, current_date, context.conversation)
+        turn = self._call(inputs)
+        if turn is None:
+            # Not cached, and no draft: the reply falls back to the generic one.
+            parsed = UserInputParsed(intent='general_query')
+            return parsed, CompactTurn(parsed=parsed, session_state=route_session(parsed), reply='')
+        # Later turns are parsed with the conversation history, so their parse is not reusable.
+        if cache is not None and is_fresh(context.conversation):
+            cache.put(message, current_date, turn.parsed)
+        return turn.parsed, turn
+
+    def _act(self, state: SessionState, parsed: UserInputParsed, turn: Optional[CompactTurn],
+             context: TurnContext) -> Optional[str]:
+        """Call the calendar tool the route needs, if any, and return its output."""
+        start = parsed.start_time
+        duration = int((parsed.end_time - start).total_seconds() // 60) if start and parsed.end_time else 60
+        if state.next_action == 'check_availability' and start is not None:
+            tool, args = self._check, {'date': start.strftime('%Y-%m-%d'), 'time': start.strftime('%H:%M'),
+                                       'duration': duration}
+        elif state.next_action == 'search_availability' and turn is not None and turn.search_window is not None:
+            window = turn.search_window
+            tool, args = self._search, {'start_date': window.start_date.isoformat(),
+                                        'end_date': window.end_date.isoformat(),
+                                        'earliest_time': window.earliest_time, 'latest_time': window.latest_time}
+        elif state.next_action == 'execute_operation' and parsed.intent == 'book' and start is not None:
+            args = {'time': start.strftime('%H:%M'), 'patient_email': parsed.patient_email, 'duration': duration}
+            if turn is not None and turn.recurrence:
+                tool = self._book_series
+                args.update(start_date=start.strftime('%Y-%m-%d'), recurrence=turn.recurrence)
+            else:
+                tool = self._book
+                args['date'] = start.strftime('%Y-%m-%d')
+            # Bookings are keyed on session + slot, as in the crew.
+            tool.session_id = context.session_id
+        elif state.next_action == 'execute_operation' and parsed.intent == 'cancel' and start is not None:
+            tool, args = self._cancel, {'date': start.strftime('%Y-%m-%d'), 'time': start.strftime('%H:%M'),
+                                        'patient_email': parsed.patient_email, 'duration': duration}
+            # Only a booking this session made can be cancelled.
+            tool.session_id = context.session_id
+        else:
+            return None
+        if parsed.clinician:
+            args['clinician'] = parsed.clinician
+
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            output = tool.run(**args)
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            TOOL_CALL_DURATION.observe(elapsed, tool=tool.name, outcome=outcome)
+            context.timings['execute_calendar_action'] = elapsed
+        self._emit('calendar_checked', {'result': output})
+        return output
+
+    def _run_turn(self, inputs: dict, context: TurnContext) -> str:
+        settings = get_settings()
+        locale = inputs.get('locale') or settings.response_locale
+
+        started = time.perf_counter()
+        parsed, turn = self._parse(inputs, context)
+        parsed = context.parsed = apply_carried_slots(parsed, context.conversation)
+        set_llm_lane(lane_for(context.conversation, parsed))
+        context.timings[f'parse_{context.parse_path}'] = time.perf_counter() - started
+        logger.info("Parse path for this turn: %s", context.parse_path)
+        self._emit('parsed', {'parse_path': context.parse_path, 'parsed': parsed.model_dump(mode='json')})
+
+        started = time.perf_counter()
+        state = context.session_state = route_session(parsed)
+        context.timings['route'] = time.perf_counter() - started
+        if turn is not None and turn.session_state.next_action != state.next_action:
+            # The routing rules are deterministic; the model's own state only guides its draft.
+            logger.debug("LLM routed to %r, router to %r; using the router",
+                         turn.session_state.next_action, state.next_action)
+        self._emit('routed', {'session_state': state.model_dump(mode='json')})
+
+        if context.prefetch is not None:
+            context.prefetch.match(parsed, state)
+        with serving(context.prefetch):
+            output = self._act(state, parsed, turn, context)
+
+        started = time.perf_counter()
+        reply = render_response(state, parsed, output, locale)
+        context.timings['render_template'] = time.perf_counter() - started
+        context.response_path = 'template'
+        if reply is None and state.next_action == 'collect_info' and settings.response_llm_fallback:
+            if turn is None:
+                # Pre-parsed, but the reply needs phrasing: this is the turn's one LLM call.
+                turn = self._call(inputs)
+            if turn is not None and turn.reply.strip():
+                reply = turn.reply.strip()
+                context.response_path = 'llm'
+        if reply is None:
+            reply = fallback_response(state, locale)
+        if state.next_action == 'collect_info':
+            self._emit('info_requested', {'result': reply})
+        self._emit('token', {'text': reply})
+        logger.info("Response path for this turn: %s", context.response_path)
+
+        context.conversation = remember_turn(context.conversation.model_copy(update={
+            'turns': context.conversation.turns + 1,
+            'last_parsed': parsed,
+            'last_state': state,
+        }), inputs.get('user_message', ''), reply, parsed, state)
+        source = {'fast': 'fast_parser', 'cache': 'parse_cache'}.get(context.parse_path, 'compact_engine')
+        context.artifacts = {'parse_user_input': {'agent': source, 'output': parsed.model_dump_json()}}
+        if output is not None:
+            context.artifacts['execute_calendar_action'] = {'agent': 'compact_engine', 'output': output}
+        context.artifacts['format_user_response'] = {
+            'agent': 'compact_engine' if context.response_path == 'llm' else 'response_templates',
+            'output': reply,
+        }
+        trace_artifacts(context)
+        return reply
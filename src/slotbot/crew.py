@@ -1,103 +1,160 @@
 # Updated crew.py with None handling logic
 
-import json
 from crewai import Agent, Crew, Process, Task
 from crewai.tools import BaseTool
 from crewai.project import CrewBase, agent, crew, task
-from crewai.tasks.conditional_task import ConditionalTask
 from crewai.tasks.task_output import TaskOutput
+from crewai.tasks.output_format import OutputFormat
 from crewai.agents.agent_builder.base_agent import BaseAgent
-from typing import List
-from .models import SessionState
+from crewai.events import crewai_event_bus
+from crewai.events.event_listener import EventListener
+from crewai.events.types.llm_events import LLMStreamChunkEvent
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import threading
+import time
+from .models import ConversationState
 from .models import BookAppointmentOutput
 from .models import UserInputParsed
-from .tools.calendar_tools import BookAppointmentTool, CheckAvailabilityTool 
+from .tools.calendar_tools import (BookAppointmentTool, BookSeriesTool, CancelAppointmentTool, CheckAvailabilityTool,
+                                   FindFreeSlotsTool)
+from .cassette import run_taped
+from .clinicians import get_clinician_registry
+from .fast_parser import fast_parse
+from .turn_context import TurnContext
+from .gateway_llm import gateway_llm
+from .llm_gateway import lane_for, llm_lane, set_llm_lane
+from .parse_cache import get_parse_cache
+from .prefetch import serving, start_prefetch
+from .memory import apply_carried_slots, history_prompt, is_fresh, remember_turn
+from .responses import fallback_response, render_response
+from .router import route_session
+from .settings import get_settings
+from .trace import get_trace_sink, turn_records
+from .log import correlation, is_verbose_session
+from .metrics import STAGE_DURATION, install_crewai_listeners
+
+logger = logging.getLogger(__name__)
+
+FINAL_ANSWER = 'Final Answer:'
+
+
+class _AnswerStream:
+    """
+    Passes on one task's streamed answer: the LLM text after 'Final Answer:', without the
+    agent's reasoning before it or whitespace around it.
+
+    CrewAI's stream chunks name the agent but not the task (and one agent may run several
+    tasks of a route), so this listens to the LLM chunk events, which carry the task id.
+    """
+
+    def __init__(self, task: Task, send):
+        self.task_id = str(task.id)
+        self.send = send
+        self._before = ''
+        self._answering = False
+        # Whitespace seen since the last text sent; None until the first text is sent.
+        self._space: Optional[str] = None
+
+    def on_chunk(self, _source, event: LLMStreamChunkEvent) -> None:
+        if event.task_id != self.task_id or not event.chunk or event.tool_call is not None:
+            return
+        text = event.chunk
+        if not self._answering:
+            self._before += text
+            at = self._before.find(FINAL_ANSWER)
+            if at < 0:
+                return
+            self._answering = True
+            text = self._before[at + len(FINAL_ANSWER):]
+        if self._space is None:
+            text = text.lstrip()
+        # Whitespace is held back until more text follows, so the reply is never padded.
+        body = text.rstrip()
+        if body:
+            self.send((self._space or '') + body)
+            self._space = text[len(body):]
+        elif self._space is not None:
+            self._space += text
 
 
 @CrewBase
 class CalendarBookingCrew():
-    """Calendar booking crew with conditional task execution"""
+    """Calendar booking crew with deterministic routing between the parse and action stages"""
 
     agents_config = 'config/agents.yaml'
     tasks_config = 'config/tasks.yaml'
 
-    def __init__(self):
-        self._session_state_output = None
+    def __init__(self, conversation: Optional[ConversationState] = None):
+        # State of the current (or last) turn; see TurnContext.
+        self.context = TurnContext(conversation=conversation or ConversationState())
+        # Per-route crews, built once and reused on every later turn that takes the same route.
+        self._crews: Dict[Tuple[Tuple[str, ...], bool], Crew] = {}
+        # CrewAI console output; off unless the session is listed in SLOTBOT_VERBOSE_SESSIONS.
+        self._verbose = False
+        install_crewai_listeners()
+
+    @property
+    def conversation(self) -> ConversationState:
+        return self.context.conversation
+
+    @property
+    def parse_path(self) -> Optional[str]:
+        return self.context.parse_path
 
-    def _save_session_state(self, output: TaskOutput):
-        """Callback function to save the output of the validation task."""
-        print(f"\n--- [CALLBACK] Saving session state ---\nRaw output: {output.raw}\n------------------------------------")
-        self._session_state_output = output
+    def _emit(self, event: str, data: Dict[str, Any]) -> None:
+        if self.context.on_event is not None:
+            self.context.on_event(event, data)
+
+    def _on_action_done(self, output: TaskOutput):
+        """Task callback: report the outcome of the action stage to the progress listener."""
+        event = 'info_requested' if output.name == 'collect_missing_information' else 'calendar_checked'
+        self._emit(event, {'result': output.raw})
 
     @agent
     def nlp_parser(self) -> Agent:
         return Agent(
             config=self.agents_config['nlp_parser'],
-            verbose=True
-        )
-
-    @agent
-    def session_manager(self) -> Agent:
-        return Agent(
-            config=self.agents_config['session_manager'],
-            verbose=True
+            llm=gateway_llm(self.agents_config['nlp_parser']['llm']),
+            verbose=False
         )
 
     @agent
     def calendar_manager(self) -> Agent:
         return Agent(
             config=self.agents_config['calendar_manager'],
-            verbose=True,
-            tools=[BookAppointmentTool(), CheckAvailabilityTool()]
+            llm=gateway_llm(self.agents_config['calendar_manager']['llm']),
+            verbose=False,
+            tools=[BookAppointmentTool(), BookSeriesTool(), CancelAppointmentTool(), CheckAvailabilityTool(),
+                   FindFreeSlotsTool()]
         )
 
     @agent
     def response_agent(self) -> Agent:
         return Agent(
             config=self.agents_config['response_agent'],
-            verbose=True
+            llm=gateway_llm(self.agents_config['response_agent']['llm']),
+            verbose=False
         )
 
     def _get_next_action(self) -> str:
-        """Helper function to safely extract next_action from the stored session state."""
-        print("\n--- [DEBUG] In _get_next_action ---")
-        
-        if not self._session_state_output:
-            print("Stored session state is None. Returning 'default'.")
-            return "default"
-            
-        raw_output = getattr(self._session_state_output, 'raw', None)
-        print(f"Reading from stored raw output: '{raw_output}'")
-
-        if not raw_output:
-            print("Stored raw output is empty or None. Returning 'default'.")
-            return "default"
-
-        try:
-            data = json.loads(raw_output)
-            next_action = data.get('next_action', 'default')
-            print(f"Successfully parsed next_action from stored state: '{next_action}'")
-            return next_action
-        except json.JSONDecodeError as e:
-            print(f"JSONDecodeError parsing stored raw output: {e}. Raw content was: '{raw_output}'")
-            return "default"
-        except Exception as e:
-            print(f"An unexpected error occurred in _get_next_action: {e}")
+        """Helper function to read next_action from the routed session state."""
+        if self.context.session_state is None:
+            logger.debug("No session state routed yet; returning 'default'")
             return "default"
+        return self.context.session_state.next_action
 
-    def should_collect_info(self, validation_output: TaskOutput) -> bool:
+    def should_collect_info(self) -> bool:
         """Condition to run the 'collect_missing_information' task."""
-        # This function now ignores the validation_output and uses the stored state.
         next_action = self._get_next_action()
-        print(f"[DEBUG] Condition for 'collect_info': next_action is '{next_action}'")
+        logger.debug("Condition for 'collect_info': next_action is %r", next_action)
         return next_action == 'collect_info'
 
-    def should_execute_action(self, validation_output: TaskOutput) -> bool:
+    def should_execute_action(self) -> bool:
         """Condition to run the main action task."""
-        # This function now ignores the validation_output and uses the stored state.
         next_action = self._get_next_action()
-        print(f"[DEBUG] Condition for 'execute_action': next_action is '{next_action}'")
-        return next_action in ['check_availability', 'execute_operation']
+        logger.debug("Condition for 'execute_action': next_action is %r", next_action)
+        return next_action in ['check_availability', 'search_availability', 'execute_operation']
 
     @task
     def parse_user_input(self) -> Task:
@@ -107,28 +164,20 @@ class CalendarBookingCrew():
         )
 
     @task
-    def validate_session_state(self) -> Task:
+    def collect_missing_information(self) -> Task:
         return Task(
-            config=self.tasks_config['validate_session_state'],
-            output_pydantic=SessionState,
-            callback=self._save_session_state
-        )
-
-    @task
-    def collect_missing_information(self) -> ConditionalTask:
-        return ConditionalTask(
             config=self.tasks_config['collect_missing_information'],
-            condition=self.should_collect_info,
-            agent=self.response_agent()
+            agent=self.response_agent(),
+            callback=self._on_action_done
         )
 
     @task
-    def execute_calendar_action(self) -> ConditionalTask:
-        return ConditionalTask(
+    def execute_calendar_action(self) -> Task:
+        return Task(
             config=self.tasks_config['execute_calendar_action'],
-            condition=self.should_execute_action,
             agent=self.calendar_manager(),
-            context=[self.parse_user_input(), self.validate_session_state()]
+            context=[self.parse_user_input()],
+            callback=self._on_action_done
         )
 
     @task
@@ -141,18 +190,354 @@ class CalendarBookingCrew():
             ]
         )
 
+    def _prefill_parse(self, parsed: UserInputParsed, source: str) -> UserInputParsed:
+        """Record `parsed` as the parse task's output without running the task."""
+        parse_task = self.parse_user_input()
+        # Downstream tasks read parse_user_input through `context`, which only needs its output.
+        parse_task.output = TaskOutput(
+            description=parse_task.description,
+            name='parse_user_input',
+            raw=parsed.model_dump_json(),
+            pydantic=parsed,
+            agent=source,
+            output_format=OutputFormat.PYDANTIC,
+        )
+        return parsed
+
+    def _prefill_response(self, text: str) -> TaskOutput:
+        """Record a templated reply as the format task's output without running the task."""
+        format_task = self.format_user_response()
+        format_task.output = TaskOutput(
+            description=format_task.description,
+            name='format_user_response',
+            raw=text,
+            agent='response_templates',
+            output_format=OutputFormat.RAW,
+        )
+        # Streaming clients get the whole reply as a single chunk.
+        self._emit('token', {'text': text})
+        return format_task.output
+
+    def _fast_parse(self, inputs: dict) -> Optional[UserInputParsed]:
+        """Run the rule-based parser and, if confident, pre-fill the parse task's output."""
+        if not get_settings().fast_parser_enabled:
+            return None
+
+        result = fast_parse(inputs.get('user_message', ''), inputs.get('current_date', ''),
+                            pending_intent=self.context.conversation.slots.pending_intent,
+                            clinicians=list(get_clinician_registry()))
+        if not result.is_confident:
+            logger.debug("Fast parser not confident (%.2f): %s", result.confidence, result.reasons)
+            return None
+        return self._prefill_parse(result.parsed, 'fast_parser')
+
+    def _cached_parse(self, inputs: dict) -> Optional[UserInputParsed]:
+        """Reuse an earlier LLM parse of an equivalent message, if the parse cache has one."""
+        cache = get_parse_cache()
+        if cache is None:
+            return None
+        parsed = cache.get(inputs.get('user_message', ''), inputs.get('current_date', ''))
+        if parsed is None:
+            return None
+        return self._prefill_parse(parsed, 'parse_cache')
+
+    def _llm_parse(self, inputs: dict) -> UserInputParsed:
+        """Run the `parse_user_input` task on its own and return its typed output."""
+        output = self._build_crew([self.parse_user_input()]).kickoff(inputs=inputs)
+        if isinstance(output.pydantic, UserInputParsed):
+            parsed = output.pydantic
+        else:
+            try:
+                parsed = UserInputParsed.model_validate_json(output.raw)
+            except ValueError as e:
+                logger.warning("Could not read parse_user_input output (%s); treating as a general query", e)
+                return UserInputParsed(intent='general_query')
+
+        cache = get_parse_cache()
+        # Later turns are parsed with the conversation history, so their parse is not reusable.
+        if cache is not None and is_fresh(self.context.conversation):
+            cache.put(inputs.get('user_message', ''), inputs.get('current_date', ''), parsed)
+        return parsed
+
+    def _build_crew(self, tasks: List[Task], stream: bool = False) -> Crew:
+        key = (tuple(t.name for t in tasks), stream)
+        cached = self._crews.get(key)
+        if cached is not None:
+            return cached
+
+        agents = []
+        for t in tasks:
+            if t.agent is not None and t.agent not in agents:
+                agents.append(t.agent)
+        built = Crew(
+            agents=agents,
+            tasks=tasks,
+            process=Process.sequential,
+            verbose=self._verbose,
+            stream=stream,
+            # Tool results depend on the calendar and the session, not only on the arguments;
+            # a cached result could be another session's or stale.
+            cache=False,
+        )
+        self._crews[key] = built
+        return built
+
+    def _kickoff_streaming(self, crew_to_run: Crew, inputs: dict):
+        """Kick off with streaming on, forwarding the `format_user_response` answer as it arrives."""
+        answer = _AnswerStream(self.format_user_response(), lambda text: self._emit('token', {'text': text}))
+        # Chunk events are handled on the thread that emits them, in order.
+        crewai_event_bus.register_handler(LLMStreamChunkEvent, answer.on_chunk)
+        try:
+            streaming = crew_to_run.kickoff(inputs=inputs)
+            for _ in streaming:
+                pass
+            return streaming.result
+        finally:
+            crewai_event_bus.off(LLMStreamChunkEvent, answer.on_chunk)
+
+    def kickoff(self, inputs: dict, context: Optional[TurnContext] = None):
+        """
+        Run one turn of the pipeline: parse (rule-based when possible, then the parse
+        cache, the LLM otherwise), route in Python, then run only the tasks the route
+        calls for.
+
+        `context` carries the session's conversation state in and out. Without one the
+        crew continues its own conversation from the previous kickoff. If the context
+        has an `on_event` listener it is called with stage events as the turn progresses
+        ('parsed', 'routed', 'calendar_checked' or 'info_requested', then one 'token'
+        event per streamed chunk of the final response).
+        """
+        self.context = context if context is not None else TurnContext(conversation=self.conversation)
+        with correlation(self.context.session_id, self.context.conversation.turns + 1), \
+                llm_lane(lane_for(self.context.conversation)):
+            self._set_verbose(is_verbose_session(self.context.session_id))
+            try:
+                return self._run_turn(inputs, self.context)
+            finally:
+                self._set_verbose(False)
+
+    def _set_verbose(self, verbose: bool) -> None:
+        """
+        Switch CrewAI's console output for this crew's agents and route crews.
+
+        The agents and crews belong to this thread, but CrewAI's console event listener
+        is process-wide, so other turns running at the same time may print too.
+        """
+        if verbose == self._verbose:
+            return
+        self._verbose = verbose
+        for a in (self.nlp_parser(), self.calendar_manager(), self.response_agent()):
+            a.verbose = verbose
+        for c in self._crews.values():
+            c.verbose = verbose
+        listener = EventListener()
+        listener.verbose = verbose
+        listener.formatter.verbose = verbose
+
+    def _run_turn(self, inputs: dict, context: TurnContext):
+        turn_started = time.perf_counter()
+        context.timings = {}
+        try:
+            return self._run_stages(inputs, context)
+        finally:
+            if context.prefetch is not None:
+                context.prefetch.close()
+            context.timings['turn'] = time.perf_counter() - turn_started
+            observe_timings(context)
+
+    def _run_stages(self, inputs: dict, context: TurnContext):
+        full_crew = self.crew()
+        inputs = {**inputs, 'conversation_history': history_prompt(context.conversation),
+                  'clinicians': get_clinician_registry().describe()}
+        # Tasks are reused across turns; clear last turn's outputs so they don't leak into context.
+        for t in full_crew.tasks:
+            t.output = None
+        # Bookings are keyed on session + slot, so a repeated request books nothing new
+        # (and a cancellation finds only this session's own booking).
+        for tool in self.calendar_manager().tools:
+            if isinstance(tool, (BookAppointmentTool, BookSeriesTool, CancelAppointmentTool)):
+                tool.session_id = context.session_id
+
+        started = time.perf_counter()
+        parsed = self._fast_parse(inputs)
+        if parsed is not None:
+            context.parse_path = 'fast'
+        else:
+            parsed = self._cached_parse(inputs)
+            if parsed is not None:
+                context.parse_path = 'cache'
+            else:
+                context.parse_path = 'llm'
+                # Read the days the message mentions while the LLM parses it.
+                context.prefetch = start_prefetch(inputs.get('user_message', ''), inputs.get('current_date', ''),
+                                                  context.conversation)
+                parsed = self._llm_parse(inputs)
+        merged = apply_carried_slots(parsed, context.conversation)
+        if merged is not parsed:
+            # Downstream tasks read the parse task's output, so it must carry the merged fields.
+            parsed = self._prefill_parse(merged, str(self.parse_user_input().output.agent))
+        context.parsed = parsed
+        set_llm_lane(lane_for(context.conversation, parsed))
+        context.timings[f'parse_{context.parse_path}'] = time.perf_counter() - started
+        logger.info("Parse path for this turn: %s", context.parse_path)
+        self._emit('parsed', {'parse_path': context.parse_path, 'parsed': parsed.model_dump(mode='json')})
+
+        started = time.perf_counter()
+        context.session_state = route_session(parsed)
+        context.timings['route'] = time.perf_counter() - started
+        self._emit('routed', {'session_state': context.session_state.model_dump(mode='json')})
+
+        if context.prefetch is not None:
+            context.prefetch.match(parsed, context.session_state)
+
+        turn_inputs = {**inputs, 'session_state': context.session_state.model_dump_json()}
+        with serving(context.prefetch):
+            if get_settings().response_templates:
+                tasks, result = self._run_templated(turn_inputs, context)
+            else:
+                tasks: List[Task] = []
+                if self.should_collect_info():
+                    tasks.append(self.collect_missing_information())
+                elif self.should_execute_action():
+                    tasks.append(self.execute_calendar_action())
+                tasks.append(self.format_user_response())
+                context.response_path = 'llm'
+                result = self._kickoff(tasks, turn_inputs, context)
+        logger.info("Response path for this turn: %s", context.response_path)
+
+        for t in tasks:
+            if t.output is not None and t.execution_duration is not None:
+                context.timings[t.name] = t.execution_duration
+
+        conversation = context.conversation.model_copy(update={
+            'turns': context.conversation.turns + 1,
+            'last_parsed': parsed,
+            'last_state': context.session_state,
+        })
+        reply = result.raw if hasattr(result, 'raw') else str(result)
+        context.conversation = remember_turn(
+            conversation, inputs.get('user_message', ''), reply, parsed, context.session_state)
+        self._record_artifacts(context, full_crew.tasks)
+        return result
+
+    def _run_templated(self, inputs: dict, context: TurnContext) -> Tuple[List[Task], Any]:
+        """
+        Run the action stage, then answer from a template if the outcome is a known one.
+
+        Questions about missing details need no LLM call at all; the `format_user_response`
+        LLM call is left for general queries and results the templates don't recognise.
+        Returns the tasks that ran and the turn's result.
+        """
+        settings = get_settings()
+        locale = inputs.get('locale') or settings.response_locale
+        state = context.session_state
+        tasks: List[Task] = []
+        rendered = None
+
+        if self.should_collect_info():
+            rendered = render_response(state, context.parsed, None, locale)
+            if rendered is None:
+                tasks.append(self.collect_missing_information())
+            else:
+                self._emit('info_requested', {'result': rendered})
+        elif self.should_execute_action():
+            tasks.append(self.execute_calendar_action())
+
+        if tasks:
+            self._build_crew(tasks).kickoff(inputs=inputs)
+            action = self.execute_calendar_action()
+            if action in tasks and action.output is not None:
+                started = time.perf_counter()
+                rendered = render_response(state, context.parsed, action.output.raw, locale)
+                context.timings['render_template'] = time.perf_counter() - started
+
+        if rendered is None and not settings.response_llm_fallback:
+            rendered = fallback_response(state, locale)
+        if rendered is not None:
+            context.response_path = 'template'
+            return tasks, self._prefill_response(rendered)
+
+        context.response_path = 'llm'
+        format_task = self.format_user_response()
+        result = self._kickoff([format_task], inputs, context)
+        return tasks + [format_task], result
+
+    def _kickoff(self, tasks: List[Task], inputs: dict, context: TurnContext):
+        if context.on_event is not None:
+            return self._kickoff_streaming(self._build_crew(tasks, stream=True), inputs)
+        return self._build_crew(tasks).kickoff(inputs=inputs)
+
+    def _record_artifacts(self, context: TurnContext, tasks: List[Task]) -> None:
+        """Keep this turn's task outputs on the context and hand them to the trace sink, if any."""
+        context.artifacts = {
+            t.name: {'agent': str(t.output.agent), 'output': t.output.raw}
+            for t in tasks if t.output is not None
+        }
+        trace_artifacts(context)
+
     @crew
     def crew(self) -> Crew:
-        """Creates the calendar booking crew with conditional tasks"""
+        """Creates the calendar booking crew; `kickoff` picks the tasks each turn actually runs"""
         return Crew(
             agents=self.agents,
             tasks=[
                 self.parse_user_input(),
-                self.validate_session_state(),
                 self.collect_missing_information(),
                 self.execute_calendar_action(),
                 self.format_user_response()
             ],
             process=Process.sequential,
-            verbose=True,
+            verbose=False,
+            cache=False,
         )
+
+
+def observe_timings(context: TurnContext) -> None:
+    """Export the turn's stage timings to the stage-duration histogram."""
+    intent = context.parsed.intent if context.parsed is not None else ''
+    next_action = context.session_state.next_action if context.session_state is not None else ''
+    for stage, seconds in context.timings.items():
+        STAGE_DURATION.observe(seconds, stage=stage, intent=intent, next_action=next_action)
+
+
+def trace_artifacts(context: TurnContext) -> None:
+    """Hand the turn's artifacts to the trace sink, if one is configured."""
+    sink = get_trace_sink()
+    if sink is not None:
+        for record in turn_records(context.session_id, context.conversation.turns, context.artifacts):
+            sink.record(record)
+
+
+_compiled = threading.local()
+
+
+def get_compiled_crew():
+    """
+    Return this thread's compiled crew, building it on first use.
+
+    Loading the YAML configs and constructing agents, tools and tasks happens once per
+    thread instead of once per session or turn. CrewAI agents and tasks hold execution
+    state while they run, so one compiled crew is never shared between threads; with a
+    fixed worker pool that means one compiled crew per worker.
+
+    With `SLOTBOT_ENGINE=compact` this is a `CompactEngine` instead, which has the same
+    `kickoff(inputs, context)` interface.
+    """
+    compiled = getattr(_compiled, 'crew', None)
+    if compiled is None:
+        if get_settings().engine == 'compact':
+            from .compact import CompactEngine
+            compiled = CompactEngine()
+        else:
+            compiled = CalendarBookingCrew()
+            compiled.crew()
+        _compiled.crew = compiled
+    return compiled
+
+
+def run_turn(inputs: dict, context: TurnContext):
+    """
+    Run one turn on this thread's compiled crew; `context` is updated in place. With a
+    cassette configured the turn is recorded, or replayed from it.
+    """
+    return run_taped(lambda i, c: get_compiled_crew().kickoff(inputs=i, context=c), inputs, context)
@@ -0,0 +1,297 @@
+# src/slotbot/fast_parser.py
+"""
+Deterministic, rule-based parser that runs in front of the `nlp_parser` LLM task.
+
+Most booking messages are simple ("tuesday 5 pm, foo@bar.com"), so they can be
+resolved into a `UserInputParsed` locally. Anything the rules cannot resolve with
+certainty lowers the confidence score and the crew falls back to the LLM task.
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from .clinicians import Clinician
+from .models import UserInputParsed
+
+# Minimum confidence for the fast path to be trusted over the LLM task.
+FAST_PATH_CONFIDENCE = 0.9
+# Penalty for each soft guess the rules had to make (weak intent cue, bare 24h clock time).
+SOFT_GUESS_PENALTY = 0.2
+DEFAULT_DURATION_MINUTES = 60
+# Longest duration the rules accept; anything longer is more likely a misreading.
+MAX_DURATION_MINUTES = 8 * 60
+
+EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+
+INTENT_KEYWORDS = {
+    'cancel': re.compile(r"\b(cancel|delete|remove|call off)\b"),
+    'check_availability': re.compile(
+        r"\b(available|availability|free|open slots?|any slots?|openings?)\b"
+    ),
+    'book': re.compile(r"\b(book|booking|schedule|reserve)\b"),
+}
+# "appointment" alone usually means booking, but it also shows up in small talk.
+WEAK_BOOK_RE = re.compile(r"\bappointments?\b")
+GREETING_RE = re.compile(r"^\s*(hi|hello|hey|good (morning|afternoon|evening)|thanks|thank you)\b[\s!.,]*$")
+
+# Phrases the rules deliberately do not try to resolve; seeing one means the LLM decides.
+AMBIGUOUS_RE = re.compile(
+    r"\b(not|don't|dont|can't|cant|won't|instead|reschedule|move|change|"
+    r"morning|afternoon|evening|night|tonight|weekend|week|month|"
+    r"later|soon|asap|earliest|latest|before|after|between|around|ish|or)\b"
+)
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MONTHS = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+          'august', 'september', 'october', 'november', 'december']
+_MONTH_ALT = "|".join(m[:3] + r"[a-z]*" for m in MONTHS)
+
+ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+MONTH_DAY_RE = re.compile(r"\b(" + _MONTH_ALT + r")\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b")
+DAY_MONTH_RE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(" + _MONTH_ALT + r")\b")
+RELATIVE_DAY_RE = re.compile(r"\b(today|tomorrow|day after tomorrow)\b")
+WEEKDAY_RE = re.compile(r"\b(next |this )?(" + "|".join(WEEKDAYS) + r")\b")
+
+TIME_12H_RE = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)")
+TIME_24H_RE = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b")
+NAMED_TIME_RE = re.compile(r"\b(noon|midday|midnight)\b")
+DURATION_RE = re.compile(r"\bfor\s+(\d{1,3})\s*(minutes?|mins?|hours?|hrs?|h)\b")
+# Duration wording DURATION_RE did not consume ('1.5 hours', '1h30', 'half an hour').
+DURATION_WORD_RE = re.compile(r"\b(\d+(?:\.\d+)?\s*h\d*|hours?|hrs?|minutes?|mins?|half)\b")
+# A title in a multi-clinician practice means someone is being asked for by name.
+TITLE_RE = re.compile(r"\b(dr|doctor|doc|prof|professor)\b")
+
+
+@dataclass
+class FastParseResult:
+    """Outcome of the rule-based parser, with the reasons that lowered its confidence."""
+    parsed: Optional[UserInputParsed]
+    confidence: float
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def is_confident(self) -> bool:
+        return self.parsed is not None and self.confidence >= FAST_PATH_CONFIDENCE
+
+
+def _month_index(token: str) -> int:
+    return [m[:3] for m in MONTHS].index(token[:3]) + 1
+
+
+def _resolve_dates(text: str, today: date) -> List[date]:
+    """Collect every absolute date the message refers to."""
+    found: List[date] = []
+
+    for y, m, d in ISO_DATE_RE.findall(text):
+        found.append(date(int(y), int(m), int(d)))
+
+    month_days = [(mon, day) for mon, day in MONTH_DAY_RE.findall(text)]
+    month_days += [(mon, day) for day, mon in DAY_MONTH_RE.findall(text)]
+    for mon, day in month_days:
+        candidate = date(today.year, _month_index(mon), int(day))
+        if candidate < today:
+            candidate = candidate.replace(year=today.year + 1)
+        found.append(candidate)
+
+    for match in RELATIVE_DAY_RE.findall(text):
+        offset = {'today': 0, 'tomorrow': 1, 'day after tomorrow': 2}[match]
+        found.append(today + timedelta(days=offset))
+
+    for _, weekday in WEEKDAY_RE.findall(text):
+        # "tuesday" and "next tuesday" both mean the next occurrence after today.
+        delta = (WEEKDAYS.index(weekday) - today.weekday()) % 7 or 7
+        found.append(today + timedelta(days=delta))
+
+    return sorted(set(found))
+
+
+def candidate_dates(user_message: str, current_date: str) -> List[date]:
+    """
+    The days a message mentions, whether or not the rest of it can be parsed here.
+
+    Used to start reading availability before the LLM has parsed the message; an
+    unreadable `current_date` or an impossible date ('31 february') gives no days.
+    """
+    try:
+        today = datetime.fromisoformat(current_date).date()
+        return _resolve_dates(EMAIL_RE.sub(" ", user_message.lower()), today)
+    except (TypeError, ValueError):
+        return []
+
+
+def _resolve_times(text: str) -> Tuple[List[time], bool]:
+    """Collect every clock time the message refers to, flagging bare early 24h times."""
+    found: List[time] = []
+    guessed = False
+
+    for hour, minute, meridiem in TIME_12H_RE.findall(text):
+        hour_i, minute_i = int(hour), int(minute or 0)
+        if not 1 <= hour_i <= 12 or minute_i > 59:
+            continue
+        if meridiem.startswith('p') and hour_i != 12:
+            hour_i += 12
+        elif meridiem.startswith('a') and hour_i == 12:
+            hour_i = 0
+        found.append(time(hour_i, minute_i))
+
+    # Strip 12h matches first so "5:30 pm" is not also read as a 24h "5:30".
+    for hour, minute in TIME_24H_RE.findall(TIME_12H_RE.sub(" ", text)):
+        # "5:30" is more often an afternoon slot than a 5 am one.
+        guessed = guessed or int(hour) < 8
+        found.append(time(int(hour), int(minute)))
+
+    for match in NAMED_TIME_RE.findall(text):
+        found.append(time(0, 0) if match == 'midnight' else time(12, 0))
+
+    return sorted(set(found)), guessed
+
+
+def _resolve_duration(text: str) -> Tuple[int, List[str]]:
+    """Return the requested duration in minutes, defaulting to 60, and any blocking reasons."""
+    matches = DURATION_RE.findall(text)
+    if len(matches) > 1:
+        return DEFAULT_DURATION_MINUTES, ['multiple durations']
+    if DURATION_WORD_RE.search(DURATION_RE.sub(" ", text)):
+        # Wording the rules can't read would otherwise fall back to the default silently.
+        return DEFAULT_DURATION_MINUTES, ['unresolved duration']
+    if not matches:
+        return DEFAULT_DURATION_MINUTES, []
+    amount, unit = int(matches[0][0]), matches[0][1]
+    minutes = amount * 60 if unit.startswith('h') else amount
+    if not 0 < minutes <= MAX_DURATION_MINUTES:
+        return DEFAULT_DURATION_MINUTES, [f"duration out of range: {minutes} minutes"]
+    return minutes, []
+
+
+def _detect_intent(text: str) -> Tuple[Optional[str], bool, List[str]]:
+    """Return the intent, whether it rests on a weak cue, and any blocking reasons."""
+    matched = [intent for intent, pattern in INTENT_KEYWORDS.items() if pattern.search(text)]
+    if len(matched) == 1:
+        return matched[0], False, []
+    if len(matched) > 1:
+        return None, False, [f"conflicting intents: {', '.join(matched)}"]
+    if WEAK_BOOK_RE.search(text):
+        return 'book', True, []
+    if GREETING_RE.match(text):
+        return 'general_query', False, []
+    return None, False, ['no intent keyword']
+
+
+def _resolve_clinician(text: str, clinicians: Sequence[Clinician]) -> Tuple[Optional[str], List[str]]:
+    """The registered clinician the message names, and any blocking reasons."""
+    if len(clinicians) < 2:
+        return None, []
+    named = [c for c in clinicians
+             if any(re.search(r"\b" + re.escape(alias) + r"\b", text) for alias in c.aliases)]
+    if len(named) > 1:
+        return None, ['several clinicians named']
+    if named:
+        return named[0].name, []
+    if TITLE_RE.search(text):
+        return None, ['unrecognised clinician']
+    return None, []
+
+
+def fast_parse(user_message: str, current_date: str, pending_intent: Optional[str] = None,
+               clinicians: Sequence[Clinician] = ()) -> FastParseResult:
+    """
+    Parse `user_message` into a `UserInputParsed` without calling the LLM.
+
+    `current_date` is the same ISO string the crew receives and is used to resolve
+    relative expressions ('tomorrow', 'tuesday'). The returned confidence is 1.0 only
+    when every piece of the message was resolved unambiguously.
+
+    `pending_intent` is the intent of a request from an earlier turn that is still
+    waiting for details; a message with no intent keyword that supplies an email or a
+    date and time is read as answering it.
+
+    With more than one of `clinicians`, a clinician named in the message is filled in,
+    and a title ('Dr ...') that names none of them is left to the LLM.
+    """
+    text = user_message.lower()
+    try:
+        now = datetime.fromisoformat(current_date)
+    except (TypeError, ValueError):
+        return FastParseResult(parsed=None, confidence=0.0, reasons=['unparseable current_date'])
+
+    reasons: List[str] = []
+    confidence = 1.0
+
+    # Remove emails before scanning for keywords, times and dates.
+    emails = EMAIL_RE.findall(user_message)
+    scrubbed = EMAIL_RE.sub(" ", text)
+
+    intent, weak_intent, intent_reasons = _detect_intent(scrubbed)
+    reasons += intent_reasons
+
+    if len(set(e.lower() for e in emails)) > 1:
+        reasons.append('multiple emails')
+
+    clinician, clinician_reasons = _resolve_clinician(scrubbed, clinicians)
+    reasons += clinician_reasons
+
+    ambiguous = sorted(set(AMBIGUOUS_RE.findall(RELATIVE_DAY_RE.sub(" ", scrubbed))))
+    if ambiguous:
+        reasons.append(f"unresolved phrasing: {', '.join(ambiguous)}")
+
+    try:
+        dates = _resolve_dates(scrubbed, now.date())
+    except ValueError:
+        dates, reasons = [], reasons + ['invalid calendar date']
+    times, guessed_time = _resolve_times(scrubbed)
+    duration, duration_reasons = _resolve_duration(scrubbed)
+    reasons += duration_reasons
+
+    if len(dates) > 1:
+        reasons.append('multiple dates')
+    if len(times) > 1:
+        reasons.append('multiple times')
+    if bool(dates) != bool(times):
+        # A date without a time (or the reverse) needs judgement the rules don't have.
+        reasons.append('partial date/time')
+
+    if (intent is None and pending_intent is not None and intent_reasons == ['no intent keyword']
+            and (emails or (dates and times))):
+        intent = pending_intent
+        reasons.remove('no intent keyword')
+
+    if reasons or intent is None:
+        # Every reason collected so far is blocking.
+        return FastParseResult(parsed=None, confidence=0.0, reasons=reasons)
+
+    start_time = end_time = None
+    if dates and times:
+        # In the offset of `current_date`, if it has one, so it compares with `now`.
+        start_time = datetime.combine(dates[0], times[0], tzinfo=now.tzinfo)
+        if start_time < now:
+            return FastParseResult(parsed=None, confidence=0.0, reasons=['start_time in the past'])
+        end_time = start_time + timedelta(minutes=duration)
+
+    if weak_intent:
+        confidence -= SOFT_GUESS_PENALTY
+        reasons.append("intent inferred from 'appointment' only")
+    if guessed_time:
+        confidence -= SOFT_GUESS_PENALTY
+        reasons.append('24h time without am/pm')
+
+    missing_info: List[str] = []
+    if intent in ('book', 'cancel'):
+        if start_time is None:
+            missing_info.append('start_time')
+        if not emails:
+            missing_info.append('patient_email')
+    elif intent == 'check_availability' and start_time is None:
+        missing_info.append('start_time')
+
+    parsed = UserInputParsed(
+        intent=intent,
+        patient_email=emails[0] if emails else None,
+        start_time=start_time,
+        end_time=end_time,
+        temporal_expression=None,
+        clinician=clinician,
+        missing_info=missing_info,
+    )
+    return FastParseResult(parsed=parsed, confidence=confidence, reasons=reasons)
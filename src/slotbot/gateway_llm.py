@@ -0,0 +1,103 @@
+# src/slotbot/gateway_llm.py
+"""
+CrewAI side of the LLM gateway: `gateway_llm()` wraps an agent's LLM so that every
+call it makes goes through the process-wide `LLMGateway` (see llm_gateway.py).
+
+Relies on the call-scoped stop/stream overrides of CrewAI 1.x (pinned in pyproject.toml).
+"""
+
+from typing import Any, Optional
+
+from crewai.llms.base_llm import BaseLLM, call_stop_override, call_stream_override
+
+from .cassette import current_tape
+from .llm_gateway import estimate_tokens, get_llm_gateway, prompt_key
+from .settings import get_settings
+
+try:
+    # CrewAI retries throttled calls per LLM instance; inside the gateway that would
+    # hide 429s from the shared backoff, so calls made here mark that retry as active.
+    from crewai.llms.retry import _active_llm_rate_limit_retry
+except ImportError:  # CrewAI versions without their own retry wrapper
+    _active_llm_rate_limit_retry = None
+
+
+class GatewayLLM(BaseLLM):
+    """
+    A CrewAI LLM that sends every call of the wrapped LLM through the gateway.
+
+    Stop words and streaming set on the wrapper (CrewAI sets both on the agent's LLM)
+    are passed on to the wrapped LLM for each call.
+    """
+
+    inner: BaseLLM
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        stream = bool(self._effective_stream())
+        # Calls that may run tools or stream tokens to this turn's listener are never shared.
+        key = None
+        if available_functions is None and not stream:
+            key = prompt_key(self.inner.model, messages, response_model)
+        max_output = int(self.inner.max_tokens or get_settings().llm_output_tokens)
+
+        def send():
+            with call_stop_override(self.inner, self.stop_sequences), call_stream_override(self.inner, stream):
+                token = _active_llm_rate_limit_retry.set(True) if _active_llm_rate_limit_retry else None
+                try:
+                    return self.inner.call(messages, tools=tools, callbacks=callbacks,
+                                           available_functions=available_functions, from_task=from_task,
+                                           from_agent=from_agent, response_model=response_model)
+                finally:
+                    if token is not None:
+                        _active_llm_rate_limit_retry.reset(token)
+
+        def usage(response: Any) -> Optional[int]:
+            # Measured from this call's own prompt and reply: the wrapped LLM's running
+            # token total is shared with calls made concurrently on other workers.
+            return estimate_tokens(messages, 0) + estimate_tokens(str(response or ''), 0) or None
+
+        def through_gateway():
+            if not get_settings().llm_gateway_enabled:
+                # Wrapped only to be taped; calls go straight to the model.
+                return send()
+            return get_llm_gateway().call(send, estimate_tokens(messages, max_output), key=key, usage=usage)
+
+        tape = current_tape()
+        if tape is None:
+            return through_gateway()
+        return tape.llm_call(self.inner.model, key or prompt_key(self.inner.model, messages, response_model),
+                             through_gateway, response_model)
+
+    # Admission, retries and backoff are the gateway's; keep CrewAI's per-instance retry off this method.
+    call._crewai_rate_limit_wrapped = True
+
+    def supports_function_calling(self) -> bool:
+        # Not every BaseLLM defines it; CrewAI treats a missing method as no native tool calling.
+        supports = getattr(self.inner, 'supports_function_calling', None)
+        return bool(supports()) if callable(supports) else False
+
+    def supports_stop_words(self) -> bool:
+        return self.inner.supports_stop_words()
+
+    def get_context_window_size(self) -> int:
+        return self.inner.get_context_window_size()
+
+    def get_token_usage_summary(self):
+        return self.inner.get_token_usage_summary()
+
+
+def gateway_llm(llm: Any) -> Any:
+    """
+    Wrap `llm` (a model name or CrewAI LLM) so its calls go through the gateway.
+
+    Returns `llm` unchanged when it is already wrapped, or when `SLOTBOT_LLM_GATEWAY` is
+    off and no cassette (`SLOTBOT_CASSETTE`) needs its calls taped.
+    """
+    settings = get_settings()
+    if isinstance(llm, GatewayLLM) or not (settings.llm_gateway_enabled or settings.cassette_path):
+        return llm
+    if isinstance(llm, str):
+        from crewai import LLM
+        llm = LLM(model=llm)
+    return GatewayLLM(model=llm.model, inner=llm, stop=list(llm.stop), stream=llm.stream)
@@ -3,17 +3,37 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from datetime import datetime, timedelta, timezone
+import google_auth_httplib2
+import httplib2
+import logging
 import os
+import tempfile
+import threading
+import time
+
+from ..metrics import CALENDAR_REQUEST_DURATION
+
+logger = logging.getLogger(__name__)
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
+TOKEN_FILE = 'token.json'
+CREDENTIALS_FILE = 'credentials.json'
 
-def get_calendar_service():
-    """Authenticate and return Google Calendar service instance"""
+# Refresh this long before the access token expires so no request ever waits on a refresh.
+REFRESH_MARGIN = timedelta(minutes=5)
+# Back-off between attempts when a background refresh fails.
+REFRESH_RETRY_SECONDS = 30
+
+
+def _load_credentials() -> Credentials:
+    """Load token.json, refreshing or running the consent flow when needed."""
     creds = None
 
     # Load token.json if it exists
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+    if os.path.exists(TOKEN_FILE):
+        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
 
     # Refresh if expired, or prompt re-auth if invalid
     if not creds or not creds.valid:
@@ -21,11 +41,130 @@ def get_calendar_service():
             creds.refresh(Request())
         else:
             flow = InstalledAppFlow.from_client_secrets_file(
-                'credentials.json', SCOPES)
+                CREDENTIALS_FILE, SCOPES)
             creds = flow.run_local_server(port=8080)
         # Save the credentials for the next run
-        with open('token.json', 'w') as token:
+        _save_credentials(creds)
+
+    return creds
+
+
+def _save_credentials(creds: Credentials) -> None:
+    """Write token.json atomically so a concurrent reader never sees a partial file."""
+    directory = os.path.dirname(os.path.abspath(TOKEN_FILE))
+    fd, tmp_path = tempfile.mkstemp(prefix='.token-', suffix='.json', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as token:
             token.write(creds.to_json())
+        os.replace(tmp_path, TOKEN_FILE)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class TimedHttpRequest(HttpRequest):
+    """HttpRequest that records each execute() in the Calendar request latency histogram."""
+
+    def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            return super().execute(*args, **kwargs)
+        except HttpError as e:
+            outcome = str(e.resp.status)
+            raise
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            CALENDAR_REQUEST_DURATION.observe(
+                time.perf_counter() - started, method=self.methodId or '', outcome=outcome)
+
+
+class CalendarClient:
+    """
+    Process-wide Google Calendar client.
+
+    The discovery document is loaded once from the copy bundled with
+    google-api-python-client, each thread keeps its own persistent HTTP
+    connection (httplib2 is not thread-safe), and a daemon thread refreshes the
+    credentials ahead of expiry and writes them back to token.json.
+    """
+
+    def __init__(self, creds: Credentials):
+        self._creds = creds
+        self._refresh_lock = threading.Lock()
+        self._local = threading.local()
+        self._stop = threading.Event()
 
-    service = build('calendar', 'v3', credentials=creds)
-    return service
\ No newline at end of file
+        self.service = build(
+            'calendar', 'v3',
+            http=self._thread_http(),
+            requestBuilder=self._build_request,
+            static_discovery=True,
+            cache_discovery=False,
+        )
+
+        self._refresher = None
+        if creds.refresh_token:
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name='calendar-credentials-refresh', daemon=True)
+            self._refresher.start()
+
+    def _thread_http(self) -> google_auth_httplib2.AuthorizedHttp:
+        """Return this thread's authorized HTTP transport, creating it on first use."""
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(self._creds, http=httplib2.Http())
+            self._local.http = http
+        return http
+
+    def _build_request(self, _http, *args, **kwargs) -> HttpRequest:
+        # Ignore the transport captured at build() time and use the calling thread's own.
+        return TimedHttpRequest(self._thread_http(), *args, **kwargs)
+
+    def _seconds_until_refresh(self) -> float:
+        if self._creds.expiry is None:
+            return REFRESH_RETRY_SECONDS
+        # google-auth stores expiry as naive UTC.
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return max((self._creds.expiry - REFRESH_MARGIN - now).total_seconds(), 0.0)
+
+    def refresh(self) -> None:
+        """Refresh the access token now and persist it."""
+        with self._refresh_lock:
+            self._creds.refresh(Request())
+            _save_credentials(self._creds)
+
+    def _refresh_loop(self) -> None:
+        delay = self._seconds_until_refresh()
+        while not self._stop.wait(delay):
+            try:
+                self.refresh()
+                delay = self._seconds_until_refresh()
+            except Exception as e:
+                logger.warning("Background credential refresh failed: %s", e)
+                delay = REFRESH_RETRY_SECONDS
+
+    def close(self) -> None:
+        """Stop the background refresher."""
+        self._stop.set()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_calendar_client() -> CalendarClient:
+    """Return the shared CalendarClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = CalendarClient(_load_credentials())
+    return _client
+
+
+def get_calendar_service():
+    """Return the shared, authenticated Google Calendar service instance"""
+    return get_calendar_client().service
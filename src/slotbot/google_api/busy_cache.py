@@ -0,0 +1,299 @@
+"""
+Local cache of the calendar's busy intervals, kept fresh with incremental
+`events.list` sync tokens.
+
+Availability checks inside the cached horizon are answered from an in-memory
+interval index instead of a `freebusy().query` round trip. Bookings made by this
+process are written into the cache immediately so we never read our own writes stale.
+The full listing that seeds the index runs on a background thread, never on a request.
+"""
+
+from bisect import bisect_left, insort
+from datetime import datetime, time, timedelta, timezone, tzinfo
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import threading
+
+from ..settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+Interval = Tuple[datetime, datetime, str]
+
+
+def get_calendar_client():
+    """The process-wide Calendar client; googleapiclient is imported on first use, not at startup."""
+    from .Oauth_client import get_calendar_client as shared_client
+    return shared_client()
+
+
+def parse_rfc3339(value: str) -> datetime:
+    """Parse a Calendar API timestamp (Python 3.10's fromisoformat rejects a trailing 'Z')."""
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+
+class BusyIntervalIndex:
+    """
+    Busy intervals sorted by start time.
+
+    Overlap queries bisect on start time and only scan back as far as the longest
+    stored interval, so a lookup touches a handful of entries rather than the whole calendar.
+    """
+
+    def __init__(self):
+        self._intervals: List[Interval] = []
+        self._by_id: Dict[str, Interval] = {}
+        self._max_length = timedelta(0)
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def add(self, event_id: str, start: datetime, end: datetime) -> None:
+        self.remove(event_id)
+        interval = (start, end, event_id)
+        insort(self._intervals, interval)
+        self._by_id[event_id] = interval
+        self._max_length = max(self._max_length, end - start)
+
+    def remove(self, event_id: str) -> None:
+        interval = self._by_id.pop(event_id, None)
+        if interval is not None:
+            self._intervals.pop(bisect_left(self._intervals, interval))
+
+    def clear(self) -> None:
+        self._intervals.clear()
+        self._by_id.clear()
+        self._max_length = timedelta(0)
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Interval]:
+        """Return every stored interval that overlaps [start, end)."""
+        lo = bisect_left(self._intervals, (start - self._max_length,))
+        hi = bisect_left(self._intervals, (end,))
+        return [iv for iv in self._intervals[lo:hi] if iv[1] > start]
+
+
+class BusyCache:
+    """Busy-interval cache for one calendar, synced lazily when older than `max_staleness`."""
+
+    def __init__(self, calendar_id: str = 'primary', horizon_days: int = 30,
+                 max_staleness: float = 30.0, default_tz: tzinfo = timezone(timedelta(hours=8))):
+        self.calendar_id = calendar_id
+        self.horizon = timedelta(days=horizon_days)
+        self.max_staleness = timedelta(seconds=max_staleness)
+        # Used to place all-day events, which carry a date but no time zone.
+        self.default_tz = default_tz
+
+        self._index = BusyIntervalIndex()
+        self._lock = threading.Lock()
+        self._sync_token: Optional[str] = None
+        self._synced_at: Optional[datetime] = None
+        # Events ending after this point were not indexed at the last full sync.
+        self._covered_until: Optional[datetime] = None
+        self._full_sync_thread: Optional[threading.Thread] = None
+        # Events recorded while a full sync runs, replayed onto the index it builds.
+        self._recorded: List[dict] = []
+
+    def _event_interval(self, event: dict) -> Optional[Tuple[datetime, datetime]]:
+        """Return the busy interval an event occupies, or None if it doesn't block time."""
+        if event.get('status') == 'cancelled' or event.get('transparency') == 'transparent':
+            return None
+        if any(a.get('self') and a.get('responseStatus') == 'declined' for a in event.get('attendees', [])):
+            # Free/busy doesn't count invitations the calendar's owner declined.
+            return None
+        start, end = event.get('start', {}), event.get('end', {})
+        if 'dateTime' in start and 'dateTime' in end:
+            return parse_rfc3339(start['dateTime']), parse_rfc3339(end['dateTime'])
+        if 'date' in start and 'date' in end:
+            return (
+                datetime.combine(datetime.fromisoformat(start['date']).date(), time(0), self.default_tz),
+                datetime.combine(datetime.fromisoformat(end['date']).date(), time(0), self.default_tz),
+            )
+        return None
+
+    def _apply(self, event: dict, index: BusyIntervalIndex, covered_until: datetime) -> None:
+        event_id = event.get('id')
+        if not event_id:
+            return
+        interval = self._event_interval(event)
+        now = datetime.now(timezone.utc)
+        # Only keep what falls inside the horizon; everything else is answered remotely.
+        if interval is None or interval[1] <= now or interval[0] >= covered_until:
+            index.remove(event_id)
+        else:
+            index.add(event_id, *interval)
+
+    def _list_pages(self, **params):
+        service = get_calendar_client().service
+        page_token = None
+        while True:
+            response = service.events().list(
+                calendarId=self.calendar_id, singleEvents=True, maxResults=2500,
+                pageToken=page_token, **params).execute()
+            yield response
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return
+
+    def _full_sync(self) -> None:
+        """
+        List the whole calendar into a fresh index and swap it in with its sync token.
+
+        A full sync cannot be bounded with timeMin/timeMax (Google refuses to issue a
+        sync token for such a listing), so the horizon is applied locally instead. It
+        runs on its own thread and holds the lock only for the swap.
+        """
+        index = BusyIntervalIndex()
+        covered_until = datetime.now(timezone.utc) + self.horizon
+        sync_token = None
+        try:
+            for response in self._list_pages():
+                for event in response.get('items', []):
+                    self._apply(event, index, covered_until)
+                sync_token = response.get('nextSyncToken', sync_token)
+        except Exception as e:
+            logger.warning("Busy cache full sync failed, answering from freebusy: %s", e)
+            with self._lock:
+                self._recorded.clear()
+                self._full_sync_thread = None
+            return
+        with self._lock:
+            for event in self._recorded:
+                self._apply(event, index, covered_until)
+            self._index, self._covered_until, self._sync_token = index, covered_until, sync_token
+            self._synced_at = datetime.now(timezone.utc)
+            self._recorded.clear()
+            self._full_sync_thread = None
+
+    def start_full_sync(self) -> threading.Thread:
+        """Start a background full sync (or return the one already running)."""
+        with self._lock:
+            return self._start_full_sync()
+
+    def _start_full_sync(self) -> threading.Thread:
+        if self._full_sync_thread is None:
+            self._full_sync_thread = threading.Thread(
+                target=self._full_sync, name='busy-cache-sync', daemon=True)
+            self._full_sync_thread.start()
+        return self._full_sync_thread
+
+    def _sync(self) -> None:
+        """Pull the changes since the last sync token into the index."""
+        from googleapiclient.errors import HttpError
+
+        try:
+            for response in self._list_pages(syncToken=self._sync_token):
+                for event in response.get('items', []):
+                    self._apply(event, self._index, self._covered_until)
+                if 'nextSyncToken' in response:
+                    self._sync_token = response['nextSyncToken']
+        except HttpError as e:
+            if e.resp.status != 410:
+                raise
+            # Sync token expired: nothing can be answered locally until a full sync lands.
+            self._sync_token = self._covered_until = self._synced_at = None
+            self._index.clear()
+            self._start_full_sync()
+            return
+        self._synced_at = datetime.now(timezone.utc)
+
+    def _ensure_fresh(self) -> None:
+        now = datetime.now(timezone.utc)
+        if self._covered_until is None or self._covered_until - now < self.horizon / 2:
+            # Unchanged events beyond the old horizon never show up in incremental syncs;
+            # until the new listing lands, the old index still answers inside its horizon.
+            self._start_full_sync()
+        if self._sync_token is not None and (self._synced_at is None or now - self._synced_at > self.max_staleness):
+            self._sync()
+
+    def busy_between(self, start: datetime, end: datetime) -> Optional[List[Tuple[datetime, datetime]]]:
+        """
+        Return the busy intervals overlapping [start, end) from the local index.
+
+        Returns None when the window is outside the cached horizon, the first full sync
+        has not finished, or the calendar could not be synced; callers should then ask
+        Google directly.
+        """
+        if end <= datetime.now(timezone.utc):
+            return None
+        with self._lock:
+            try:
+                self._ensure_fresh()
+            except Exception as e:
+                logger.warning("Busy cache sync failed, falling back to freebusy: %s", e)
+                return None
+            if self._covered_until is None or end > self._covered_until:
+                return None
+            return [(s, e) for s, e, _ in self._index.overlapping(start, end)]
+
+    def is_free(self, start: datetime, end: datetime) -> Optional[bool]:
+        """Answer whether [start, end) is free from the local index, or None if it can't."""
+        busy = self.busy_between(start, end)
+        return None if busy is None else not busy
+
+    def record_event(self, event: dict) -> None:
+        """Write an event this process just created or changed straight into the index."""
+        with self._lock:
+            if self._full_sync_thread is not None:
+                self._recorded.append(event)
+            if self._covered_until is not None:
+                self._apply(event, self._index, self._covered_until)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# Google answers free/busy for at most 50 calendars per query.
+FREEBUSY_CALENDAR_LIMIT = 50
+
+
+def get_busy_cache() -> Optional[BusyCache]:
+    """Return the shared busy cache for the default clinician's calendar, or None when disabled."""
+    from ..clinicians import get_clinician_registry
+
+    global _cache
+    settings = get_settings()
+    if not settings.busy_cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                clinician = get_clinician_registry().default
+                _cache = BusyCache(
+                    calendar_id=clinician.calendar_id,
+                    horizon_days=settings.busy_cache_horizon_days,
+                    max_staleness=settings.busy_cache_max_staleness,
+                    default_tz=clinician.tz,
+                )
+    return _cache
+
+
+def query_free_busy(start: datetime, end: datetime,
+                    calendar_ids: Sequence[str]) -> Dict[str, List[Tuple[datetime, datetime]]]:
+    """
+    Return each calendar's busy intervals in [start, end) from one `freebusy().query`
+    (per 50 calendars), however many calendars are asked for.
+
+    A calendar Google could not read (not shared with us, unknown id) is logged and left
+    out of the result, so callers treat it as unavailable rather than free.
+    """
+    # Borrow the process-wide client; no per-call token read or discovery build.
+    service = get_calendar_client().service
+    busy: Dict[str, List[Tuple[datetime, datetime]]] = {}
+    for first in range(0, len(calendar_ids), FREEBUSY_CALENDAR_LIMIT):
+        chunk = calendar_ids[first:first + FREEBUSY_CALENDAR_LIMIT]
+        freebusy_query = {
+            "timeMin": start.isoformat(),
+            "timeMax": end.isoformat(),
+            "items": [{"id": calendar_id} for calendar_id in chunk],
+        }
+        calendars = service.freebusy().query(body=freebusy_query).execute().get('calendars', {})
+        for calendar_id in chunk:
+            result = calendars.get(calendar_id, {})
+            if result.get('errors') or calendar_id not in calendars:
+                logger.warning("Free/busy lookup failed for %s: %s", calendar_id, result.get('errors'))
+                continue
+            busy[calendar_id] = [(parse_rfc3339(slot['start']), parse_rfc3339(slot['end']))
+                                 for slot in result.get('busy', [])]
+    return busy
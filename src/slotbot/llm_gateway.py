@@ -0,0 +1,381 @@
+# src/slotbot/llm_gateway.py
+"""
+Process-wide gateway in front of every LLM call.
+
+All agents (and the compact engine) share one model quota, so their calls go through
+one `LLMGateway`:
+
+- token buckets for requests per minute and tokens per minute (`SLOTBOT_LLM_RPM`,
+  `SLOTBOT_LLM_TPM`; 0 means no local limit). A call waits for capacity instead of
+  being sent into a 429, and the token estimate is corrected once each call's own
+  prompt and reply are known.
+- priority lanes: when calls queue, a turn that is finishing a booking goes before an
+  ongoing conversation, which goes before the first turn of a new one.
+- jittered exponential backoff on 429s and 5xx errors. A 429 also pauses every lane
+  for the backoff delay, since the quota it hit is shared.
+- in-flight de-duplication: a call with the same model and prompt as one already
+  running waits for that call's result instead of spending quota on a second copy.
+
+CrewAI LLMs are connected to it by `gateway_llm.GatewayLLM`; this module itself does
+not import CrewAI.
+
+A call that cannot get capacity within `SLOTBOT_LLM_MAX_WAIT_SECONDS`, or still fails
+after `SLOTBOT_LLM_MAX_RETRIES` retries, raises `LLMUnavailable` (a 503 with
+Retry-After from the API). The rest of that turn then fails fast rather than queueing
+again through CrewAI's task retries.
+"""
+
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .metrics import LLM_GATEWAY_DEDUPED, LLM_GATEWAY_RETRIES, LLM_GATEWAY_WAIT
+from .models import ConversationState, UserInputParsed
+from .settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Priority lanes, served lowest number first.
+LANE_BOOKING = 0
+LANE_ONGOING = 1
+LANE_NEW = 2
+LANE_NAMES = {LANE_BOOKING: 'booking', LANE_ONGOING: 'ongoing', LANE_NEW: 'new'}
+
+# Rough prompt size: characters per token.
+CHARS_PER_TOKEN = 4
+
+_RETRYABLE_NAMES = frozenset({
+    'ratelimiterror', 'resourceexhausted', 'toomanyrequests', 'serviceunavailableerror',
+    'internalservererror', 'apiconnectionerror', 'timeout', 'apitimeouterror',
+})
+_RATE_LIMIT_MARKERS = ('rate limit', 'too many requests', 'resource exhausted', 'quota')
+
+_lane: ContextVar[int] = ContextVar('slotbot_llm_lane', default=LANE_ONGOING)
+# Inside a turn: a list holding the LLMUnavailable that ended the turn's LLM use, once one has.
+# A list so that contexts CrewAI copies for streaming share it with the turn.
+_turn_failure: ContextVar[Optional[List['LLMUnavailable']]] = ContextVar('slotbot_llm_turn_failure', default=None)
+
+
+class LLMUnavailable(Exception):
+    """No LLM capacity for this call: the quota wait timed out or retries ran out."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def lane_for(conversation: ConversationState, parsed: Optional[UserInputParsed] = None) -> int:
+    """The lane for a turn: finishing a booking, continuing a conversation, or starting one."""
+    if conversation.slots.pending_intent == 'book' or (parsed is not None and parsed.intent == 'book'):
+        return LANE_BOOKING
+    return LANE_ONGOING if conversation.turns > 0 else LANE_NEW
+
+
+@contextmanager
+def llm_lane(lane: int) -> Iterator[None]:
+    """Run the LLM calls of one turn in `lane`; a failure from an earlier turn is forgotten."""
+    lane_token = _lane.set(lane)
+    failure_token = _turn_failure.set([])
+    try:
+        yield
+    finally:
+        _turn_failure.reset(failure_token)
+        _lane.reset(lane_token)
+
+
+def set_llm_lane(lane: int) -> None:
+    """Move the rest of the current turn to `lane` (e.g. once the parse shows a booking)."""
+    _lane.set(lane)
+
+
+def _error_chain(error: BaseException) -> Iterator[BaseException]:
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        yield current
+        current = current.__cause__ or current.__context__
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """'rate_limit' for a 429, 'server' for a 5xx or connection error, None if not retryable."""
+    server = False
+    for candidate in _error_chain(error):
+        status = _status_code(candidate)
+        name = type(candidate).__name__.replace('_', '').lower()
+        if status == 429 or name in ('ratelimiterror', 'resourceexhausted', 'toomanyrequests'):
+            return 'rate_limit'
+        if (status is not None and status >= 500) or name in _RETRYABLE_NAMES:
+            server = True
+        elif any(marker in str(candidate).lower() for marker in _RATE_LIMIT_MARKERS):
+            return 'rate_limit'
+    return 'server' if server else None
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """The provider's Retry-After, in seconds, if the error carries one."""
+    for candidate in _error_chain(error):
+        headers = getattr(getattr(candidate, 'response', None), 'headers', None) or {}
+        value = getattr(candidate, 'retry_after', None) or headers.get('retry-after')
+        try:
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def estimate_tokens(messages: Any, max_output_tokens: int) -> int:
+    """Prompt tokens (from its length) plus the output allowance."""
+    if isinstance(messages, str):
+        text = messages
+    else:
+        text = ''.join(str(m.get('content', '')) for m in messages)
+    return len(text) // CHARS_PER_TOKEN + max_output_tokens
+
+
+def prompt_key(model: str, messages: Any, response_model: Any = None) -> str:
+    """Identity of a call for de-duplication: model, messages and response model."""
+    payload = json.dumps([model, messages, getattr(response_model, '__name__', None)],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TokenBucket:
+    """
+    A per-minute allowance that refills continuously, up to one minute's worth.
+
+    Not locked: the gateway only touches its buckets while holding its own lock.
+    Taking more than is left leaves the bucket in debt, which later callers wait off.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` (at most the capacity) is available; 0 if it is now."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(missing, 0.0) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+
+class LLMGateway:
+    """
+    Admission, retries and de-duplication for LLM calls; see the module docstring.
+
+    `call(fn, ...)` runs `fn()` (one provider request) under the gateway's limits and
+    returns its result. Waiting calls are admitted strictly in (lane, arrival) order.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_retries: int = 3, backoff_base: float = 1.0,
+                 backoff_max: float = 20.0, max_wait: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self.rpm = TokenBucket(rpm, clock) if rpm > 0 else None
+        self.tpm = TokenBucket(tpm, clock) if tpm > 0 else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[int, int]] = []
+        self._arrivals = itertools.count()
+        # A 429 pauses admission for every lane until this time.
+        self._paused_until = 0.0
+        self._in_flight: Dict[str, Future] = {}
+
+    def acquire(self, tokens: int, lane: int) -> float:
+        """
+        Wait for a request slot and `tokens` of quota, behind every call in a higher lane
+        or ahead in this one; return the seconds waited. Raises LLMUnavailable when the
+        wait would exceed `max_wait`.
+        """
+        started = self._clock()
+        deadline = started + self.max_wait
+        ticket = (lane, next(self._arrivals))
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = self._clock()
+                    if self._queue[0] == ticket:
+                        waits = [self._paused_until - now]
+                        if self.rpm is not None:
+                            waits.append(self.rpm.wait_time(1))
+                        if self.tpm is not None:
+                            waits.append(self.tpm.wait_time(tokens))
+                        wait = max(waits)
+                        if wait <= 0:
+                            if self.rpm is not None:
+                                self.rpm.take(1)
+                            if self.tpm is not None:
+                                self.tpm.take(tokens)
+                            return now - started
+                        if now + wait > deadline:
+                            # Capacity will not free up in time; say so now instead of at the deadline.
+                            raise LLMUnavailable("LLM quota exhausted", retry_after=wait)
+                    else:
+                        wait = deadline - now
+                        if wait <= 0:
+                            raise LLMUnavailable("LLM request queue is full", retry_after=self.max_wait)
+                    self._cond.wait(min(wait, deadline - now))
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the tokens charged for a call once its real usage is known."""
+        if self.tpm is None or not actual:
+            return
+        with self._cond:
+            self.tpm.take(actual - estimated)
+            self._cond.notify_all()
+
+    def _backoff(self, retry: int, error: BaseException) -> float:
+        """Delay before retry number `retry` (1-based): exponential, with equal jitter."""
+        provided = _retry_after(error)
+        if provided is not None:
+            return min(provided, self.backoff_max)
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** (retry - 1))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def _pause(self, seconds: float) -> None:
+        with self._cond:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+            self._cond.notify_all()
+
+    def _send(self, fn: Callable[[], Any], tokens: int, lane: int,
+              usage: Optional[Callable[[Any], Optional[int]]]) -> Any:
+        retry = 0
+        while True:
+            waited = self.acquire(tokens, lane)
+            LLM_GATEWAY_WAIT.observe(waited, lane=LANE_NAMES.get(lane, str(lane)))
+            try:
+                result = fn()
+            except Exception as e:
+                kind = classify_error(e)
+                if kind is None:
+                    raise
+                retry += 1
+                delay = self._backoff(retry, e)
+                if retry > self.max_retries:
+                    logger.warning("LLM call failed after %d retries: %s", self.max_retries, e)
+                    error = e
+                    break
+                LLM_GATEWAY_RETRIES.inc(reason=kind)
+                logger.info("LLM call failed (%s), retry %d in %.1fs: %s", kind, retry, delay, e)
+                if kind == 'rate_limit':
+                    self._pause(delay)
+                else:
+                    self._sleep(delay)
+                continue
+            self.settle(tokens, usage(result) if usage is not None else None)
+            return result
+        # Raised outside the except block so the provider error is not chained as the context.
+        raise LLMUnavailable(f"LLM unavailable: {error}", retry_after=delay)
+
+    def call(self, fn: Callable[[], Any], tokens: int, key: Optional[str] = None,
+             usage: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+        """
+        Run `fn` through the gateway in the current lane.
+
+        Calls with the same `key` made while one is running share its result (or error).
+        `usage`, if given, returns the tokens a call really used from its result.
+        """
+        failure = _turn_failure.get()
+        if failure:
+            raise LLMUnavailable(str(failure[0]), retry_after=failure[0].retry_after)
+
+        leader = True
+        if key is not None:
+            with self._cond:
+                future = self._in_flight.get(key)
+                if future is None:
+                    future = self._in_flight[key] = Future()
+                else:
+                    leader = False
+            if not leader:
+                LLM_GATEWAY_DEDUPED.inc()
+                try:
+                    return future.result()
+                except LLMUnavailable as e:
+                    self._fail_turn(e)
+                    raise
+
+        try:
+            result = self._send(fn, tokens, _lane.get(), usage)
+        except BaseException as e:
+            if isinstance(e, LLMUnavailable):
+                self._fail_turn(e)
+            if key is not None:
+                self._finish(key, future, error=e)
+            raise
+        if key is not None:
+            self._finish(key, future, result=result)
+        return result
+
+    @staticmethod
+    def _fail_turn(error: LLMUnavailable) -> None:
+        failure = _turn_failure.get()
+        if failure is not None and not failure:
+            failure.append(error)
+
+    def _finish(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._cond:
+            self._in_flight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the process-wide gateway, created from the settings on first use."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                settings = get_settings()
+                _gateway = LLMGateway(
+                    rpm=settings.llm_rpm,
+                    tpm=settings.llm_tpm,
+                    max_retries=settings.llm_max_retries,
+                    backoff_base=settings.llm_backoff_base_seconds,
+                    backoff_max=settings.llm_backoff_max_seconds,
+                    max_wait=settings.llm_max_wait_seconds,
+                )
+    return _gateway
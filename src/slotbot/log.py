@@ -0,0 +1,85 @@
+# src/slotbot/log.py
+"""
+Logging for the booking pipeline.
+
+Modules log through `logging.getLogger(__name__)` with lazy %-style arguments, so
+disabled levels cost a level check and nothing else. Every record carries the
+correlation id of the turn it belongs to (`<session>:<turn>`, or '-' outside a turn).
+`configure_logging()` installs the handler once per process; the default level is
+WARNING so production stays quiet.
+"""
+
+import json
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from .settings import get_settings
+
+_correlation_id: ContextVar[str] = ContextVar('slotbot_correlation_id', default='-')
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s'
+
+
+def correlation_id() -> str:
+    return _correlation_id.get()
+
+
+@contextmanager
+def correlation(session_id: Optional[str], turn: Optional[int] = None) -> Iterator[str]:
+    """Tag every log record emitted inside the block with this session (and turn)."""
+    value = session_id or '-'
+    if turn is not None:
+        value = f"{value}:{turn}"
+    token = _correlation_id.set(value)
+    try:
+        yield value
+    finally:
+        _correlation_id.reset(token)
+
+
+class CorrelationFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = _correlation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'correlation_id': getattr(record, 'correlation_id', '-'),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_configured = False
+
+
+def configure_logging(level: Optional[str] = None) -> None:
+    """Install the correlation-aware handler on the root logger (idempotent)."""
+    global _configured
+    if _configured:
+        return
+    settings = get_settings()
+    handler = logging.StreamHandler()
+    handler.addFilter(CorrelationFilter())
+    handler.setFormatter(JsonFormatter() if settings.log_format == 'json' else logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel((level or settings.log_level).upper())
+    _configured = True
+
+
+def is_verbose_session(session_id: Optional[str]) -> bool:
+    """Whether CrewAI's own verbose console output is switched on for this session."""
+    verbose = get_settings().verbose_sessions
+    return '*' in verbose or (session_id is not None and session_id in verbose)
@@ -1,21 +1,128 @@
+import argparse
+import os
+import sys
+import time
 import warnings
 from datetime import datetime
 
+import yaml
+
 from slotbot.crew import CalendarBookingCrew
+from slotbot.log import configure_logging
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
 
 def run():
     """
     Run the crew.
     """
+    configure_logging()
     inputs = {
         'user_message': 'Hi clinician, I would like to book an appointment tuesday 5 pm, hamzakhaledlklk@gmail.com.',
         'current_date': datetime.now().isoformat()
     }
     
     try:
-        result = CalendarBookingCrew().crew().kickoff(inputs=inputs)
+        result = CalendarBookingCrew().kickoff(inputs=inputs)
         print(f"Crew execution completed successfully at {datetime.now()}.")
         return result
     except Exception as e:
         raise Exception(f"An error occurred while running the crew: {e}")
+
+
+def _use_cassette(path: str, mode: str):
+    """Point the pipeline at a cassette; must run before anything reads the settings."""
+    from slotbot.cassette import get_cassette
+    from slotbot.settings import get_settings
+
+    os.environ['SLOTBOT_CASSETTE'] = path
+    os.environ['SLOTBOT_CASSETTE_MODE'] = mode
+    get_settings.cache_clear()
+    return get_cassette()
+
+
+def train():
+    """
+    Record a cassette: run the conversations of a YAML script live (real LLM and Calendar)
+    and tape every turn.
+
+        train conversations.yaml cassette.jsonl.gz
+
+    The script is a list of conversations, each a list of user messages:
+
+        - ["Are you free tomorrow afternoon?", "3pm then, pat@example.com"]
+        - ["hello there"]
+    """
+    parser = argparse.ArgumentParser(prog='train', description=train.__doc__.strip().splitlines()[0])
+    parser.add_argument('script', help="YAML list of conversations (lists of user messages)")
+    parser.add_argument('cassette', help="cassette to write (JSONL; .gz for gzip); replaced if it exists")
+    parser.add_argument('--locale', help="reply locale for every turn")
+    args = parser.parse_args(sys.argv[1:])
+    configure_logging()
+
+    with open(args.script, encoding='utf-8') as f:
+        conversations = yaml.safe_load(f) or []
+    if os.path.exists(args.cassette):
+        os.remove(args.cassette)
+    _use_cassette(args.cassette, 'record')
+
+    from slotbot.cassette import record_conversations
+    from slotbot.crew import run_turn
+
+    started = time.perf_counter()
+    replies = record_conversations(conversations, run_turn, locale=args.locale)
+    print(f"Recorded {len(replies)} turns of {len(conversations)} conversations to {args.cassette} "
+          f"in {time.perf_counter() - started:.1f}s.")
+
+
+def _replay(argv, prog: str):
+    parser = argparse.ArgumentParser(prog=prog)
+    parser.add_argument('cassette', help="cassette recorded with `train` or SLOTBOT_CASSETTE")
+    parser.add_argument('--repeat', type=int, default=1, help="replay the whole cassette this many times")
+    args = parser.parse_args(argv)
+    configure_logging()
+    cassette = _use_cassette(args.cassette, 'replay')
+
+    from slotbot.cassette import replay_cassette
+    from slotbot.crew import run_turn
+
+    results = []
+    started = time.perf_counter()
+    for _ in range(max(1, args.repeat)):
+        results = replay_cassette(cassette, run_turn)
+    elapsed = time.perf_counter() - started
+    return results, elapsed, args.repeat
+
+
+def replay():
+    """
+    Re-run every conversation of a cassette with no network, printing each replayed reply.
+
+        replay cassette.jsonl.gz [--repeat N]
+    """
+    results, elapsed, repeat = _replay(sys.argv[1:], 'replay')
+    for result in results:
+        print(f"[{result.session} #{result.turn}] {result.error or result.reply}")
+    print(f"Replayed {len(results)} turns x{repeat} in {elapsed:.2f}s.")
+
+
+def test():
+    """
+    Replay a cassette and check every reply against its recording; exits 1 on a difference.
+
+        test cassette.jsonl.gz [--repeat N]
+    """
+    results, elapsed, repeat = _replay(sys.argv[1:], 'test')
+    failed = [result for result in results if not result.ok]
+    for result in failed:
+        print(f"FAIL [{result.session} #{result.turn}]")
+        if result.error:
+            print(f"  error:    {result.error}")
+        else:
+            print(f"  expected: {result.expected}")
+            print(f"  got:      {result.reply}")
+    drift = sum(result.drift for result in results)
+    recorded = sum(result.recorded_seconds for result in results)
+    print(f"{len(results) - len(failed)}/{len(results)} turns match; {drift} prompts drifted from their "
+          f"recording; replayed x{repeat} in {elapsed:.2f}s (recorded live: {recorded:.2f}s).")
+    if failed:
+        sys.exit(1)
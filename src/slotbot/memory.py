@@ -0,0 +1,131 @@
+# src/slotbot/memory.py
+"""
+Bounded per-session conversation memory.
+
+The last `SLOTBOT_MEMORY_TURNS` turns are kept verbatim, older turns are folded into a
+rolling summary of one short line each (oldest dropped first), and details the patient
+already gave (email, requested time and clinician, a request still waiting for details) are carried
+forward as `CarriedSlots` until the request is booked or cancelled. `apply_carried_slots()` fills those into a new turn's parse,
+so "my email is a@b.com" completes the booking asked for a turn earlier, and
+`history_prompt()` gives the LLM prompts a context block whose size does not grow with
+the length of the conversation.
+"""
+
+from typing import List, Optional
+
+from .models import CarriedSlots, ConversationState, ConversationTurn, SessionState, UserInputParsed
+from .settings import get_settings
+
+# Intents whose request can wait across turns for missing details.
+CARRIED_INTENTS = ('book', 'cancel', 'check_availability')
+SUMMARY_SNIPPET_CHARS = 80
+
+
+def _clip(text: str, limit: int) -> str:
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def apply_carried_slots(parsed: UserInputParsed, conversation: ConversationState) -> UserInputParsed:
+    """
+    Fill details missing from this turn's parse with those carried from earlier turns.
+
+    A follow-up with no intent of its own that gives details ('it's a@b.com', 'with
+    Dr Tan', 'Friday then') takes over the pending request's intent; a request without
+    any time takes over the time discussed earlier, and a clinician asked for stays
+    until another is named. `missing_info` loses every field that is now filled.
+    """
+    slots = conversation.slots
+    update = {}
+    intent = parsed.intent
+    gives_details = (parsed.patient_email is not None or parsed.clinician is not None
+                     or parsed.start_time is not None or bool(parsed.temporal_expression))
+    if intent == 'general_query' and slots.pending_intent is not None and gives_details:
+        intent = update['intent'] = slots.pending_intent
+    if parsed.patient_email is None and slots.patient_email is not None:
+        update['patient_email'] = slots.patient_email
+    if parsed.clinician is None and slots.clinician is not None:
+        update['clinician'] = slots.clinician
+    if (intent in CARRIED_INTENTS and parsed.start_time is None and not parsed.temporal_expression
+            and slots.start_time is not None):
+        update['start_time'] = slots.start_time
+        update['end_time'] = slots.end_time
+    if not update:
+        return parsed
+    merged = parsed.model_copy(update=update)
+    missing = [name for name in parsed.missing_info if getattr(merged, name, None) is None]
+    return merged.model_copy(update={'missing_info': missing})
+
+
+def is_fresh(conversation: ConversationState) -> bool:
+    """True before the first turn, when a parse cannot depend on earlier turns."""
+    return not conversation.history and not conversation.summary
+
+
+def _carry(parsed: UserInputParsed, state: SessionState, slots: CarriedSlots) -> CarriedSlots:
+    if state.next_action == 'execute_operation':
+        # The request is done; its time and clinician must not leak into the next one.
+        # The email still identifies the patient.
+        return CarriedSlots(patient_email=parsed.patient_email or slots.patient_email)
+    update = {}
+    if parsed.patient_email is not None:
+        update['patient_email'] = parsed.patient_email
+    if parsed.start_time is not None:
+        update['start_time'] = parsed.start_time
+        update['end_time'] = parsed.end_time
+    if parsed.clinician is not None:
+        update['clinician'] = parsed.clinician
+    waiting = state.next_action == 'collect_info' and parsed.intent in CARRIED_INTENTS
+    update['pending_intent'] = parsed.intent if waiting else None
+    return slots.model_copy(update=update)
+
+
+def remember_turn(conversation: ConversationState, user_message: str, reply: str,
+                  parsed: Optional[UserInputParsed], state: Optional[SessionState]) -> ConversationState:
+    """
+    Return `conversation` with this turn appended, the oldest verbatim turns folded into
+    the summary, and the carried slots updated. Everything else is left to the caller.
+    """
+    settings = get_settings()
+    turn = ConversationTurn(
+        user=_clip(user_message, settings.memory_max_chars),
+        assistant=_clip(reply, settings.memory_max_chars),
+        intent=parsed.intent if parsed is not None else None,
+        next_action=state.next_action if state is not None else None,
+    )
+    history: List[ConversationTurn] = conversation.history + [turn]
+    summary = list(conversation.summary)
+    keep = max(settings.memory_turns, 0)
+    while len(history) > keep:
+        old = history.pop(0)
+        summary.append(
+            f"{old.intent or 'unknown'} -> {old.next_action or 'none'}: "
+            f"patient said \"{_clip(old.user, SUMMARY_SNIPPET_CHARS)}\"; "
+            f"we replied \"{_clip(old.assistant, SUMMARY_SNIPPET_CHARS)}\""
+        )
+    if len(summary) > settings.memory_summary_lines:
+        summary = summary[len(summary) - settings.memory_summary_lines:]
+
+    slots = conversation.slots
+    if parsed is not None and state is not None:
+        slots = _carry(parsed, state, slots)
+    return conversation.model_copy(update={'history': history, 'summary': summary, 'slots': slots})
+
+
+def history_prompt(conversation: ConversationState) -> str:
+    """The memory as a prompt block: known details, the summary, then the recent turns."""
+    slots = conversation.slots
+    known = [f"{name}={value.isoformat() if hasattr(value, 'isoformat') else value}"
+             for name, value in slots.model_dump().items() if value is not None]
+    lines: List[str] = []
+    if known:
+        lines.append("Known details: " + "; ".join(known))
+    if conversation.summary:
+        lines.append("Earlier turns (summary):")
+        lines.extend(f"- {line}" for line in conversation.summary)
+    if conversation.history:
+        lines.append("Recent turns:")
+        for turn in conversation.history:
+            lines.append(f"Patient: {turn.user}")
+            lines.append(f"Assistant: {turn.assistant}")
+    return "\n".join(lines) if lines else "(this is the first message of the conversation)"
@@ -0,0 +1,277 @@
+# src/slotbot/metrics.py
+"""
+In-process metrics for the booking pipeline, exposed in Prometheus text format.
+
+A small registry of labelled counters and histograms (no client library needed)
+records per-stage turn latency, every LLM call (latency, token counts, failures),
+tool calls, and Google Calendar API requests. `render()` produces the
+`text/plain; version=0.0.4` exposition served on `GET /metrics`.
+"""
+
+import bisect
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+ATTEMPT_BUCKETS = (1, 2, 3, 5, 8)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts incl. +Inf, sum, count)
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            counts, totals = series
+            counts[index] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return 0 if series is None else int(series[1][1])
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(c), list(t))) for key, (c, t) in self._series.items())
+        lines = self._header()
+        for key, (counts, (total, count)) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(count)}")
+        return lines
+
+
+STAGE_DURATION = Histogram(
+    'slotbot_stage_duration_seconds',
+    'Time spent in each pipeline stage of a chat turn.',
+    ('stage', 'intent', 'next_action'))
+LLM_CALL_DURATION = Histogram(
+    'slotbot_llm_call_duration_seconds',
+    'Latency of individual LLM calls.',
+    ('task', 'model', 'outcome'))
+LLM_TOKENS = Histogram(
+    'slotbot_llm_tokens',
+    'Tokens per LLM call.',
+    ('task', 'model', 'kind'), buckets=TOKEN_BUCKETS)
+LLM_FAILURES = Counter(
+    'slotbot_llm_call_failures_total',
+    'LLM calls that failed (and were retried or surfaced).',
+    ('task', 'model'))
+TOOL_CALL_DURATION = Histogram(
+    'slotbot_tool_call_duration_seconds',
+    'Latency of agent tool calls.',
+    ('tool', 'outcome'))
+TOOL_ATTEMPTS = Histogram(
+    'slotbot_tool_call_attempts',
+    'Attempts an agent needed per tool call (1 means no retry).',
+    ('tool',), buckets=ATTEMPT_BUCKETS)
+LLM_GATEWAY_WAIT = Histogram(
+    'slotbot_llm_gateway_wait_seconds',
+    'Time LLM calls waited for rate-limit capacity, per priority lane.',
+    ('lane',))
+LLM_GATEWAY_RETRIES = Counter(
+    'slotbot_llm_gateway_retries_total',
+    'LLM calls retried by the gateway after a 429 or a server error.',
+    ('reason',))
+LLM_GATEWAY_DEDUPED = Counter(
+    'slotbot_llm_gateway_deduplicated_total',
+    'LLM calls answered by an identical call already in flight.')
+CALENDAR_REQUEST_DURATION = Histogram(
+    'slotbot_calendar_request_duration_seconds',
+    'Latency of Google Calendar API requests.',
+    ('method', 'outcome'))
+PREFETCH_OUTCOMES = Counter(
+    'slotbot_prefetch_total',
+    'Speculative availability prefetches, by outcome (used, unused or dropped).',
+    ('outcome',))
+PREFETCH_DURATION = Histogram(
+    'slotbot_prefetch_duration_seconds',
+    'Latency of speculative availability prefetches.')
+
+REGISTRY = [
+    STAGE_DURATION, LLM_CALL_DURATION, LLM_TOKENS, LLM_FAILURES,
+    TOOL_CALL_DURATION, TOOL_ATTEMPTS, LLM_GATEWAY_WAIT, LLM_GATEWAY_RETRIES, LLM_GATEWAY_DEDUPED,
+    CALENDAR_REQUEST_DURATION, PREFETCH_OUTCOMES, PREFETCH_DURATION,
+]
+
+
+def render() -> str:
+    """Return every registered metric in Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
+
+
+def _usage_tokens(usage: Optional[dict], *keys: str) -> Optional[int]:
+    if not usage:
+        return None
+    for key in keys:
+        if usage.get(key) is not None:
+            return int(usage[key])
+    return None
+
+
+# An LLM start or end event still unpaired after this long will never be paired (the
+# call died without its other event); it is dropped so the pending map stays bounded.
+PENDING_EVENT_MAX_AGE = 600.0
+
+_listeners_installed = False
+_listeners_lock = threading.Lock()
+
+
+def install_crewai_listeners() -> None:
+    """
+    Record LLM and tool-call metrics from CrewAI's event bus (idempotent).
+
+    Event handlers run on CrewAI's handler pool, so LLM latency is computed from the
+    start/completion event timestamps, paired by `call_id` in whichever order they arrive.
+    Events left unpaired for `PENDING_EVENT_MAX_AGE` seconds are discarded.
+    """
+    global _listeners_installed
+    with _listeners_lock:
+        if _listeners_installed:
+            return
+        _listeners_installed = True
+
+    from crewai.events import crewai_event_bus
+    from crewai.events.types.llm_events import LLMCallCompletedEvent, LLMCallFailedEvent, LLMCallStartedEvent
+    from crewai.events.types.tool_usage_events import ToolUsageErrorEvent, ToolUsageFinishedEvent
+
+    # call_id -> (event, arrival time), oldest first.
+    pending: Dict[str, Tuple[object, float]] = {}
+    pending_lock = threading.Lock()
+
+    def _pair(call_id: str, event) -> Optional[Tuple[object, object]]:
+        now = time.monotonic()
+        with pending_lock:
+            while pending:
+                oldest = next(iter(pending))
+                if now - pending[oldest][1] < PENDING_EVENT_MAX_AGE:
+                    break
+                del pending[oldest]
+            other, _ = pending.pop(call_id, (None, None))
+            if other is None:
+                pending[call_id] = (event, now)
+                return None
+        return (other, event) if isinstance(other, LLMCallStartedEvent) else (event, other)
+
+    def _record_llm_call(started, finished) -> None:
+        task = finished.task_name or ''
+        model = finished.model or started.model or ''
+        outcome = 'error' if isinstance(finished, LLMCallFailedEvent) else 'ok'
+        duration = (finished.timestamp - started.timestamp).total_seconds()
+        LLM_CALL_DURATION.observe(max(duration, 0.0), task=task, model=model, outcome=outcome)
+        if outcome == 'error':
+            LLM_FAILURES.inc(task=task, model=model)
+            return
+        prompt = _usage_tokens(finished.usage, 'prompt_tokens', 'input_tokens')
+        completion = _usage_tokens(finished.usage, 'completion_tokens', 'output_tokens')
+        if prompt is not None:
+            LLM_TOKENS.observe(prompt, task=task, model=model, kind='prompt')
+        if completion is not None:
+            LLM_TOKENS.observe(completion, task=task, model=model, kind='completion')
+
+    def _on_llm_event(source, event) -> None:
+        try:
+            pair = _pair(event.call_id, event)
+            if pair is not None:
+                _record_llm_call(*pair)
+        except Exception:
+            logger.debug("Could not record LLM call metrics", exc_info=True)
+
+    def _on_tool_finished(source, event) -> None:
+        outcome = 'error' if event.failure is not None else 'ok'
+        duration = (event.finished_at - event.started_at).total_seconds()
+        TOOL_CALL_DURATION.observe(max(duration, 0.0), tool=event.tool_name, outcome=outcome)
+        TOOL_ATTEMPTS.observe(max(event.run_attempts, 1), tool=event.tool_name)
+
+    def _on_tool_error(source, event) -> None:
+        TOOL_CALL_DURATION.observe(0.0, tool=event.tool_name, outcome='error')
+
+    for event_type in (LLMCallStartedEvent, LLMCallCompletedEvent, LLMCallFailedEvent):
+        crewai_event_bus.on(event_type)(_on_llm_event)
+    crewai_event_bus.on(ToolUsageFinishedEvent)(_on_tool_finished)
+    crewai_event_bus.on(ToolUsageErrorEvent)(_on_tool_error)
@@ -1,13 +1,13 @@
 # models.py
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
 
 # src/slotbot/tools/models.py
 
 from pydantic import BaseModel, EmailStr, Field
 from typing import Literal, Optional, List
-from datetime import datetime
+from datetime import date, datetime
 
 class UserInputParsed(BaseModel):
     """
@@ -41,6 +41,11 @@ class UserInputParsed(BaseModel):
         description="If the user asks a general question about time (e.g., 'next week in the evening', 'sometime on Friday'), store that raw text here. This is used for 'check_availability' intents."
     )
 
+    clinician: Optional[str] = Field(
+        None,
+        description="The clinician the user asked for by name (e.g., 'Dr Tan'), if any. Leave null when any clinician will do."
+    )
+
     missing_info: List[str] = Field(
         default_factory=list,
         description="A list of critical information that is missing to fulfill the user's specific intent (e.g., 'patient_email' is missing for a 'book' intent)."
@@ -61,7 +66,7 @@ class SessionState(BaseModel):
         description="Indicates if all necessary data for the user's intent (e.g., date/time for booking) has been provided."
     )
     missing_info: List[str]
-    next_action: Literal['collect_info', 'execute_operation']
+    next_action: Literal['collect_info', 'check_availability', 'search_availability', 'execute_operation']
 
 class BookAppointmentOutput(BaseModel):
     """
@@ -80,4 +85,80 @@ class BookAppointmentOutput(BaseModel):
     failure_reason: Optional[str] = Field(
         None,
         description="Explanation for why the booking failed, if applicable."
-    )
\ No newline at end of file
+    )
+
+class ConversationTurn(BaseModel):
+    """One exchange kept verbatim in the conversation memory."""
+    user: str
+    assistant: str
+    intent: Optional[str] = None
+    next_action: Optional[str] = None
+
+
+class CarriedSlots(BaseModel):
+    """Details the patient already gave, carried into later turns as fields rather than text."""
+    patient_email: Optional[EmailStr] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    clinician: Optional[str] = None
+    # Intent of a request still waiting for details (e.g. 'book' after we asked for the email).
+    pending_intent: Optional[Literal['book', 'cancel', 'check_availability']] = None
+
+
+class ConversationState(BaseModel):
+    """
+    The part of a chat session that outlives a single turn.
+
+    This is what session stores persist (as JSON) instead of live crew objects, so a
+    session can be resumed by any worker process or after a restart.
+    """
+    turns: int = Field(0, description="Number of completed turns in this session.")
+    last_parsed: Optional[UserInputParsed] = Field(
+        None,
+        description="The parsed request from the most recent turn."
+    )
+    last_state: Optional[SessionState] = Field(
+        None,
+        description="The routed session state from the most recent turn."
+    )
+    history: List[ConversationTurn] = Field(
+        default_factory=list,
+        description="The most recent turns, verbatim (bounded by SLOTBOT_MEMORY_TURNS)."
+    )
+    summary: List[str] = Field(
+        default_factory=list,
+        description="One line per older turn, oldest dropped first (bounded by SLOTBOT_MEMORY_SUMMARY_LINES)."
+    )
+    slots: CarriedSlots = Field(
+        default_factory=CarriedSlots,
+        description="Details resolved in earlier turns."
+    )
+
+
+class SearchWindow(BaseModel):
+    """The date range (and optional part of day) a vague availability question covers."""
+    start_date: date = Field(..., description="First day to search, in YYYY-MM-DD format.")
+    end_date: date = Field(..., description="Last day to search (inclusive), in YYYY-MM-DD format.")
+    earliest_time: Optional[str] = Field(None, description="Earliest start of day in HH:MM (24-hour), if a part of day was named.")
+    latest_time: Optional[str] = Field(None, description="Latest end of day in HH:MM (24-hour), if a part of day was named.")
+
+
+class CompactTurn(BaseModel):
+    """
+    Everything the compact engine asks of the LLM in its single call per turn: the
+    parsed request, the routing decision, what to search or repeat, and a reply draft.
+    """
+    parsed: UserInputParsed
+    session_state: SessionState
+    search_window: Optional[SearchWindow] = Field(
+        None,
+        description="For 'check_availability' without a specific start_time: the window the temporal_expression covers."
+    )
+    recurrence: Optional[str] = Field(
+        None,
+        description="For bookings of a series ('every Monday for 6 weeks'): an RRULE such as 'FREQ=WEEKLY;COUNT=6'."
+    )
+    reply: str = Field(
+        ...,
+        description="The message to send the user if no calendar action is needed (general questions, missing details)."
+    )
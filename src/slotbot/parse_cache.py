@@ -0,0 +1,246 @@
+# src/slotbot/parse_cache.py
+"""
+Cache of LLM parse results keyed on a normalized form of the message.
+
+Messages that differ only in email addresses or numbers ("book tomorrow 10am,
+a@x.com" vs "Book tomorrow 11am, b@y.com!") share a cache key together with the
+`current_date` day. On a hit the cached `UserInputParsed` is re-hydrated with the new
+message's email and date/time, so no LLM call is made. A hit that cannot be
+re-hydrated safely is treated as a miss.
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .fast_parser import EMAIL_RE, _resolve_dates, _resolve_duration, _resolve_times
+from .models import UserInputParsed
+from .settings import get_settings
+
+NUMBER_RE = re.compile(r"\d+")
+# A number and any am/pm straight after it: "10am" and "2pm" share the template "<n><m>".
+NUMBER_TOKEN_RE = re.compile(r"(\d+)(\s*[ap]\.?m\b\.?)?")
+PUNCTUATION_RE = re.compile(r"[^\w<>:]+")
+
+
+def normalize_message(message: str) -> Tuple[str, List[str], List[str]]:
+    """
+    Return the message template plus the emails and numbers that were templated out.
+
+    Each templated number keeps its am/pm suffix in the returned list, so "10am" and
+    "10pm" count as different values even though they share a template.
+    """
+    emails = EMAIL_RE.findall(message)
+    text = EMAIL_RE.sub(" <email> ", message.lower())
+    numbers = [number + re.sub(r"[\s.]", "", suffix) for number, suffix in NUMBER_TOKEN_RE.findall(text)]
+    text = NUMBER_TOKEN_RE.sub(lambda m: "<n><m>" if m.group(2) else "<n>", text)
+    text = PUNCTUATION_RE.sub(" ", text)
+    return " ".join(text.split()), emails, numbers
+
+
+def cache_key(message: str, current_date: str) -> str:
+    template, _, _ = normalize_message(message)
+    return f"{current_date[:10]}|{template}"
+
+
+def _single_slot(message: str, current_date: str) -> Optional[Tuple[datetime, int]]:
+    """The one date/time (and duration in minutes) the message names, if exactly one."""
+    text = EMAIL_RE.sub(" ", message.lower())
+    try:
+        dates = _resolve_dates(text, datetime.fromisoformat(current_date).date())
+    except ValueError:
+        return None
+    times, _ = _resolve_times(text)
+    minutes, duration_reasons = _resolve_duration(text)
+    if len(dates) != 1 or len(times) != 1 or duration_reasons:
+        return None
+    return datetime.combine(dates[0], times[0]), minutes
+
+
+def _move_times(cached: UserInputParsed, cached_message: str, message: str,
+                current_date: str) -> Optional[Dict[str, datetime]]:
+    """Shift the cached start/end to the new message's date and time, or None if unsafe."""
+    old = _single_slot(cached_message, current_date)
+    new = _single_slot(message, current_date)
+    if old is None or new is None:
+        return None
+    (old_start, old_minutes), (new_start, new_minutes) = old, new
+
+    # Only move times that demonstrably came from the numbers in the message.
+    if cached.start_time.replace(tzinfo=None) != old_start:
+        return None
+    start = new_start.replace(tzinfo=cached.start_time.tzinfo)
+    update = {'start_time': start}
+
+    if cached.end_time is not None:
+        length = cached.end_time - cached.start_time
+        if length == timedelta(minutes=old_minutes):
+            update['end_time'] = start + timedelta(minutes=new_minutes)
+        elif old_minutes == new_minutes:
+            update['end_time'] = start + length
+        else:
+            return None
+    return update
+
+
+def rehydrate(cached: UserInputParsed, cached_message: str, message: str,
+              current_date: str) -> Optional[UserInputParsed]:
+    """Rewrite a cached parse so it describes `message` instead of `cached_message`."""
+    _, old_emails, old_numbers = normalize_message(cached_message)
+    _, new_emails, new_numbers = normalize_message(message)
+    update = {}
+
+    if cached.patient_email is not None:
+        lowered = [e.lower() for e in old_emails]
+        if str(cached.patient_email).lower() not in lowered:
+            return None
+        update['patient_email'] = new_emails[lowered.index(str(cached.patient_email).lower())]
+
+    if old_numbers != new_numbers:
+        if cached.temporal_expression and NUMBER_RE.search(cached.temporal_expression):
+            return None
+        if cached.start_time is not None:
+            moved = _move_times(cached, cached_message, message, current_date)
+            if moved is None:
+                return None
+            update.update(moved)
+
+    return cached.model_copy(update=update)
+
+
+class ParseCache:
+    """
+    LRU + TTL cache of parse results, optionally backed by a SQLite file.
+
+    The in-memory LRU is always consulted first; with `db_path` set, memory misses fall
+    through to SQLite and every put is written there too, so entries survive restarts
+    and are shared between worker processes.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 21600.0,
+                 db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        # key -> (stored_at, original message, UserInputParsed JSON)
+        self._entries: "OrderedDict[str, Tuple[float, str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        if db_path:
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS parse_cache ("
+                    " key TEXT PRIMARY KEY,"
+                    " message TEXT NOT NULL,"
+                    " parsed TEXT NOT NULL,"
+                    " stored_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS parse_cache_stored_at ON parse_cache (stored_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _lookup(self, key: str) -> Optional[Tuple[float, str, str]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    return entry
+                del self._entries[key]
+                self.expirations += 1
+
+        if not self.db_path:
+            return None
+        row = self._connection().execute(
+            "SELECT stored_at, message, parsed FROM parse_cache WHERE key = ? AND stored_at >= ?",
+            (key, now - self.ttl_seconds),
+        ).fetchone()
+        if row is None:
+            return None
+        self._remember(key, tuple(row))
+        return tuple(row)
+
+    def _remember(self, key: str, entry: Tuple[float, str, str]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, message: str, current_date: str) -> Optional[UserInputParsed]:
+        """Return a re-hydrated parse for `message`, or None on a miss."""
+        entry = self._lookup(cache_key(message, current_date))
+        parsed = None
+        if entry is not None:
+            _, cached_message, payload = entry
+            parsed = rehydrate(UserInputParsed.model_validate_json(payload),
+                               cached_message, message, current_date)
+        with self._lock:
+            if parsed is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return parsed
+
+    def put(self, message: str, current_date: str, parsed: UserInputParsed) -> None:
+        key = cache_key(message, current_date)
+        entry = (time.time(), message, parsed.model_dump_json())
+        self._remember(key, entry)
+        if self.db_path:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO parse_cache (key, message, parsed, stored_at) VALUES (?, ?, ?, ?)",
+                    (key, entry[1], entry[2], entry[0]),
+                )
+                conn.execute("DELETE FROM parse_cache WHERE stored_at < ?", (entry[0] - self.ttl_seconds,))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'size': len(self._entries),
+            }
+
+
+_cache: Optional[ParseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_parse_cache() -> Optional[ParseCache]:
+    """Return the shared parse cache, or None when disabled; taped when `SLOTBOT_CASSETTE` is set."""
+    global _cache
+    settings = get_settings()
+    if not settings.parse_cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                cache = ParseCache(
+                    max_entries=settings.parse_cache_max_entries,
+                    ttl_seconds=settings.parse_cache_ttl_seconds,
+                    db_path=settings.parse_cache_db or None,
+                )
+                if settings.cassette_path:
+                    from .cassette import CassetteParseCache
+                    cache = CassetteParseCache(cache)
+                _cache = cache
+    return _cache
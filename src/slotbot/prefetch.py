@@ -0,0 +1,182 @@
+# src/slotbot/prefetch.py
+"""
+Speculative availability prefetch, run while the message is still being parsed.
+
+Most booking messages name a day ('tuesday at 5', '3 march') that the fast parser's date
+rules find even when they cannot resolve the whole message. When a turn goes to the LLM
+parser, `start_prefetch()` reads those days' free/busy for every clinician with one
+`free_busy_many()` lookup on a small background pool, so the Calendar round trip
+overlaps the parse instead of following it.
+
+Once the parse lands, `AvailabilityPrefetch.match()` keeps the prefetch only if the turn
+is going to read availability on a prefetched day; otherwise it is dropped. The action
+stage runs inside `serving()`, where `prefetched_busy()` answers the slot-search
+lookups that fall inside the prefetched window. Bookings never use it: choosing a
+clinician to book reads the live calendar, and `book()` checks it again under the slot lock.
+
+Off unless `SLOTBOT_PREFETCH=1`.
+"""
+
+import logging
+import threading
+import time as timer
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from .calendar_backend import BusyInterval, get_calendar_backend
+from .clinicians import Clinician, get_clinician_registry
+from .fast_parser import candidate_dates
+from .metrics import PREFETCH_DURATION, PREFETCH_OUTCOMES
+from .models import ConversationState, SessionState, UserInputParsed
+from .settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Longest run of days (first to last mentioned) worth reading speculatively.
+PREFETCH_MAX_DAYS = 7
+# How long a lookup waits for a prefetch still in flight before asking the calendar itself:
+# about one live free/busy round trip, so a slow prefetch never costs more than a live read.
+PREFETCH_WAIT_SECONDS = 1.0
+# Routes whose action stage reads availability.
+_READING_ACTIONS = ('check_availability', 'search_availability', 'execute_operation')
+
+_serving: ContextVar[Optional['AvailabilityPrefetch']] = ContextVar('slotbot_prefetch', default=None)
+
+
+class AvailabilityPrefetch:
+    """The busy intervals of some days for some clinicians, read in the background."""
+
+    def __init__(self, days: Sequence[date], clinicians: Sequence[Clinician]):
+        self.days = sorted(set(days))
+        self.calendar_ids = list(dict.fromkeys(c.calendar_id for c in clinicians))
+        # Whole days in each clinician's own time zone, covered by one window.
+        self.window_start = min(datetime.combine(self.days[0], time(0), c.tz) for c in clinicians)
+        self.window_end = max(datetime.combine(self.days[-1] + timedelta(days=1), time(0), c.tz)
+                              for c in clinicians)
+        self.dropped = False
+        self.used = False
+        self._closed = False
+        self._future: Optional[Future] = None
+
+    def submit(self, executor: ThreadPoolExecutor) -> 'AvailabilityPrefetch':
+        # Run in a copy of the turn's context so the lookup's logs keep the correlation id.
+        self._future = executor.submit(copy_context().run, self._fetch)
+        return self
+
+    def _fetch(self) -> Dict[str, List[BusyInterval]]:
+        started = timer.perf_counter()
+        try:
+            return get_calendar_backend().free_busy_many(self.window_start, self.window_end, self.calendar_ids)
+        finally:
+            PREFETCH_DURATION.observe(timer.perf_counter() - started)
+
+    def match(self, parsed: UserInputParsed, state: SessionState) -> bool:
+        """
+        Keep the prefetch if this turn reads availability on a prefetched day, else drop it.
+
+        A turn without a start time (a range search) is kept too: its tool call only uses
+        the prefetch if the searched window falls inside it.
+        """
+        wanted = (state.next_action in _READING_ACTIONS and parsed.intent != 'cancel'
+                  and (parsed.start_time is None or parsed.start_time.date() in self.days))
+        if not wanted:
+            self.drop()
+        return wanted
+
+    def drop(self) -> None:
+        self.dropped = True
+        if self._future is not None:
+            self._future.cancel()
+
+    def busy(self, start: datetime, end: datetime,
+             calendar_ids: Sequence[str]) -> Optional[Dict[str, List[BusyInterval]]]:
+        """
+        Busy intervals overlapping [start, end) for each calendar, or None when the
+        lookup is not covered (outside the window, another calendar, or the read failed).
+        """
+        if (self.dropped or self._future is None or start.tzinfo is None
+                or start < self.window_start or end > self.window_end
+                or not set(calendar_ids) <= set(self.calendar_ids)):
+            return None
+        try:
+            fetched = self._future.result(timeout=PREFETCH_WAIT_SECONDS)
+        except Exception as e:
+            logger.debug("Availability prefetch not usable: %s", e)
+            return None
+        if any(calendar_id not in fetched for calendar_id in calendar_ids):
+            # Unreadable then; let the live lookup decide.
+            return None
+        self.used = True
+        return {calendar_id: [(s, e) for s, e in fetched[calendar_id] if s < end and e > start]
+                for calendar_id in dict.fromkeys(calendar_ids)}
+
+    def close(self) -> None:
+        """Record how the prefetch ended: 'used', 'unused' (kept but never read) or 'dropped'."""
+        if self._closed:
+            return
+        self._closed = True
+        if self.dropped:
+            outcome = 'dropped'
+        else:
+            outcome = 'used' if self.used else 'unused'
+            if not self.used and self._future is not None:
+                self._future.cancel()
+        PREFETCH_OUTCOMES.inc(outcome=outcome)
+        logger.debug("Availability prefetch of %s: %s", ', '.join(map(str, self.days)), outcome)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # At most one prefetch per chat worker is in flight.
+                _executor = ThreadPoolExecutor(max_workers=max(1, get_settings().chat_max_workers),
+                                               thread_name_prefix='prefetch')
+    return _executor
+
+
+def start_prefetch(user_message: str, current_date: str,
+                   conversation: ConversationState) -> Optional[AvailabilityPrefetch]:
+    """
+    Start reading availability for the days `user_message` mentions (or, for a follow-up
+    naming no day, the day carried from earlier turns). None when prefetching is off or
+    there is nothing worth reading.
+    """
+    if not get_settings().prefetch_enabled:
+        return None
+    days = candidate_dates(user_message, current_date)
+    if not days and conversation.slots.start_time is not None:
+        days = [conversation.slots.start_time.date()]
+    try:
+        today = datetime.fromisoformat(current_date).date()
+    except (TypeError, ValueError):
+        return None
+    days = [day for day in days if day >= today]
+    if not days or (days[-1] - days[0]).days >= PREFETCH_MAX_DAYS:
+        return None
+    return AvailabilityPrefetch(days, list(get_clinician_registry())).submit(_get_executor())
+
+
+@contextmanager
+def serving(prefetch: Optional[AvailabilityPrefetch]) -> Iterator[None]:
+    """Let lookups in this block read from `prefetch` (if it was kept)."""
+    token = _serving.set(prefetch if prefetch is not None and not prefetch.dropped else None)
+    try:
+        yield
+    finally:
+        _serving.reset(token)
+
+
+def prefetched_busy(start: datetime, end: datetime,
+                    calendar_ids: Sequence[str]) -> Optional[Dict[str, List[BusyInterval]]]:
+    """The prefetched answer to a `free_busy_many()` lookup, or None if it must be asked live."""
+    prefetch = _serving.get()
+    return prefetch.busy(start, end, calendar_ids) if prefetch is not None else None
@@ -0,0 +1,285 @@
+# src/slotbot/responses.py
+"""
+Templated replies for the outcomes the pipeline already knows how to describe.
+
+Most turns end in one of a few structured results: the slot is free or busy, free
+slots were found, the appointment was booked (or cancelled) or not, or details are missing.
+`render_response()` turns those into the user-facing reply from per-locale templates,
+so the `format_user_response` LLM call only runs for general queries and for results
+it does not recognise (and not at all when `SLOTBOT_RESPONSE_LLM_FALLBACK` is off).
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from .models import SessionState, UserInputParsed
+
+DEFAULT_LOCALE = 'en'
+
+TEMPLATES: Dict[str, Dict[str, str]] = {
+    'en': {
+        'slot_free': "Good news: {when} is available{with}. Would you like me to book it?",
+        'slot_busy': "Sorry, {when} is already taken. Would you like me to look for other times?",
+        'slots_found': "Here are the free slots I found:\n{slots}\nWhich one would you like to book?",
+        'no_slots': "Sorry, there are no free slots in that range. Would you like me to try different dates?",
+        'booked': "Your appointment{with} on {when} is booked.{details}",
+        'already_booked': "Your appointment{with} on {when} was already booked, so nothing new was added.{details}",
+        'booking_failed': "Sorry, {when} is not available, so I couldn't book it. "
+                          "Would you like me to look for other times?",
+        'series_booked': "All {count} appointments{with} are booked:\n{booked}",
+        'series_partial': "I booked {booked_count} of {count} appointments{with}:\n{booked}\n"
+                          "These times were not available:\n{taken}",
+        'series_failed': "Sorry, none of the {count} appointments could be booked because those times "
+                         "are not available. Would you like me to look for other times?",
+        'cancelled': "Your appointment{with} on {when} is cancelled.",
+        'cancel_not_found': "I couldn't find an appointment on {when} booked in this conversation, so nothing "
+                            "was cancelled. Please contact the clinic to cancel it.",
+        'calendar_error': "Sorry, something went wrong while checking the calendar. Please try again shortly.",
+        'missing_info': "Could you please provide {fields}?",
+        'general': "I can check whether a time is free, find open slots or book an appointment for you. "
+                   "What would you like to do?",
+        'unrecognized': "Sorry, I couldn't complete that request. Could you try rephrasing it?",
+        'link': " You can view it here: {url}",
+        'reference': " Your booking reference is {reference}.",
+        'with': " with {name}",
+        'when': "{weekday}, {day} {month} at {time}",
+        'time': "%I:%M %p",
+        'and': "and",
+        'field.patient_email': "your email address",
+        'field.start_time': "the date and time you would like",
+        'field.end_time': "how long the appointment should be",
+        'weekdays': "Monday,Tuesday,Wednesday,Thursday,Friday,Saturday,Sunday",
+        'months': "January,February,March,April,May,June,July,August,September,October,November,December",
+    },
+    'ms': {
+        'slot_free': "Berita baik: {when} masih kosong{with}. Adakah anda mahu saya menempahnya?",
+        'slot_busy': "Maaf, {when} sudah ditempah. Adakah anda mahu saya mencari masa lain?",
+        'slots_found': "Berikut ialah slot kosong yang saya temui:\n{slots}\nSlot mana yang anda mahu tempah?",
+        'no_slots': "Maaf, tiada slot kosong dalam julat itu. Adakah anda mahu saya mencuba tarikh lain?",
+        'booked': "Temu janji anda{with} pada {when} telah ditempah.{details}",
+        'already_booked': "Temu janji anda{with} pada {when} sudah pun ditempah, jadi tiada tempahan baharu dibuat.{details}",
+        'booking_failed': "Maaf, {when} tidak tersedia, jadi saya tidak dapat menempahnya. "
+                          "Adakah anda mahu saya mencari masa lain?",
+        'series_booked': "Kesemua {count} temu janji{with} telah ditempah:\n{booked}",
+        'series_partial': "Saya telah menempah {booked_count} daripada {count} temu janji{with}:\n{booked}\n"
+                          "Masa berikut tidak tersedia:\n{taken}",
+        'series_failed': "Maaf, tiada satu pun daripada {count} temu janji dapat ditempah kerana masa itu "
+                         "tidak tersedia. Adakah anda mahu saya mencari masa lain?",
+        'cancelled': "Temu janji anda{with} pada {when} telah dibatalkan.",
+        'cancel_not_found': "Saya tidak menemui temu janji pada {when} yang ditempah dalam perbualan ini, jadi "
+                            "tiada apa-apa yang dibatalkan. Sila hubungi klinik untuk membatalkannya.",
+        'calendar_error': "Maaf, berlaku ralat semasa menyemak kalendar. Sila cuba sebentar lagi.",
+        'missing_info': "Boleh anda berikan {fields}?",
+        'general': "Saya boleh menyemak sama ada sesuatu masa kosong, mencari slot kosong atau menempah "
+                   "temu janji untuk anda. Apa yang anda mahu lakukan?",
+        'unrecognized': "Maaf, saya tidak dapat menyelesaikan permintaan itu. Boleh anda nyatakannya semula?",
+        'link': " Anda boleh melihatnya di sini: {url}",
+        'reference': " Nombor rujukan tempahan anda ialah {reference}.",
+        'with': " dengan {name}",
+        'when': "{weekday}, {day} {month} pukul {time}",
+        'time': "%H:%M",
+        'and': "dan",
+        'field.patient_email': "alamat e-mel anda",
+        'field.start_time': "tarikh dan masa yang anda mahu",
+        'field.end_time': "tempoh temu janji",
+        'weekdays': "Isnin,Selasa,Rabu,Khamis,Jumaat,Sabtu,Ahad",
+        'months': "Januari,Februari,Mac,April,Mei,Jun,Julai,Ogos,September,Oktober,November,Disember",
+    },
+}
+
+_URL_RE = re.compile(r"https?://[^\s\"'<>]+")
+_REFERENCE_RE = re.compile(r"Booking reference:\s*([A-Za-z0-9_-]+)")
+_ERROR_RE = re.compile(r"\berror occurred\b", re.IGNORECASE)
+_CLINICIAN_RE = re.compile(r"(?:appointment|booked successfully) with (.+?)(?: was already booked|!)")
+
+
+@dataclass
+class Outcome:
+    """A recognised result of the action stage, with the values its template needs."""
+    kind: str
+    values: Dict[str, Any] = field(default_factory=dict)
+
+
+def _templates(locale: Optional[str]) -> Dict[str, str]:
+    """Templates for `locale` ('ms', 'ms-MY', 'en_SG', ...), falling back to English."""
+    if locale:
+        tag = locale.replace('_', '-').lower()
+        for candidate in (tag, tag.split('-')[0]):
+            if candidate in TEMPLATES:
+                return TEMPLATES[candidate]
+    return TEMPLATES[DEFAULT_LOCALE]
+
+
+def format_when(moment: datetime, locale: Optional[str] = None) -> str:
+    """'Tuesday, 7 January at 5:00 PM' in the given locale."""
+    t = _templates(locale)
+    return t['when'].format(
+        weekday=t['weekdays'].split(',')[moment.weekday()],
+        day=moment.day,
+        month=t['months'].split(',')[moment.month - 1],
+        time=moment.strftime(t['time']).lstrip('0'),
+    )
+
+
+def _join(items: Sequence[str], conjunction: str) -> str:
+    if len(items) <= 1:
+        return ''.join(items)
+    return f"{', '.join(items[:-1])} {conjunction} {items[-1]}"
+
+
+def _bullets(moments: Sequence[datetime], locale: Optional[str],
+             clinicians: Optional[Sequence[Optional[str]]] = None) -> str:
+    names = clinicians or [None] * len(moments)
+    return '\n'.join(f"- {format_when(m, locale)}{_with(name, locale)}" for m, name in zip(moments, names))
+
+
+def _with(clinician: Optional[str], locale: Optional[str]) -> str:
+    """' with Dr Tan', or nothing when the result named no clinician (a solo practice)."""
+    return _templates(locale)['with'].format(name=clinician) if clinician else ''
+
+
+
+def _json_object(text: str) -> Optional[Dict[str, Any]]:
+    """The JSON object in `text` (agents sometimes wrap it in prose or code fences)."""
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _datetime(value: Any) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _series_outcome(appointments: List[Any], clinician: Optional[str] = None) -> Optional[Outcome]:
+    booked, taken = [], []
+    for item in appointments:
+        start = _datetime(item.get('start')) if isinstance(item, dict) else None
+        if start is None:
+            return None
+        (booked if item.get('status') in ('booked', 'duplicate') else taken).append(start)
+    if not booked and not taken:
+        return None
+    kind = 'series_booked' if not taken else ('series_partial' if booked else 'series_failed')
+    return Outcome(kind, {'booked': booked, 'taken': taken, 'clinician': clinician})
+
+
+def classify_action_output(next_action: str, output: str,
+                           parsed: Optional[UserInputParsed] = None) -> Optional[Outcome]:
+    """
+    Recognise the calendar task's result, or return None if it is not one of the
+    known outcomes. Reads the tools' JSON replies and BookAppointmentTool's sentences.
+    """
+    data = _json_object(output)
+    status = str(data.get('status', '')).lower() if data else ''
+    when = parsed.start_time if parsed is not None else None
+
+    if status == 'error' or (data is None and _ERROR_RE.search(output)):
+        return Outcome('calendar_error')
+
+    if next_action == 'check_availability':
+        if status in ('free', 'busy') and when is not None:
+            return Outcome(f"slot_{status}", {'when': when, 'clinician': data.get('clinician')})
+        return None
+
+    if next_action == 'search_availability':
+        if status == 'none':
+            return Outcome('no_slots')
+        if status == 'found':
+            slots = data.get('slots') or []
+            starts = [_datetime(slot.get('start')) if isinstance(slot, dict) else None for slot in slots]
+            if starts and all(starts):
+                return Outcome('slots_found', {'slots': starts,
+                                               'clinicians': [slot.get('clinician') for slot in slots]})
+        return None
+
+    if next_action == 'execute_operation':
+        if data is not None and isinstance(data.get('appointments'), list):
+            return _series_outcome(data['appointments'], data.get('clinician'))
+        if when is None:
+            return None
+        if status == 'cancelled':
+            return Outcome('cancelled', {'when': when, 'clinician': data.get('clinician')})
+        if status == 'not_found':
+            return Outcome('cancel_not_found', {'when': when})
+        lowered = output.lower()
+        url = _URL_RE.search(output)
+        reference = _REFERENCE_RE.search(output)
+        clinician = _CLINICIAN_RE.search(output)
+        details = {
+            'when': when,
+            'clinician': clinician.group(1) if clinician else None,
+            'url': url.group(0).rstrip('.,)') if url else None,
+            'reference': reference.group(1) if reference else None,
+        }
+        if 'already booked' in lowered:
+            return Outcome('already_booked', details)
+        if status == 'booked' or 'booked successfully' in lowered:
+            return Outcome('booked', details)
+        if status == 'failed' or 'status: failed' in lowered or 'not available' in lowered:
+            return Outcome('booking_failed', {'when': when})
+    return None
+
+
+def render(outcome: Outcome, locale: Optional[str] = None) -> str:
+    """Fill in the template for `outcome`."""
+    t = _templates(locale)
+    values = outcome.values
+    fields: Dict[str, Any] = {}
+    if 'when' in values:
+        fields['when'] = format_when(values['when'], locale)
+    fields['with'] = _with(values.get('clinician'), locale)
+    if 'slots' in values:
+        fields['slots'] = _bullets(values['slots'], locale, values.get('clinicians'))
+    if outcome.kind.startswith('series_'):
+        fields.update(booked=_bullets(values['booked'], locale), taken=_bullets(values['taken'], locale),
+                      booked_count=len(values['booked']), count=len(values['booked']) + len(values['taken']))
+    if outcome.kind in ('booked', 'already_booked'):
+        if values.get('url'):
+            fields['details'] = t['link'].format(url=values['url'])
+        elif values.get('reference'):
+            fields['details'] = t['reference'].format(reference=values['reference'])
+        else:
+            fields['details'] = ''
+    return t[outcome.kind].format(**fields)
+
+
+def render_missing_info(missing_info: Sequence[str], locale: Optional[str] = None) -> Optional[str]:
+    """Ask for the missing fields, or None if one of them has no template (e.g. 'intent')."""
+    t = _templates(locale)
+    # The end time follows from the start time, so asking for the start covers both.
+    fields = [name for name in missing_info if not (name == 'end_time' and 'start_time' in missing_info)]
+    if not fields or any(f"field.{name}" not in t for name in fields):
+        return None
+    return t['missing_info'].format(fields=_join([t[f"field.{name}"] for name in fields], t['and']))
+
+
+def render_response(state: SessionState, parsed: Optional[UserInputParsed], action_output: Optional[str],
+                    locale: Optional[str] = None) -> Optional[str]:
+    """
+    The templated reply for this turn, or None when the LLM should phrase it.
+
+    `action_output` is the raw output of `execute_calendar_action` (None if it did not run).
+    """
+    if state.next_action == 'collect_info':
+        return render_missing_info(state.missing_info, locale)
+    if action_output is None:
+        return None
+    outcome = classify_action_output(state.next_action, action_output, parsed)
+    return render(outcome, locale) if outcome is not None else None
+
+
+def fallback_response(state: SessionState, locale: Optional[str] = None) -> str:
+    """The reply used when LLM phrasing is switched off and no template fits."""
+    t = _templates(locale)
+    return t['general'] if state.next_action == 'collect_info' else t['unrecognized']
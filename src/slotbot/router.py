@@ -0,0 +1,79 @@
+# src/slotbot/router.py
+"""
+Deterministic session router that replaces the `session_manager` LLM agent.
+
+The routing rules are fixed (email present means a known identity; the intent plus
+its required fields decide `next_action`), so they are applied in plain Python.
+"""
+
+from typing import List
+
+from .models import SessionState, UserInputParsed
+
+# Fields that must be present before a 'book' or 'cancel' can be executed.
+REQUIRED_FIELDS = {
+    'book': ['start_time', 'end_time', 'patient_email'],
+    'cancel': ['start_time', 'end_time', 'patient_email'],
+}
+
+
+def _merge_missing(*groups: List[str]) -> List[str]:
+    """Concatenate missing-field lists, keeping the first occurrence of each field."""
+    merged: List[str] = []
+    for group in groups:
+        for item in group:
+            if item not in merged:
+                merged.append(item)
+    return merged
+
+
+def route_session(parsed: UserInputParsed) -> SessionState:
+    """Turn the parsed user input into the `SessionState` that drives the rest of the turn."""
+    identity_status = 'known' if parsed.patient_email else 'unknown'
+
+    if parsed.intent == 'check_availability':
+        if parsed.start_time is not None:
+            return SessionState(
+                identity_status=identity_status,
+                info_completeness_status='complete',
+                missing_info=[],
+                next_action='check_availability',
+            )
+        if parsed.temporal_expression:
+            # "any evening next week": answer with a range search instead of asking for a time.
+            return SessionState(
+                identity_status=identity_status,
+                info_completeness_status='complete',
+                missing_info=[],
+                next_action='search_availability',
+            )
+        return SessionState(
+            identity_status=identity_status,
+            info_completeness_status='incomplete',
+            missing_info=['start_time'],
+            next_action='collect_info',
+        )
+
+    if parsed.intent in REQUIRED_FIELDS:
+        missing = [name for name in REQUIRED_FIELDS[parsed.intent] if getattr(parsed, name) is None]
+        if not missing:
+            return SessionState(
+                identity_status=identity_status,
+                info_completeness_status='complete',
+                missing_info=[],
+                next_action='execute_operation',
+            )
+        return SessionState(
+            identity_status=identity_status,
+            info_completeness_status='incomplete',
+            missing_info=_merge_missing(missing, parsed.missing_info),
+            next_action='collect_info',
+        )
+
+    # Any other intent: ask the user what they need.
+    return SessionState(
+        identity_status=identity_status,
+        info_completeness_status='incomplete',
+        missing_info=_merge_missing(['intent'], parsed.missing_info),
+        next_action='collect_info',
+    )
@@ -0,0 +1,172 @@
+# src/slotbot/settings.py
+"""
+Runtime switches for the booking pipeline, read from the environment (or `.env`).
+
+Every setting has a safe default so the crew runs unchanged when nothing is set.
+"""
+
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, '') else default
+
+
+def _env_str(name: str, default: str) -> str:
+    value = os.getenv(name)
+    return value if value not in (None, '') else default
+
+
+def _env_set(name: str) -> FrozenSet[str]:
+    value = os.getenv(name) or ''
+    return frozenset(item.strip() for item in value.split(',') if item.strip())
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Resolve simple messages with the rule-based parser before calling the LLM.
+    fast_parser_enabled: bool = True
+    # Reuse LLM parse results for messages that differ only in emails and numbers.
+    parse_cache_enabled: bool = True
+    parse_cache_max_entries: int = 1024
+    parse_cache_ttl_seconds: float = 21600.0
+    # Optional SQLite file so cached parses survive restarts and are shared by workers.
+    parse_cache_db: str = ''
+    # Answer availability checks from the locally synced busy-interval cache.
+    busy_cache_enabled: bool = True
+    busy_cache_horizon_days: int = 30
+    busy_cache_max_staleness: float = 30.0
+    # Turn engine: 'crew' (the sequential CrewAI pipeline) or 'compact' (one structured
+    # LLM call per turn, calendar tools called directly).
+    engine: str = 'crew'
+    # Model for the compact engine; empty means the crew's nlp_parser model.
+    compact_llm: str = ''
+    # LLM gateway shared by every agent: local requests/tokens-per-minute limits (0 = none),
+    # retries with jittered backoff on 429/5xx, and the longest a call waits for capacity.
+    llm_gateway_enabled: bool = True
+    llm_rpm: int = 0
+    llm_tpm: int = 0
+    llm_max_retries: int = 3
+    llm_backoff_base_seconds: float = 1.0
+    llm_backoff_max_seconds: float = 20.0
+    llm_max_wait_seconds: float = 30.0
+    # Output tokens charged up front for a call when the model sets no max_tokens.
+    llm_output_tokens: int = 512
+    # Conversation memory: turns kept verbatim, summary lines for older turns, and the
+    # longest message (in characters) kept per turn.
+    memory_turns: int = 4
+    memory_summary_lines: int = 8
+    memory_max_chars: int = 500
+    # Reply from locale templates when the outcome is a known one (slot free/busy, booked, ...);
+    # the response LLM then only phrases general queries and unrecognised results, or
+    # nothing at all when the fallback is off.
+    response_templates: bool = True
+    response_llm_fallback: bool = True
+    response_locale: str = 'en'
+    # Where appointments live: 'google' (Google Calendar) or 'sqlite' (a local calendar file).
+    calendar_backend: str = 'google'
+    calendar_db_path: str = 'slotbot_calendar.db'
+    # YAML file listing the clinicians and their calendars; empty means one clinician on the
+    # primary calendar. Time zone of that clinician, and of clinicians listed without one.
+    clinicians_path: str = ''
+    time_zone: str = 'Asia/Singapore'
+    # Read free/busy for the days a message mentions while the LLM parses it.
+    prefetch_enabled: bool = False
+    # Build crews, the Calendar client and the stores in the background at API startup.
+    warmup_enabled: bool = True
+    # /chat runs crew turns on a bounded worker pool; extra requests get a 503 with Retry-After.
+    chat_max_workers: int = 4
+    chat_max_queue: int = 16
+    chat_retry_after_seconds: int = 5
+    # Chat sessions: 'memory' (per process, LRU + TTL) or 'sqlite' (shared across workers).
+    session_store: str = 'memory'
+    session_db_path: str = 'slotbot_sessions.db'
+    session_ttl_seconds: float = 3600.0
+    session_max_entries: int = 10000
+    # Optional background trace store for task artifacts: '' (off), 'jsonl' or 'sqlite'.
+    trace_sink: str = ''
+    trace_path: str = ''
+    trace_max_bytes: int = 10_000_000
+    trace_backups: int = 3
+    # Optional cassette (JSONL, .gz for gzip) taping each turn's LLM and Calendar traffic:
+    # 'record' appends to it, 'replay' answers the turns from it without any network.
+    cassette_path: str = ''
+    cassette_mode: str = 'record'
+    # Logging: quiet by default. 'json' emits one JSON object per line.
+    log_level: str = 'WARNING'
+    log_format: str = 'text'
+    # Session ids that get CrewAI's verbose console output ('*' for every session).
+    verbose_sessions: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            fast_parser_enabled=_env_flag('SLOTBOT_FAST_PARSER', True),
+            parse_cache_enabled=_env_flag('SLOTBOT_PARSE_CACHE', True),
+            parse_cache_max_entries=_env_int('SLOTBOT_PARSE_CACHE_MAX_ENTRIES', 1024),
+            parse_cache_ttl_seconds=_env_float('SLOTBOT_PARSE_CACHE_TTL_SECONDS', 21600.0),
+            parse_cache_db=_env_str('SLOTBOT_PARSE_CACHE_DB', ''),
+            busy_cache_enabled=_env_flag('SLOTBOT_BUSY_CACHE', True),
+            busy_cache_horizon_days=_env_int('SLOTBOT_BUSY_CACHE_HORIZON_DAYS', 30),
+            busy_cache_max_staleness=_env_float('SLOTBOT_BUSY_CACHE_MAX_STALENESS', 30.0),
+            engine=_env_str('SLOTBOT_ENGINE', 'crew').lower(),
+            compact_llm=_env_str('SLOTBOT_COMPACT_LLM', ''),
+            llm_gateway_enabled=_env_flag('SLOTBOT_LLM_GATEWAY', True),
+            llm_rpm=_env_int('SLOTBOT_LLM_RPM', 0),
+            llm_tpm=_env_int('SLOTBOT_LLM_TPM', 0),
+            llm_max_retries=_env_int('SLOTBOT_LLM_MAX_RETRIES', 3),
+            llm_backoff_base_seconds=_env_float('SLOTBOT_LLM_BACKOFF_BASE_SECONDS', 1.0),
+            llm_backoff_max_seconds=_env_float('SLOTBOT_LLM_BACKOFF_MAX_SECONDS', 20.0),
+            llm_max_wait_seconds=_env_float('SLOTBOT_LLM_MAX_WAIT_SECONDS', 30.0),
+            llm_output_tokens=_env_int('SLOTBOT_LLM_OUTPUT_TOKENS', 512),
+            memory_turns=_env_int('SLOTBOT_MEMORY_TURNS', 4),
+            memory_summary_lines=_env_int('SLOTBOT_MEMORY_SUMMARY_LINES', 8),
+            memory_max_chars=_env_int('SLOTBOT_MEMORY_MAX_CHARS', 500),
+            response_templates=_env_flag('SLOTBOT_RESPONSE_TEMPLATES', True),
+            response_llm_fallback=_env_flag('SLOTBOT_RESPONSE_LLM_FALLBACK', True),
+            response_locale=_env_str('SLOTBOT_RESPONSE_LOCALE', 'en'),
+            calendar_backend=_env_str('SLOTBOT_CALENDAR_BACKEND', 'google').lower(),
+            calendar_db_path=_env_str('SLOTBOT_CALENDAR_DB', 'slotbot_calendar.db'),
+            clinicians_path=_env_str('SLOTBOT_CLINICIANS', ''),
+            time_zone=_env_str('SLOTBOT_TIME_ZONE', 'Asia/Singapore'),
+            prefetch_enabled=_env_flag('SLOTBOT_PREFETCH', False),
+            warmup_enabled=_env_flag('SLOTBOT_WARMUP', True),
+            chat_max_workers=_env_int('SLOTBOT_CHAT_MAX_WORKERS', 4),
+            chat_max_queue=_env_int('SLOTBOT_CHAT_MAX_QUEUE', 16),
+            chat_retry_after_seconds=_env_int('SLOTBOT_CHAT_RETRY_AFTER_SECONDS', 5),
+            session_store=_env_str('SLOTBOT_SESSION_STORE', 'memory').lower(),
+            session_db_path=_env_str('SLOTBOT_SESSION_DB', 'slotbot_sessions.db'),
+            session_ttl_seconds=_env_float('SLOTBOT_SESSION_TTL_SECONDS', 3600.0),
+            session_max_entries=_env_int('SLOTBOT_SESSION_MAX_ENTRIES', 10000),
+            trace_sink=_env_str('SLOTBOT_TRACE_SINK', '').lower(),
+            trace_path=_env_str('SLOTBOT_TRACE_PATH', ''),
+            trace_max_bytes=_env_int('SLOTBOT_TRACE_MAX_BYTES', 10_000_000),
+            trace_backups=_env_int('SLOTBOT_TRACE_BACKUPS', 3),
+            cassette_path=_env_str('SLOTBOT_CASSETTE', ''),
+            cassette_mode=_env_str('SLOTBOT_CASSETTE_MODE', 'record').lower(),
+            log_level=_env_str('SLOTBOT_LOG_LEVEL', 'WARNING'),
+            log_format=_env_str('SLOTBOT_LOG_FORMAT', 'text').lower(),
+            verbose_sessions=_env_set('SLOTBOT_VERBOSE_SESSIONS'),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings, read once from the environment."""
+    return Settings.from_env()
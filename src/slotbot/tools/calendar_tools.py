@@ -1,20 +1,45 @@
 from crewai.tools import BaseTool
 import os
 import json
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow  # Requires 'uv pip install google-auth-oauthlib'
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from ..google_api.Oauth_client import get_calendar_service
+from ..bulk_booking import MAX_OCCURRENCES, book_series, expand_recurrence
+from ..calendar_backend import appointment_event, booking_event_id, get_calendar_backend
+from ..clinicians import Clinician, get_clinician_registry
+from .slot_search import MAX_SEARCH_DAYS, choose_clinician, free_clinicians, search_free_slots
 from pydantic import BaseModel, Field
 
+CLINICIAN_FIELD = "Clinician's name or id, if the patient asked for one; leave empty for any clinician"
+
+
+def _named(clinician: Clinician) -> Dict[str, str]:
+    """The clinician to mention in a result; a solo practice has no one to tell apart."""
+    return {"clinician": clinician.name} if len(get_clinician_registry()) > 1 else {}
+
+
+def _with(clinician: Clinician) -> str:
+    named = _named(clinician)
+    return f" with {named['clinician']}" if named else ""
+
 
 class CheckAvailabilityArgs(BaseModel):
     date: str = Field(..., description="Date in YYYY-MM-DD format")
     time: str = Field(..., description="Time in HH:MM format (24-hour)")
     duration: int = Field(60, description="Duration in minutes to check (default: 60)")
+    clinician: Optional[str] = Field(None, description=CLINICIAN_FIELD)
+
+
+class FindFreeSlotsArgs(BaseModel):
+    start_date: str = Field(..., description="First day of the search window in YYYY-MM-DD format")
+    end_date: str = Field(..., description="Last day of the search window in YYYY-MM-DD format (inclusive)")
+    duration: int = Field(60, gt=0, description="Appointment length in minutes (default: 60)")
+    granularity: int = Field(30, gt=0, description="Minutes between candidate start times (default: 30)")
+    earliest_time: Optional[str] = Field(None, description="Earliest start of day in HH:MM format (24-hour)")
+    latest_time: Optional[str] = Field(None, description="Latest end of day in HH:MM format (24-hour)")
+    weekdays_only: bool = Field(False, description="Only search Monday to Friday")
+    max_results: int = Field(5, gt=0, description="Maximum number of slots to return (default: 5)")
+    clinician: Optional[str] = Field(None, description=CLINICIAN_FIELD)
 
 
 class BookAppointmentArgs(BaseModel):
@@ -23,11 +48,32 @@ class BookAppointmentArgs(BaseModel):
     patient_email: str = Field(..., description="Patient's email address")
     duration: int = Field(60, description="Duration in minutes (default: 60)")
     notes: Optional[str] = Field("General appointment", description="Additional notes for the appointment (optional)")
+    clinician: Optional[str] = Field(None, description=CLINICIAN_FIELD)
+
+
+class BookSeriesArgs(BaseModel):
+    time: str = Field(..., description="Start time of every appointment in HH:MM format (24-hour)")
+    patient_email: str = Field(..., description="Patient's email address")
+    dates: Optional[List[str]] = Field(None, description="Explicit list of dates in YYYY-MM-DD format")
+    start_date: Optional[str] = Field(None, description="First date of a recurring series in YYYY-MM-DD format")
+    recurrence: Optional[str] = Field(None, description="Recurrence rule for the series, e.g. 'FREQ=WEEKLY;COUNT=8'")
+    duration: int = Field(60, description="Duration of each appointment in minutes (default: 60)")
+    notes: Optional[str] = Field("General appointment", description="Additional notes for the appointments (optional)")
+    clinician: Optional[str] = Field(None, description=CLINICIAN_FIELD)
+
+class CancelAppointmentArgs(BaseModel):
+    date: str = Field(..., description="Date of the appointment in YYYY-MM-DD format")
+    time: str = Field(..., description="Start time of the appointment in HH:MM format (24-hour)")
+    patient_email: str = Field(..., description="Patient's email address")
+    duration: int = Field(60, description="Duration of the appointment in minutes (default: 60)")
+    clinician: Optional[str] = Field(None, description=CLINICIAN_FIELD)
+
 
 class BookAppointmentTool(BaseTool):
     name: str = "BookAppointmentTool"
     description: str = """
-    Book an appointment in Google Calendar.
+    Book an appointment in the clinic calendar. Checks that the slot is free as part
+    of the booking, so there is no need to check availability first.
     
     Required parameters:
     - date: Date in YYYY-MM-DD format
@@ -37,47 +83,50 @@ class BookAppointmentTool(BaseTool):
     
     Optional parameters:
     - notes: Additional notes for the appointment
+    - clinician: Clinician's name or id; without it the first clinician free at that time is booked
     """
     args_schema: type[BaseModel] = BookAppointmentArgs
+    # Set by the crew for each turn; with the slot it forms the booking's idempotency key.
+    session_id: Optional[str] = None
 
-    def _run(self, date: str, time: str, patient_email: str, duration: int, notes: Optional[str] = None) -> str:
+    def _run(self, date: str, time: str, patient_email: str, duration: int, notes: Optional[str] = None,
+             clinician: Optional[str] = None) -> str:
         """
-        Books an appointment in Google Calendar.
+        Atomically checks the slot and books it in the chosen clinician's calendar.
         """
         try:
-            service = get_calendar_service()
-
             # Combine date and time strings and parse into datetime objects
             start_datetime_str = f"{date}T{time}"
             start_datetime = datetime.strptime(start_datetime_str, "%Y-%m-%dT%H:%M")
             end_datetime = start_datetime + timedelta(minutes=duration)
 
-            # Format datetimes for Google Calendar API (ISO 8601 format)
-            # Assuming a default timezone, e.g., 'Asia/Singapore' based on environment details.
-            # This might need to be made configurable if users are in different timezones.
-            timezone = 'Asia/Singapore' 
-            start_iso = start_datetime.isoformat()
-            end_iso = end_datetime.isoformat()
-
-            event_body = {
-                'summary': 'Appointment', # Generic summary as appointment_type is removed
-                'description': notes if notes else 'General appointment',
-                'start': {
-                    'dateTime': start_iso,
-                    'timeZone': timezone,
-                },
-                'end': {
-                    'dateTime': end_iso,
-                    'timeZone': timezone,
-                },
-                'attendees': [
-                    {'email': patient_email},
-                ],
-            }
+            # Any clinician: one free/busy lookup over every calendar picks the first one free
+            # (or the one a retry of this booking already went to).
+            requester = self.session_id or patient_email.lower()
+            chosen = choose_clinician(get_clinician_registry().select(clinician), [start_datetime],
+                                      timedelta(minutes=duration), requester=requester)
+
+            # Naive local times; the event's timeZone (the clinician's) places them.
+            event_body = appointment_event(start_datetime, end_datetime, patient_email, notes,
+                                           time_zone=chosen.time_zone)
+
+            # Same session + same slot -> same event id, so retries and double-submits are no-ops.
+            event_body['id'] = booking_event_id(
+                requester, chosen.calendar_id, chosen.localize(start_datetime), chosen.localize(end_datetime))
+
+            result = get_calendar_backend().book(event_body, chosen.calendar_id)
+            if result.status == 'conflict':
+                return "The requested time slot is not available, so nothing was booked. Status: failed"
+            if result.status == 'failed':
+                return f"An error occurred while booking the appointment: {result.error}"
 
-            created_event = service.events().insert(calendarId='primary', body=event_body).execute()
-            
-            return f"Appointment booked successfully! You can view it at: {created_event.get('htmlLink')}"
+            created_event = result.event
+            prefix = (f"This appointment{_with(chosen)} was already booked; no new booking was made."
+                      if result.status == 'duplicate' else f"Appointment booked successfully{_with(chosen)}!")
+            link = created_event.get('htmlLink')
+            if link:
+                return f"{prefix} You can view it at: {link}"
+            return f"{prefix} Booking reference: {created_event['id']}"
 
         except HttpError as error:
             return f"An error occurred while booking the appointment: {error}"
@@ -85,10 +134,120 @@ class BookAppointmentTool(BaseTool):
             return f"An unexpected error occurred: {e}"
 
 
+class BookSeriesTool(BaseTool):
+    name: str = "BookSeriesTool"
+    description: str = f"""
+    Book a series of appointments at once, e.g. 'weekly sessions for eight weeks'.
+    All dates are checked and booked together; the result says which were booked
+    and which were taken.
+
+    Required parameters:
+    - time: Start time of every appointment in HH:MM format (24-hour)
+    - patient_email: Patient's email address
+    - either dates: list of dates in YYYY-MM-DD format (at most {MAX_OCCURRENCES})
+    - or start_date (YYYY-MM-DD) and recurrence, e.g. 'FREQ=WEEKLY;COUNT=8' or 'FREQ=WEEKLY;BYDAY=MO,TH;COUNT=6'
+
+    Optional parameters:
+    - duration: Duration of each appointment in minutes (default: 60)
+    - notes: Additional notes for the appointments
+    - clinician: Clinician's name or id; without it the clinician free for most of the dates is booked
+    """
+    args_schema: type[BaseModel] = BookSeriesArgs
+    # Set by the crew for each turn, like BookAppointmentTool.session_id.
+    session_id: Optional[str] = None
+
+    def _run(self, time: str, patient_email: str, dates: Optional[List[str]] = None,
+             start_date: Optional[str] = None, recurrence: Optional[str] = None,
+             duration: int = 60, notes: Optional[str] = None, clinician: Optional[str] = None) -> str:
+        """
+        Books every occurrence with one free/busy lookup and one batched insert.
+        """
+        try:
+            candidates = get_clinician_registry().select(clinician)
+            if dates and len(dates) > MAX_OCCURRENCES:
+                # Same cap as a recurrence rule gets.
+                return json.dumps({"status": "error",
+                                   "message": f"At most {MAX_OCCURRENCES} appointments can be booked at once."})
+            if dates:
+                wall_times = [datetime.strptime(f"{d}T{time}", "%Y-%m-%dT%H:%M") for d in dates]
+            elif start_date and recurrence:
+                first = candidates[0].localize(datetime.strptime(f"{start_date}T{time}", "%Y-%m-%dT%H:%M"))
+                wall_times = [start.replace(tzinfo=None) for start in expand_recurrence(first, recurrence)]
+            else:
+                return json.dumps({"status": "error", "message": "Give either dates or start_date with recurrence."})
+
+            # The whole series goes to one clinician: the one free for most of it, or the
+            # one an earlier submission of it went to.
+            requester = self.session_id or patient_email.lower()
+            chosen = choose_clinician(candidates, wall_times, timedelta(minutes=duration), requester=requester)
+            starts = [chosen.localize(start) for start in wall_times]
+            items = book_series(starts, timedelta(minutes=duration), patient_email, notes,
+                                requester=requester, clinician=chosen)
+            booked = sum(item.result.status in ('booked', 'duplicate') for item in items)
+            status = "booked" if booked == len(items) else ("partial" if booked else "failed")
+            return json.dumps({
+                "status": status,
+                "message": f"Booked {booked} of {len(items)} appointment(s){_with(chosen)}.",
+                **_named(chosen),
+                "appointments": [
+                    {"start": item.start.isoformat(), "status": item.result.status}
+                    for item in items
+                ],
+            })
+
+        except Exception as e:
+            return json.dumps({"status": "error", "message": f"An unexpected error occurred: {e}"})
+
+
+class CancelAppointmentTool(BaseTool):
+    name: str = "CancelAppointmentTool"
+    description: str = """
+    Cancel an appointment that was booked in this conversation.
+
+    Required parameters:
+    - date: Date of the appointment in YYYY-MM-DD format
+    - time: Start time of the appointment in HH:MM format (24-hour)
+    - patient_email: Patient's email address
+
+    Optional parameters:
+    - duration: Duration of the appointment in minutes (default: 60)
+    - clinician: Clinician's name or id, if the patient named one
+    """
+    args_schema: type[BaseModel] = CancelAppointmentArgs
+    # Set by the crew for each turn, like BookAppointmentTool.session_id.
+    session_id: Optional[str] = None
+
+    def _run(self, date: str, time: str, patient_email: str, duration: int = 60,
+             clinician: Optional[str] = None) -> str:
+        """
+        Finds the booking by its idempotency key, so only an appointment this session (or,
+        without one, this email) booked can be cancelled.
+        """
+        try:
+            start = datetime.strptime(f"{date}T{time}", "%Y-%m-%dT%H:%M")
+            end = start + timedelta(minutes=duration)
+            requester = self.session_id or patient_email.lower()
+            backend = get_calendar_backend()
+            for candidate in get_clinician_registry().select(clinician):
+                event_id = booking_event_id(requester, candidate.calendar_id,
+                                            candidate.localize(start), candidate.localize(end))
+                existing = backend.get_event(event_id, candidate.calendar_id)
+                if existing is not None and existing.get('status') != 'cancelled':
+                    backend.delete(event_id, candidate.calendar_id)
+                    return json.dumps({"status": "cancelled",
+                                       "message": f"The appointment{_with(candidate)} was cancelled.",
+                                       **_named(candidate)})
+            return json.dumps({"status": "not_found",
+                               "message": "No appointment booked in this conversation matches; nothing was cancelled."})
+
+        except Exception as e:
+            return json.dumps({"status": "error", "message": f"An unexpected error occurred: {e}"})
+
+
 class CheckAvailabilityTool(BaseTool):
     name: str = "CheckAvailabilityTool"
     description: str = """
-    Check if a specific time slot is available in the Google Calendar.
+    Check if a specific time slot is available in the clinic calendar.
 
     Required parameters:
     - date: Date in YYYY-MM-DD format
@@ -96,44 +255,94 @@ class CheckAvailabilityTool(BaseTool):
     
     Optional parameters:
     - duration: Duration in minutes to check (default: 60)
+    - clinician: Clinician's name or id; without it any clinician free at that time will do
     """
     args_schema: type[BaseModel] = CheckAvailabilityArgs
 
-    def _run(self, date: str, time: str, duration: int = 60) -> str:
+    def _run(self, date: str, time: str, duration: int = 60, clinician: Optional[str] = None) -> str:
         """
-        Checks for conflicting events in the Google Calendar for a given time slot using the freebusy API.
+        Checks the slot for every candidate clinician with one free/busy lookup.
         """
         try:
-            service = get_calendar_service()
-
-            # Define the timezone for Singapore (UTC+8)
-            sgt = timezone(timedelta(hours=8))
-
-            # Combine date and time and parse into a naive datetime object
+            # Combine date and time and parse into a naive datetime object (each clinician's local time)
             start_datetime_str = f"{date}T{time}"
             naive_start_datetime = datetime.strptime(start_datetime_str, "%Y-%m-%dT%H:%M")
 
-            # Make the datetime object timezone-aware using the Singapore timezone
-            start_datetime_aware = naive_start_datetime.replace(tzinfo=sgt)
-            end_datetime_aware = start_datetime_aware + timedelta(minutes=duration)
+            # One lookup on the calendar backend for every calendar (for Google: one query,
+            # or the busy cache for the default calendar when it covers the slot).
+            free = free_clinicians(get_clinician_registry().select(clinician), naive_start_datetime,
+                                   timedelta(minutes=duration))
 
-            # Format for Google Calendar API (RFC3339 format)
-            time_min = start_datetime_aware.isoformat()
-            time_max = end_datetime_aware.isoformat()
+            if free:
+                chosen = free[0][2]
+                return json.dumps({"status": "free", "message": f"The time slot is available{_with(chosen)}.",
+                                   **_named(chosen)})
+            else:
+                return json.dumps({"status": "busy", "message": "The time slot is not available."})
 
-            freebusy_query = {
-                "timeMin": time_min,
-                "timeMax": time_max,
-                "items": [{"id": "primary"}]
-            }
+        except Exception as e:
+            return json.dumps({"status": "error", "message": f"An unexpected error occurred: {e}"})
 
-            freebusy_result = service.freebusy().query(body=freebusy_query).execute()
-            busy_slots = freebusy_result.get('calendars', {}).get('primary', {}).get('busy', [])
 
-            if not busy_slots:
-                return json.dumps({"status": "free", "message": "The time slot is available."})
-            else:
-                return json.dumps({"status": "busy", "message": "The time slot is not available."})
+class FindFreeSlotsTool(BaseTool):
+    name: str = "FindFreeSlotsTool"
+    description: str = f"""
+    Find the first free appointment slots inside a date range, e.g. for
+    'any evening next week' or 'sometime on Friday'.
+
+    Required parameters:
+    - start_date: First day of the search window in YYYY-MM-DD format
+    - end_date: Last day of the search window in YYYY-MM-DD format (inclusive), at most {MAX_SEARCH_DAYS} days on
+
+    Optional parameters:
+    - duration: Appointment length in minutes (default: 60)
+    - granularity: Minutes between candidate start times (default: 30)
+    - earliest_time: Earliest start of day in HH:MM format (24-hour), e.g. '17:00' for evenings
+    - latest_time: Latest end of day in HH:MM format (24-hour)
+    - weekdays_only: Only search Monday to Friday (default: false)
+    - max_results: Maximum number of slots to return (default: 5)
+    - clinician: Clinician's name or id; without it the earliest slots with any clinician are returned
+    """
+    args_schema: type[BaseModel] = FindFreeSlotsArgs
+
+    def _run(self, start_date: str, end_date: str, duration: int = 60, granularity: int = 30,
+             earliest_time: Optional[str] = None, latest_time: Optional[str] = None,
+             weekdays_only: bool = False, max_results: int = 5, clinician: Optional[str] = None) -> str:
+        """
+        Returns the first free slots in the window using a single busy-interval lookup.
+        """
+        try:
+            # Naive bounds: each clinician's days run in their own time zone.
+            window_start = datetime.strptime(start_date, "%Y-%m-%d")
+            window_end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+            if window_end - window_start > timedelta(days=MAX_SEARCH_DAYS):
+                return json.dumps({"status": "error",
+                                   "message": f"At most {MAX_SEARCH_DAYS} days can be searched at once."})
+
+            working_hours = None
+            if earliest_time or latest_time:
+                working_hours = (
+                    datetime.strptime(earliest_time or "00:00", "%H:%M").time(),
+                    datetime.strptime(latest_time or "00:00", "%H:%M").time(),
+                )
+
+            slots = search_free_slots(
+                get_clinician_registry().select(clinician), window_start, window_end,
+                duration=timedelta(minutes=duration),
+                granularity=timedelta(minutes=granularity),
+                working_hours=working_hours,
+                weekdays=range(5) if weekdays_only else None,
+                limit=max_results,
+            )
+
+            if not slots:
+                return json.dumps({"status": "none", "message": "No free slots in that range.", "slots": []})
+            return json.dumps({
+                "status": "found",
+                "message": f"Found {len(slots)} free slot(s).",
+                "slots": [{"start": start.isoformat(), "end": end.isoformat(), **_named(chosen)}
+                          for start, end, chosen in slots],
+            })
 
         except Exception as e:
             return json.dumps({"status": "error", "message": f"An unexpected error occurred: {e}"})
@@ -0,0 +1,248 @@
+"""
+Range-based free-slot search, across one clinician or many.
+
+One free/busy lookup covers the whole search window and every calendar asked about
+(`CalendarBackend.free_busy_many()`: a single Google query for all of them). The free
+slots of each clinician are then found with a forward sweep over their merged busy
+intervals, and the per-clinician sweeps are merged lazily, earliest slot first.
+"""
+
+import heapq
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ..calendar_backend import BusyInterval, booking_event_id, get_calendar_backend
+from ..cassette import turn_now
+from ..clinicians import Clinician
+from ..prefetch import prefetched_busy
+
+Slot = Tuple[datetime, datetime]
+ClinicianSlot = Tuple[datetime, datetime, Clinician]
+
+# Longest window one search may cover; callers reject longer ones before any lookup.
+MAX_SEARCH_DAYS = 31
+
+
+def merge_intervals(intervals: Iterable[Slot]) -> List[Slot]:
+    """Sort and merge overlapping or touching intervals."""
+    merged: List[Slot] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _ceil_to_grid(moment: datetime, granularity: timedelta) -> datetime:
+    """Round up to the next multiple of `granularity` counted from local midnight."""
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    steps = -(-(moment - midnight) // granularity)
+    return midnight + steps * granularity
+
+
+def _open_ranges(window_start: datetime, window_end: datetime,
+                 working_hours: Optional[Tuple[time, time]],
+                 weekdays: Optional[Sequence[int]]) -> Iterator[Slot]:
+    """Yield the parts of the window that fall inside working hours, in order."""
+    if weekdays and not set(weekdays) <= set(range(7)):
+        raise ValueError(f"weekdays must be 0 (Monday) to 6 (Sunday), got {sorted(set(weekdays))}")
+    if working_hours is None and not weekdays:
+        yield window_start, window_end
+        return
+
+    day_open, day_close = working_hours or (time(0), time(0))
+    tz = window_start.tzinfo
+    day: date = window_start.date()
+    while day <= window_end.date():
+        if not weekdays or day.weekday() in weekdays:
+            opens = datetime.combine(day, day_open, tz)
+            closes = datetime.combine(day, day_close, tz)
+            if closes <= opens:
+                # A closing time of 00:00 (or earlier than opening) runs to the next midnight.
+                closes += timedelta(days=1)
+            start, end = max(opens, window_start), min(closes, window_end)
+            if start < end:
+                yield start, end
+        day += timedelta(days=1)
+
+
+def iter_free_slots(busy: Iterable[Slot], window_start: datetime, window_end: datetime,
+                    duration: timedelta, granularity: timedelta,
+                    working_hours: Optional[Tuple[time, time]] = None,
+                    weekdays: Optional[Sequence[int]] = None) -> Iterator[Slot]:
+    """
+    Yield the free slots of `duration` inside the window, earliest first.
+
+    Slot starts sit on a `granularity` grid from local midnight. `working_hours` is an
+    (open, close) pair of local times and `weekdays` uses Monday=0 numbering. The busy
+    list is walked once: whenever a candidate collides with a busy interval the sweep
+    jumps straight past that interval.
+    """
+    if duration <= timedelta(0) or granularity <= timedelta(0):
+        raise ValueError(f"duration and granularity must be positive, got {duration} and {granularity}")
+    tz = window_start.tzinfo
+    merged = merge_intervals((start.astimezone(tz), end.astimezone(tz)) for start, end in busy)
+    i = 0
+
+    for open_start, open_end in _open_ranges(window_start, window_end, working_hours, weekdays):
+        candidate = _ceil_to_grid(open_start, granularity)
+        while candidate + duration <= open_end:
+            while i < len(merged) and merged[i][1] <= candidate:
+                i += 1
+            if i < len(merged) and merged[i][0] < candidate + duration:
+                candidate = _ceil_to_grid(merged[i][1], granularity)
+                continue
+            yield candidate, candidate + duration
+            candidate += granularity
+
+
+def find_free_slots(busy: Iterable[Slot], window_start: datetime, window_end: datetime,
+                    duration: timedelta, granularity: timedelta,
+                    working_hours: Optional[Tuple[time, time]] = None,
+                    weekdays: Optional[Sequence[int]] = None,
+                    limit: int = 5) -> List[Slot]:
+    """Return up to `limit` free slots of `duration` inside the window (see `iter_free_slots()`)."""
+    return list(islice(iter_free_slots(busy, window_start, window_end, duration, granularity,
+                                       working_hours=working_hours, weekdays=weekdays), limit))
+
+
+def _tagged(sweep: Iterable[Slot], index: int) -> Iterator[Tuple[datetime, int, datetime]]:
+    for start, end in sweep:
+        yield start, index, end
+
+
+def merge_slot_sweeps(sweeps: Sequence[Iterable[Slot]], limit: int = 5) -> List[Tuple[datetime, datetime, int]]:
+    """
+    Merge per-calendar sweeps into up to `limit` (start, end, sweep index) slots.
+
+    Slots come earliest first, and a start time several calendars are free at is listed
+    once, for the first of them in `sweeps` order. The sweeps are consumed lazily, so none
+    runs much past the last slot returned.
+    """
+    slots: List[Tuple[datetime, datetime, int]] = []
+    for start, index, end in heapq.merge(*(_tagged(sweep, i) for i, sweep in enumerate(sweeps))):
+        if slots and slots[-1][0] == start:
+            continue
+        slots.append((start, end, index))
+        if len(slots) >= limit:
+            break
+    return slots
+
+
+def _busy_for(clinicians: Sequence[Clinician], slots: Dict[str, List[Slot]],
+              use_prefetch: bool = False) -> Dict[str, List[BusyInterval]]:
+    """
+    One free/busy lookup spanning every clinician's `slots` (keyed by clinician id). With
+    `use_prefetch`, answered from the turn's availability prefetch when it covers the span;
+    booking paths leave it off, since the prefetch may predate another booking.
+    """
+    bounds = [moment for spans in slots.values() for span in spans for moment in span]
+    start, end = min(bounds), max(bounds)
+    calendar_ids = [clinician.calendar_id for clinician in clinicians]
+    busy = prefetched_busy(start, end, calendar_ids) if use_prefetch else None
+    return busy if busy is not None else get_calendar_backend().free_busy_many(start, end, calendar_ids)
+
+
+def _is_free(busy: Sequence[BusyInterval], slot: Slot) -> bool:
+    return not any(start < slot[1] and end > slot[0] for start, end in busy)
+
+
+def search_free_slots(clinicians: Sequence[Clinician], window_start: datetime, window_end: datetime,
+                      duration: timedelta, granularity: timedelta,
+                      working_hours: Optional[Tuple[time, time]] = None,
+                      weekdays: Optional[Sequence[int]] = None,
+                      limit: int = 5, use_prefetch: bool = True) -> List[ClinicianSlot]:
+    """
+    The first free slots with any of `clinicians`, each with the clinician who is free.
+
+    Naive window bounds and working hours are read in each clinician's own time zone.
+    Every calendar is looked up once for the whole window (from the turn's prefetch when
+    `use_prefetch` and it covers the window), and the clinicians' sweeps are merged so the
+    earliest free provider comes first.
+    """
+    # Never offer slots that have already started (as of the recorded turn, when replaying).
+    now = turn_now()
+    windows: Dict[str, List[Slot]] = {}
+    for clinician in clinicians:
+        start, end = max(clinician.localize(window_start), now.astimezone(clinician.tz)), clinician.localize(window_end)
+        if start < end:
+            windows[clinician.id] = [(start, end)]
+    searched = [clinician for clinician in clinicians if clinician.id in windows]
+    if not searched:
+        return []
+
+    busy = _busy_for(searched, windows, use_prefetch)
+    # A calendar that could not be read offers no slots.
+    readable = [clinician for clinician in searched if clinician.calendar_id in busy]
+    sweeps = [iter_free_slots(busy[clinician.calendar_id], *windows[clinician.id][0], duration, granularity,
+                              working_hours=working_hours, weekdays=weekdays)
+              for clinician in readable]
+    return [(start, end, readable[index]) for start, end, index in merge_slot_sweeps(sweeps, limit)]
+
+
+def free_clinicians(clinicians: Sequence[Clinician], start: datetime, duration: timedelta,
+                    use_prefetch: bool = True) -> List[ClinicianSlot]:
+    """
+    The clinicians free for the whole slot, in registry order, from one free/busy lookup
+    over all their calendars (from the turn's prefetch when `use_prefetch` and it covers
+    the slot). A naive `start` is read in each clinician's own time zone.
+    """
+    slots = {c.id: [(c.localize(start), c.localize(start) + duration)] for c in clinicians}
+    busy = _busy_for(clinicians, slots, use_prefetch)
+    return [(*slots[c.id][0], c) for c in clinicians
+            if c.calendar_id in busy and _is_free(busy[c.calendar_id], slots[c.id][0])]
+
+
+def _holding_booking(clinicians: Sequence[Clinician], slots: Dict[str, List[Slot]],
+                     busy: Dict[str, List[BusyInterval]], requester: str) -> Optional[Clinician]:
+    """
+    The clinician whose calendar already has `requester`'s booking of one of their `slots`.
+
+    Only clinicians busy at one of the slots can hold it; their `booking_event_id()`s are
+    fetched by id (`CalendarBackend.get_events()`), one lookup per such clinician.
+    """
+    backend = get_calendar_backend()
+    for clinician in clinicians:
+        taken = [slot for slot in slots[clinician.id]
+                 if clinician.calendar_id in busy and not _is_free(busy[clinician.calendar_id], slot)]
+        if not taken:
+            continue
+        ids = [booking_event_id(requester, clinician.calendar_id, start, end) for start, end in taken]
+        events = backend.get_events(ids, clinician.calendar_id)
+        if any(event.get('status') != 'cancelled' for event in events.values()):
+            return clinician
+    return None
+
+
+def choose_clinician(clinicians: Sequence[Clinician], starts: Sequence[datetime], duration: timedelta,
+                     requester: Optional[str] = None) -> Clinician:
+    """
+    The clinician free for most of `starts` (the first in registry order on a tie).
+
+    A single candidate is returned without a lookup; otherwise one free/busy lookup covers
+    every candidate's calendar, always live (never the turn's prefetch). Naive starts are
+    read in each clinician's own time zone.
+
+    With a `requester`, a clinician already holding that requester's booking of these
+    starts (see `booking_event_id()`) is chosen again, so a retried booking stays with
+    the clinician it went to instead of going to whoever is still free. Only the
+    clinicians busy at those starts are checked for it.
+    """
+    if len(clinicians) == 1 or not starts:
+        return clinicians[0]
+    slots = {c.id: [(c.localize(s), c.localize(s) + duration) for s in starts] for c in clinicians}
+    busy = _busy_for(clinicians, slots)
+    if requester is not None:
+        holding = _holding_booking(clinicians, slots, busy, requester)
+        if holding is not None:
+            return holding
+
+    def free_count(clinician: Clinician) -> int:
+        if clinician.calendar_id not in busy:
+            return -1
+        return sum(_is_free(busy[clinician.calendar_id], slot) for slot in slots[clinician.id])
+
+    return max(clinicians, key=free_count)
@@ -0,0 +1,184 @@
+# src/slotbot/trace.py
+"""
+Optional, asynchronous trace store for per-turn task artifacts.
+
+Task outputs stay in memory (on the tasks and the turn's `TurnContext`) by default.
+When `SLOTBOT_TRACE_SINK` is set, every turn's artifacts are handed to a background
+writer tagged with session and turn ids and appended to a size-rotated JSONL file or a
+SQLite table. The request path only enqueues; if the writer falls behind, records are
+dropped and counted rather than slowing the turn down.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+from .settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+TraceRecord = Dict[str, Any]
+
+
+class TraceSink(ABC):
+    """Background writer: `record()` is non-blocking, storage happens on a daemon thread."""
+
+    BATCH_SIZE = 100
+
+    def __init__(self, max_pending: int = 10000):
+        self._queue: "queue.Queue[Optional[TraceRecord]]" = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name='trace-writer', daemon=True)
+        self._thread.start()
+
+    def record(self, record: TraceRecord) -> None:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Flush what is queued and stop the writer thread, waiting at most about `timeout`
+        seconds. If the writer is stuck with a full queue, the queued records are dropped
+        (and counted) so that shutdown is not held up.
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Trace writer is not keeping up; dropping queued records to shut down")
+            while True:
+                try:
+                    if self._queue.get_nowait() is not None:
+                        self.dropped += 1
+                except queue.Empty:
+                    break
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+        self._thread.join(max(0.0, deadline - time.monotonic()))
+
+    def _run(self) -> None:
+        while True:
+            batch: List[TraceRecord] = []
+            item = self._queue.get()
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.warning("Dropping %d trace records: %s", len(batch), e)
+                    self.dropped += len(batch)
+            if item is None:
+                return
+
+    @abstractmethod
+    def _write(self, batch: List[TraceRecord]) -> None:
+        ...
+
+
+class JsonlTraceSink(TraceSink):
+    """Appends one JSON object per line, rotating to `path.1 .. path.N` past `max_bytes`."""
+
+    def __init__(self, path: str, max_bytes: int = 10_000_000, backups: int = 3, **kwargs):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        super().__init__(**kwargs)
+
+    def _rotate(self) -> None:
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _write(self, batch: List[TraceRecord]) -> None:
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in batch:
+                f.write(json.dumps(record, default=str) + '\n')
+
+
+class SQLiteTraceSink(TraceSink):
+    """Inserts records into a `traces` table indexed by session and turn."""
+
+    def __init__(self, path: str, **kwargs):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn: Optional[sqlite3.Connection] = None
+        super().__init__(**kwargs)
+
+    def _write(self, batch: List[TraceRecord]) -> None:
+        if self._conn is None:
+            # Created on the writer thread, which is the only thread that uses it.
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS traces ("
+                " ts REAL NOT NULL, session_id TEXT, turn_id INTEGER,"
+                " task TEXT NOT NULL, agent TEXT, output TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS traces_session ON traces (session_id, turn_id)")
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO traces (ts, session_id, turn_id, task, agent, output) VALUES (?, ?, ?, ?, ?, ?)",
+                [(r['ts'], r.get('session_id'), r.get('turn_id'), r['task'], r.get('agent'), r.get('output'))
+                 for r in batch],
+            )
+
+
+def turn_records(session_id: Optional[str], turn_id: int, artifacts: Dict[str, Dict[str, Any]]) -> List[TraceRecord]:
+    """Build one trace record per task artifact of a turn."""
+    now = time.time()
+    return [
+        {'ts': now, 'session_id': session_id, 'turn_id': turn_id, 'task': task, **artifact}
+        for task, artifact in artifacts.items()
+    ]
+
+
+_sink: Optional[TraceSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_trace_sink() -> Optional[TraceSink]:
+    """Return the shared trace sink selected by `SLOTBOT_TRACE_SINK`, or None when tracing is off."""
+    global _sink
+    settings = get_settings()
+    if settings.trace_sink not in ('jsonl', 'sqlite'):
+        return None
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                if settings.trace_sink == 'sqlite':
+                    _sink = SQLiteTraceSink(settings.trace_path or 'outputs/traces.db')
+                else:
+                    _sink = JsonlTraceSink(settings.trace_path or 'outputs/traces.jsonl',
+                                           max_bytes=settings.trace_max_bytes, backups=settings.trace_backups)
+    return _sink
+
+
+def close_trace_sink() -> None:
+    global _sink
+    if _sink is not None:
+        _sink.close()
+        _sink = None
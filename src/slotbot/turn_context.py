@@ -0,0 +1,42 @@
+# src/slotbot/turn_context.py
+"""
+Per-turn state passed to a turn engine's `kickoff()`.
+
+Kept apart from crew.py so the API can build contexts without importing CrewAI.
+"""
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional
+
+from .models import ConversationState, SessionState, UserInputParsed
+
+if TYPE_CHECKING:
+    from .prefetch import AvailabilityPrefetch
+
+
+@dataclass
+class TurnContext:
+    """
+    Everything that belongs to one turn rather than to the (shared) crew definition.
+
+    A compiled `CalendarBookingCrew` is reused across turns and sessions; the caller
+    passes a fresh context per turn and reads the updated `conversation` back afterwards.
+    """
+    conversation: ConversationState = field(default_factory=ConversationState)
+    # Used to tag trace records; None outside the API.
+    session_id: Optional[str] = None
+    # Progress listener, called with stage events as the turn runs.
+    on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    # Filled in during the turn.
+    parsed: Optional[UserInputParsed] = None
+    session_state: Optional[SessionState] = None
+    # Availability read speculatively while the LLM parsed this turn (SLOTBOT_PREFETCH).
+    prefetch: Optional['AvailabilityPrefetch'] = None
+    # Which parser produced this turn's UserInputParsed: 'fast', 'cache' or 'llm'.
+    parse_path: Optional[str] = None
+    # How the reply was produced: 'template' or 'llm' (the format_user_response task).
+    response_path: Optional[str] = None
+    # Task name -> {'agent', 'output'} for every task that produced output this turn.
+    artifacts: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # Stage name -> seconds spent in it this turn (also exported as metrics).
+    timings: Dict[str, float] = field(default_factory=dict)
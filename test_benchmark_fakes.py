@@ -0,0 +1,37 @@
+"""Tests for the offline benchmark fakes"""
+
+import json
+
+from benchmarks.fakes import FakeCalendarService, ScriptedLLM
+
+
+def test_fake_calendar_freebusy_and_incremental_sync():
+    service = FakeCalendarService()
+    event = service.events().insert(calendarId='primary', body={
+        'start': {'dateTime': '2030-01-07T10:00:00', 'timeZone': 'Asia/Singapore'},
+        'end': {'dateTime': '2030-01-07T11:00:00', 'timeZone': 'Asia/Singapore'},
+    }).execute()
+
+    busy = service.freebusy().query(body={
+        'timeMin': '2030-01-07T00:00:00+08:00', 'timeMax': '2030-01-08T00:00:00+08:00',
+        'items': [{'id': 'primary'}],
+    }).execute()['calendars']['primary']['busy']
+    assert busy == [{'start': '2030-01-07T10:00:00+08:00', 'end': '2030-01-07T11:00:00+08:00'}]
+
+    listing = service.events().list(calendarId='primary').execute()
+    service.events().delete(calendarId='primary', eventId=event['id']).execute()
+    changes = service.events().list(calendarId='primary', syncToken=listing['nextSyncToken']).execute()
+    assert [e['status'] for e in changes['items']] == ['cancelled']
+
+
+def test_scripted_llm_picks_the_tool_for_the_parsed_request():
+    llm = ScriptedLLM(model='scripted/test')
+    parsed = {'intent': 'book', 'patient_email': 'a@b.com', 'start_time': '2030-01-07T10:00:00'}
+    prompt = f"Book it.\n\nThis is the context you're working with:\n{json.dumps(parsed)}\n\nBegin!"
+
+    class Task:
+        name = 'execute_calendar_action'
+
+    reply = llm.call([{'role': 'user', 'content': prompt}], from_task=Task())
+    assert 'Action: BookAppointmentTool' in reply
+    assert json.loads(reply.split('Action Input:')[1]) == {'date': '2030-01-07', 'time': '10:00', 'patient_email': 'a@b.com'}
@@ -0,0 +1,86 @@
+"""Tests for recurrence expansion and batched series booking"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks.fakes import FakeCalendarClient, FakeCalendarService
+from src.slotbot import calendar_backend
+from src.slotbot.bulk_booking import MAX_OCCURRENCES, book_series, expand_recurrence
+from src.slotbot.calendar_backend import GoogleCalendarBackend, SQLiteCalendarBackend, appointment_event
+from src.slotbot.google_api import Oauth_client, busy_cache
+from src.slotbot.tools.calendar_tools import BookSeriesTool
+
+SGT = timezone(timedelta(hours=8))
+MONDAY = datetime(2030, 1, 7, 10, tzinfo=SGT)
+
+
+def test_weekly_count_and_byday():
+    assert expand_recurrence(MONDAY, 'FREQ=WEEKLY;COUNT=3') == [MONDAY + timedelta(weeks=n) for n in range(3)]
+    starts = expand_recurrence(MONDAY, 'RRULE:FREQ=WEEKLY;BYDAY=MO,TH;COUNT=4')
+    assert [s.strftime('%a %d') for s in starts] == ['Mon 07', 'Thu 10', 'Mon 14', 'Thu 17']
+
+
+def test_until_interval_and_daily_byday():
+    starts = expand_recurrence(MONDAY, 'FREQ=WEEKLY;INTERVAL=2;UNTIL=20300204')
+    assert [s.day for s in starts] == [7, 21, 4]
+    weekdays = expand_recurrence(MONDAY, 'FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR;COUNT=6')
+    assert [s.day for s in weekdays] == [7, 8, 9, 10, 11, 14]
+
+
+@pytest.mark.parametrize('rule', ['FREQ=MONTHLY;COUNT=2', 'FREQ=WEEKLY', 'FREQ=WEEKLY;COUNT=53',
+                                  'FREQ=WEEKLY;BYDAY=XX;COUNT=2', 'FREQ=DAILY;UNTIL=20310101', 'nonsense'])
+def test_rejected_rules(rule):
+    with pytest.raises(ValueError):
+        expand_recurrence(MONDAY, rule)
+
+
+def _book(starts, requester='session-1'):
+    return [item.result.status for item in book_series(starts, timedelta(hours=1), 'pat@example.com',
+                                                       requester=requester)]
+
+
+def _check_series_booking(backend):
+    backend.insert(appointment_event(MONDAY + timedelta(weeks=1), MONDAY + timedelta(weeks=1, hours=1),
+                                     'other@example.com', None))
+    starts = expand_recurrence(MONDAY, 'FREQ=WEEKLY;COUNT=3')
+    # The second occurrence is taken, the fourth overlaps the first.
+    assert _book(starts + [MONDAY + timedelta(minutes=30)]) == ['booked', 'conflict', 'booked', 'conflict']
+    # Re-submitting the series books nothing twice.
+    assert _book(starts) == ['duplicate', 'conflict', 'duplicate']
+    # Another requester finds the slots taken.
+    assert _book(starts, requester='session-2') == ['conflict'] * 3
+
+
+def test_series_booking_on_sqlite(tmp_path, monkeypatch):
+    backend = SQLiteCalendarBackend(str(tmp_path / 'calendar.db'))
+    monkeypatch.setattr(calendar_backend, '_backend', backend)
+    _check_series_booking(backend)
+    assert len(backend) == 3
+
+
+def test_series_booking_uses_one_batch_on_google(monkeypatch):
+    service = FakeCalendarService()
+    monkeypatch.setattr(Oauth_client, '_client', FakeCalendarClient(service))
+    monkeypatch.setattr(busy_cache, 'get_busy_cache', lambda: None)
+    monkeypatch.setattr(calendar_backend, 'get_busy_cache', lambda: None)
+    backend = GoogleCalendarBackend()
+    monkeypatch.setattr(calendar_backend, '_backend', backend)
+
+    batches = []
+    new_batch = service.new_batch_http_request
+    monkeypatch.setattr(service, 'new_batch_http_request', lambda callback=None: batches.append(1) or new_batch(callback))
+    _check_series_booking(backend)
+    assert len(service._events) == 3
+    # The first series inserts in one batch; each submission looks up the ids of its taken
+    # slots in one more batch, and the retries have nothing left to insert.
+    assert len(batches) == 1 + 3
+
+
+def test_series_tool_caps_explicit_dates(tmp_path, monkeypatch):
+    backend = SQLiteCalendarBackend(str(tmp_path / 'calendar.db'))
+    monkeypatch.setattr(calendar_backend, '_backend', backend)
+    dates = [(MONDAY + timedelta(days=n)).date().isoformat() for n in range(MAX_OCCURRENCES + 1)]
+    reply = json.loads(BookSeriesTool()._run(time='10:00', patient_email='pat@example.com', dates=dates))
+    assert reply['status'] == 'error' and str(MAX_OCCURRENCES) in reply['message'] and len(backend) == 0
@@ -0,0 +1,86 @@
+"""Tests for the local busy-interval cache"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from src.slotbot.google_api import busy_cache
+from src.slotbot.google_api.busy_cache import BusyCache, BusyIntervalIndex
+
+UTC = timezone.utc
+
+
+class FakeEvents:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def list(self, **params):
+        self.calls.append(params)
+        return SimpleNamespace(execute=lambda: self.pages.pop(0))
+
+
+def _event(event_id, start, end, **extra):
+    return {'id': event_id, 'start': {'dateTime': start.isoformat()}, 'end': {'dateTime': end.isoformat()}, **extra}
+
+
+def test_interval_index_overlap():
+    base = datetime(2030, 1, 1, 9, tzinfo=UTC)
+    index = BusyIntervalIndex()
+    index.add('a', base, base + timedelta(hours=1))
+    index.add('b', base + timedelta(hours=3), base + timedelta(hours=5))
+    assert index.overlapping(base + timedelta(minutes=30), base + timedelta(hours=2))
+    assert not index.overlapping(base + timedelta(hours=1), base + timedelta(hours=3))
+    assert index.overlapping(base + timedelta(hours=4), base + timedelta(hours=4, minutes=30))
+    index.remove('b')
+    assert not index.overlapping(base + timedelta(hours=4), base + timedelta(hours=4, minutes=30))
+
+
+def test_cache_syncs_incrementally_and_records_bookings(monkeypatch):
+    slot = datetime.now(UTC).replace(microsecond=0) + timedelta(days=1)
+    events = FakeEvents([
+        {'items': [_event('a', slot, slot + timedelta(hours=1))], 'nextSyncToken': 't1'},
+        {'items': [{'id': 'a', 'status': 'cancelled'}], 'nextSyncToken': 't2'},
+    ])
+    service = SimpleNamespace(events=lambda: events)
+    monkeypatch.setattr(busy_cache, 'get_calendar_client', lambda: SimpleNamespace(service=service))
+
+    cache = BusyCache(max_staleness=3600)
+    cache.start_full_sync().join(5)
+    assert cache.is_free(slot, slot + timedelta(minutes=30)) is False
+    cache.max_staleness = timedelta(0)
+    assert cache.is_free(slot, slot + timedelta(minutes=30)) is True
+    assert events.calls[1]['syncToken'] == 't1'
+
+    later = slot + timedelta(hours=3)
+    cache.max_staleness = timedelta(hours=1)
+    cache.record_event(_event('new', later, later + timedelta(hours=1)))
+    assert cache.is_free(later, later + timedelta(hours=1)) is False
+    assert cache.is_free(slot + timedelta(days=60), slot + timedelta(days=60, hours=1)) is None
+
+
+def test_full_sync_runs_off_the_request_path(monkeypatch):
+    slot = datetime.now(UTC).replace(microsecond=0) + timedelta(days=1)
+    declined, booked = slot + timedelta(hours=2), slot + timedelta(hours=4)
+    me = {'email': 'clinic@example.com', 'self': True, 'responseStatus': 'declined'}
+    page = {'items': [_event('a', slot, slot + timedelta(hours=1)),
+                      _event('b', declined, declined + timedelta(hours=1), attendees=[me])],
+            'nextSyncToken': 't1'}
+    release = threading.Event()
+    events = SimpleNamespace(list=lambda **params: SimpleNamespace(execute=lambda: release.wait(5) and page))
+    service = SimpleNamespace(events=lambda: events)
+    monkeypatch.setattr(busy_cache, 'get_calendar_client', lambda: SimpleNamespace(service=service))
+
+    cache = BusyCache(max_staleness=3600)
+    # The listing is still in flight: the request is answered remotely instead of waiting.
+    assert cache.is_free(slot, slot + timedelta(hours=1)) is None
+    sync = cache.start_full_sync()
+    cache.record_event(_event('c', booked, booked + timedelta(hours=1)))
+    release.set()
+    sync.join(5)
+
+    assert cache.is_free(slot, slot + timedelta(hours=1)) is False
+    # Declined invitations don't block time, as in freebusy.
+    assert cache.is_free(declined, declined + timedelta(hours=1)) is True
+    # A booking recorded during the listing survives the swap to the new index.
+    assert cache.is_free(booked, booked + timedelta(hours=1)) is False
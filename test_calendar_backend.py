@@ -0,0 +1,118 @@
+"""Tests for the calendar backends and atomic booking"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks.fakes import FakeCalendarClient, FakeCalendarService
+from src.slotbot import calendar_backend
+from src.slotbot.calendar_backend import GoogleCalendarBackend, SQLiteCalendarBackend, booking_event_id, event_bounds
+from src.slotbot.google_api import Oauth_client, busy_cache
+
+SGT = timezone(timedelta(hours=8))
+
+
+def _event(start: str, end: str, **extra):
+    return {'start': {'dateTime': start, 'timeZone': 'Asia/Singapore'},
+            'end': {'dateTime': end, 'timeZone': 'Asia/Singapore'}, **extra}
+
+
+def test_sqlite_backend_overlap_queries(tmp_path):
+    backend = SQLiteCalendarBackend(str(tmp_path / 'calendar.db'))
+    backend.insert(_event('2030-01-07T09:00:00', '2030-01-07T10:00:00'))
+    # A long event that starts well before the queried window must still be found.
+    long_event = backend.insert(_event('2030-01-06T08:00:00', '2030-01-07T12:00:00', summary='Leave'))
+    backend.insert(_event('2030-01-07T10:00:00', '2030-01-07T11:00:00'), calendar_id='other')
+
+    busy = backend.free_busy(datetime(2030, 1, 7, 11, tzinfo=SGT), datetime(2030, 1, 7, 13, tzinfo=SGT))
+    assert busy == [(datetime(2030, 1, 6, 8, tzinfo=SGT), datetime(2030, 1, 7, 12, tzinfo=SGT))]
+    assert not backend.free_busy(datetime(2030, 1, 7, 12, tzinfo=SGT), datetime(2030, 1, 7, 13, tzinfo=SGT))
+
+    events = backend.list_events(datetime(2030, 1, 7, tzinfo=SGT), datetime(2030, 1, 8, tzinfo=SGT))
+    assert [e.get('summary') for e in events] == ['Leave', None]
+
+    backend.delete(long_event['id'])
+    assert len(backend.list_events(datetime(2030, 1, 7, tzinfo=SGT), datetime(2030, 1, 8, tzinfo=SGT))) == 1
+    assert len(backend) == 2
+
+
+def test_event_bounds_use_the_event_time_zone():
+    start, end = event_bounds({'start': {'dateTime': '2030-01-07T09:00:00', 'timeZone': 'UTC'},
+                               'end': {'dateTime': '2030-01-07T10:00:00Z'}})
+    assert start == datetime(2030, 1, 7, 9, tzinfo=timezone.utc)
+    assert end - start == timedelta(hours=1)
+    assert event_bounds({'status': 'cancelled'}) is None
+
+
+def _slot_event(event_id: str):
+    return {'id': event_id, **_event('2030-01-07T10:00:00', '2030-01-07T11:00:00')}
+
+
+def _book_concurrently(backend, event_ids):
+    with ThreadPoolExecutor(max_workers=len(event_ids)) as pool:
+        return sorted(r.status for r in pool.map(lambda i: backend.book(_slot_event(i)), event_ids))
+
+
+def test_sqlite_booking_is_atomic_and_idempotent(tmp_path):
+    backend = SQLiteCalendarBackend(str(tmp_path / 'calendar.db'))
+    ids = [booking_event_id(f"session-{n}", 'primary', datetime(2030, 1, 7, 10), datetime(2030, 1, 7, 11))
+           for n in range(6)]
+    assert _book_concurrently(backend, ids) == ['booked'] + ['conflict'] * 5
+
+    winner = backend.list_events(datetime(2030, 1, 7, tzinfo=SGT), datetime(2030, 1, 8, tzinfo=SGT))[0]
+    retry = backend.book(_slot_event(winner['id']))
+    assert retry.status == 'duplicate' and retry.event['id'] == winner['id']
+    assert len(backend) == 1
+
+
+def test_google_booking_serialises_overlapping_slots(monkeypatch):
+    service = FakeCalendarService(latency=0.01)
+    monkeypatch.setattr(Oauth_client, '_client', FakeCalendarClient(service))
+    monkeypatch.setattr(busy_cache, 'get_busy_cache', lambda: None)
+    monkeypatch.setattr(calendar_backend, 'get_busy_cache', lambda: None)
+    backend = GoogleCalendarBackend()
+
+    assert _book_concurrently(backend, ['aaaaa', 'bbbbb', 'ccccc', 'ddddd']) == ['booked'] + ['conflict'] * 3
+    assert len(service._events) == 1
+
+    winner = next(iter(service._events))
+    assert backend.book(_slot_event(winner)).status == 'duplicate'
+    assert len(service._events) == 1
+
+
+def test_rebooking_a_cancelled_booking_restores_it(monkeypatch, tmp_path):
+    service = FakeCalendarService()
+    monkeypatch.setattr(Oauth_client, '_client', FakeCalendarClient(service))
+    monkeypatch.setattr(busy_cache, 'get_busy_cache', lambda: None)
+    monkeypatch.setattr(calendar_backend, 'get_busy_cache', lambda: None)
+    for backend in (GoogleCalendarBackend(), SQLiteCalendarBackend(str(tmp_path / 'calendar.db'))):
+        assert backend.book(_slot_event('aaaaa')).status == 'booked'
+        backend.delete('aaaaa')
+        # Google keeps the cancelled event, so its id cannot be inserted again.
+        rebooked = backend.book(_slot_event('aaaaa'))
+        assert rebooked.status == 'booked' and rebooked.event['id'] == 'aaaaa'
+        assert backend.get_event('aaaaa')['status'] != 'cancelled'
+        assert backend.book(_slot_event('aaaaa')).status == 'duplicate'
+
+
+def test_google_booking_checks_the_calendar_not_the_busy_cache(monkeypatch):
+    service = FakeCalendarService()
+    monkeypatch.setattr(Oauth_client, '_client', FakeCalendarClient(service))
+    cache = busy_cache.BusyCache(max_staleness=3600)
+    monkeypatch.setattr(calendar_backend, 'get_busy_cache', lambda: cache)
+    backend = GoogleCalendarBackend()
+    start = (datetime.now(SGT) + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+    slot = _event(start.isoformat(), (start + timedelta(hours=1)).isoformat())
+    cache.start_full_sync().join(5)
+    assert cache.is_free(start, start + timedelta(hours=1))
+
+    # Booked by another process (or in Calendar itself) after the cache last synced.
+    service._insert('primary', {'id': 'elsewhere', **slot})
+    assert cache.is_free(start, start + timedelta(hours=1))
+    assert backend.book({'id': 'mine', **slot}).status == 'conflict'
+
+    # Ids of taken slots are looked up together, not one round trip each.
+    monkeypatch.setattr(backend, 'get_event', lambda *args: pytest.fail("looked up one id at a time"))
+    series = [{'id': event_id, **slot} for event_id in ('elsewhere', 'mine', 'other')]
+    assert [r.status for r in backend.book_many(series)] == ['duplicate', 'conflict', 'conflict']
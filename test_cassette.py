@@ -0,0 +1,100 @@
+"""Tests for recording turns to a cassette and replaying them without network"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks.fakes import SCENARIOS, ScriptedLLM
+from src.slotbot import calendar_backend, cassette as cassette_module, parse_cache
+from src.slotbot.calendar_backend import BookingResult, SQLiteCalendarBackend
+from src.slotbot.cassette import (Cassette, CassetteCalendarBackend, CassetteMiss, CassetteParseCache, TurnTape,
+                                  _decode, _encode, record_conversations, replay_cassette, run_taped)
+from src.slotbot.compact import CompactEngine
+
+CONVERSATIONS = [
+    [SCENARIOS[1].message, "Book me in for tomorrow at 10am, my email is bench@example.com"],
+    ["Are you free tomorrow at 3pm?"],
+]
+
+
+class OfflineLLM(ScriptedLLM):
+    def call(self, messages, **kwargs):
+        raise AssertionError("a replayed turn reached the LLM")
+
+
+def _engine(llm):
+    engine = CompactEngine(llm=llm)
+    return lambda inputs, context: run_taped(engine.kickoff, inputs, context)
+
+
+@pytest.fixture
+def recorded(tmp_path, monkeypatch):
+    path = str(tmp_path / 'turns.jsonl.gz')
+    monkeypatch.setattr(cassette_module, '_cassette', Cassette(path, 'record'))
+    monkeypatch.setattr(calendar_backend, '_backend',
+                        CassetteCalendarBackend(SQLiteCalendarBackend(str(tmp_path / 'calendar.db'))))
+    monkeypatch.setattr(parse_cache, '_cache', CassetteParseCache(parse_cache.ParseCache()))
+    replies = record_conversations(CONVERSATIONS, _engine(ScriptedLLM(model='scripted/test')))
+    return path, replies
+
+
+def test_recording_tapes_llm_and_calendar_calls(recorded):
+    path, replies = recorded
+    tapes = Cassette(path, 'replay').tapes
+    assert [(t.session, t.turn) for t in tapes] == [('conversation-1', 1), ('conversation-1', 2),
+                                                    ('conversation-2', 1)]
+    assert [t.reply for t in tapes] == replies
+    search, booking, check = tapes
+    assert len(search.llm) == 1 and search.llm[0][1] == 'scripted/test'
+    assert len(search.calendar) == 1 and search.calendar[0][0].startswith('free_busy_many primary ')
+    # The check is fast-parsed (no cache lookup), and its lookup is keyed on the hour it reads.
+    assert check.parse_path == 'fast' and check.cache == []
+    method, calendar_id, start, end = check.calendar[0][0].split()
+    start, end = datetime.fromisoformat(start), datetime.fromisoformat(end)
+    assert (method, calendar_id, start.hour, end - start) == ('free_busy_many', 'primary', 15, timedelta(hours=1))
+    assert booking.parse_path == 'fast' and not booking.llm and booking.calendar[0][0].startswith('book primary ')
+
+
+def test_replay_matches_the_recording_without_network(recorded, monkeypatch):
+    path, replies = recorded
+    replaying = Cassette(path, 'replay')
+    monkeypatch.setattr(cassette_module, '_cassette', replaying)
+    monkeypatch.setattr(calendar_backend, '_backend', CassetteCalendarBackend(None))
+
+    results = replay_cassette(replaying, _engine(OfflineLLM(model='scripted/test')))
+    assert [r.reply for r in results] == replies and all(r.ok for r in results)
+    # The cassette can be replayed again, e.g. for profiling.
+    assert all(r.ok for r in replay_cassette(replaying, _engine(OfflineLLM(model='scripted/test'))))
+
+
+def test_drifted_prompts_and_missing_calls(recorded, monkeypatch):
+    path, _ = recorded
+    replaying = Cassette(path, 'replay')
+    for tape in replaying.tapes:
+        for entry in tape.llm:
+            entry[0] = 'recorded-before-a-prompt-change'
+        tape.rewind()
+    first = replaying.conversations()['conversation-1'][0]
+    first.calendar.clear()
+    first.rewind()
+    monkeypatch.setattr(calendar_backend, '_backend', CassetteCalendarBackend(None))
+
+    results = replay_cassette(replaying, _engine(OfflineLLM(model='scripted/test')))
+    # The search's Calendar lookup was never recorded; the tool reports the miss as an error.
+    assert results[0].drift == 1 and not results[0].ok
+    assert results[-1].session == 'conversation-2' and results[-1].ok
+
+
+def test_values_round_trip():
+    moment = datetime(2030, 1, 7, 10, tzinfo=timezone(timedelta(hours=8)))
+    value = {'primary': [(moment, moment + timedelta(hours=1))],
+             'booked': [BookingResult('conflict', conflicts=[(moment, moment)])]}
+    assert _decode(json.loads(json.dumps(_encode(value)))) == value
+
+    tape = TurnTape(session='s', turn=1, at=moment.isoformat(), inputs={}, replaying=True,
+                    calendar=[['insert primary x', _encode(calendar_backend.DuplicateEventError('taken'))]])
+    with pytest.raises(calendar_backend.DuplicateEventError):
+        tape.call('calendar', 'insert primary x', None)
+    with pytest.raises(CassetteMiss):
+        tape.call('calendar', 'insert primary x', None)
@@ -0,0 +1,74 @@
+"""Tests for the server-sent events chat endpoint"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import executor as executor_module
+from api.dependencies import create_new_session
+from api.executor import CrewExecutor
+from benchmarks.fakes import ScriptedLLM
+from src.slotbot import calendar_backend, crew as crew_module
+from src.slotbot.calendar_backend import SQLiteCalendarBackend
+from src.slotbot.crew import CalendarBookingCrew
+from src.slotbot.settings import get_settings
+
+REPLY = "Here is the outcome of your request."
+
+
+class StreamingLLM(ScriptedLLM):
+    """Sends every reply as a few stream chunks when streaming is on, like a provider would."""
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        reply = super().call(messages, tools, callbacks, available_functions, from_task, from_agent, response_model)
+        if self.stream:
+            for start in range(0, len(reply), 16):
+                self._emit_stream_chunk_event(reply[start:start + 16], from_task=from_task, from_agent=from_agent)
+        return reply
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The response agent runs (and streams) only when no template answers the turn.
+    monkeypatch.setenv('SLOTBOT_RESPONSE_TEMPLATES', '0')
+    get_settings.cache_clear()
+    monkeypatch.setattr(calendar_backend, '_backend', SQLiteCalendarBackend(str(tmp_path / 'calendar.db')))
+    compiled = CalendarBookingCrew()
+    compiled.crew()
+    for agent in compiled.agents:
+        agent.llm = StreamingLLM(model='scripted/test')
+    monkeypatch.setattr(crew_module, 'get_compiled_crew', lambda: compiled)
+    executor = CrewExecutor(max_workers=1, max_queue=0)
+    monkeypatch.setattr(executor_module, '_executor', executor)
+    from api.main import app
+
+    yield TestClient(app)
+    executor.shutdown()
+    get_settings.cache_clear()
+
+
+def _events(body: str):
+    for frame in body.strip().split('\n\n'):
+        event, data = frame.split('\n', 1)
+        yield event[len('event: '):], json.loads(data[len('data: '):])
+
+
+@pytest.mark.parametrize('message, stage', [
+    ("Are you free tomorrow at 3pm?", 'calendar_checked'),
+    # Asking for details runs another task on the response agent first; it is not the reply.
+    ("I want to book an appointment", 'info_requested'),
+])
+def test_stream_sends_stages_then_reply_chunks_then_done(client, message, stage):
+    session_id = create_new_session()
+    response = client.post('/chat/stream', json={'session_id': session_id, 'user_message': message})
+    assert response.status_code == 200 and response.headers['content-type'].startswith('text/event-stream')
+    events = list(_events(response.text))
+    names = [name for name, _ in events]
+
+    assert names[:3] == ['parsed', 'routed', stage]
+    assert names[3:-1] == ['token'] * (len(names) - 4) and len(names) > 5
+    # Only the final answer of format_user_response, in order, without the agent's reasoning.
+    assert events[-1] == ('done', {'session_id': session_id, 'chatbot_response': REPLY})
+    assert ''.join(data['text'] for name, data in events if name == 'token') == REPLY
@@ -0,0 +1,149 @@
+"""Tests for the clinician registry and the multi-calendar fan-in availability checks"""
+
+import json
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+
+from benchmarks.fakes import FakeCalendarClient, FakeCalendarService
+from src.slotbot import calendar_backend, clinicians
+from src.slotbot.calendar_backend import GoogleCalendarBackend, appointment_event
+from src.slotbot.clinicians import Clinician, ClinicianRegistry, UnknownClinicianError
+from src.slotbot.fast_parser import fast_parse
+from src.slotbot.google_api import Oauth_client
+from src.slotbot.models import SessionState, UserInputParsed
+from src.slotbot.responses import render_response
+from src.slotbot.tools.calendar_tools import (BookAppointmentTool, BookSeriesTool, CheckAvailabilityTool,
+                                              FindFreeSlotsTool)
+from src.slotbot.tools.slot_search import merge_slot_sweeps
+
+SGT = timezone(timedelta(hours=8))
+TAN = Clinician('tan', 'Dr Tan', 'tan@clinic.example', 'Asia/Singapore')
+LIM = Clinician('lim', 'Dr Lim', 'lim@clinic.example', 'Asia/Singapore')
+RAO = Clinician('rao', 'Dr Rao', 'rao@clinic.example', 'Asia/Kolkata')
+
+
+@pytest.fixture
+def service(monkeypatch):
+    service = FakeCalendarService()
+    monkeypatch.setattr(Oauth_client, '_client', FakeCalendarClient(service))
+    monkeypatch.setattr(calendar_backend, 'get_busy_cache', lambda: None)
+    monkeypatch.setattr(calendar_backend, '_backend', GoogleCalendarBackend())
+    monkeypatch.setattr(clinicians, '_registry', ClinicianRegistry([TAN, LIM, RAO]))
+    return service
+
+
+def _busy(service, clinician, start, hours=1):
+    service._insert(clinician.calendar_id, appointment_event(start, start + timedelta(hours=hours),
+                                                             'other@example.com', time_zone=clinician.time_zone))
+
+
+def test_registry_from_yaml(tmp_path):
+    path = tmp_path / 'clinicians.yaml'
+    path.write_text("clinicians:\n"
+                    "  - {id: tan, name: Dr Tan, calendar_id: tan@clinic.example}\n"
+                    "  - {id: rao, name: Prof. Rao, calendar_id: rao@clinic.example, time_zone: Asia/Kolkata}\n")
+    registry = ClinicianRegistry.from_yaml(str(path), default_time_zone='Asia/Singapore')
+    assert registry.default.id == 'tan' and registry.default.time_zone == 'Asia/Singapore'
+    assert registry.get('dr  tan') is registry.get('TAN') is registry.get('tan@clinic.example')
+    assert registry.get('Rao').time_zone == 'Asia/Kolkata'
+    assert [c.id for c in registry.select('any doctor')] == ['tan', 'rao']
+    with pytest.raises(UnknownClinicianError):
+        registry.get('Dr Wong')
+    # A solo practice has one clinician, whatever name the patient uses.
+    assert ClinicianRegistry([TAN]).select('Dr Wong') == [TAN]
+
+
+def test_any_clinician_check_is_one_freebusy_query(service):
+    _busy(service, TAN, datetime(2030, 1, 7, 10))
+    output = json.loads(CheckAvailabilityTool().run(date='2030-01-07', time='10:00'))
+    assert output['status'] == 'free' and output['clinician'] == 'Dr Lim'
+    assert service.freebusy_queries == [[TAN.calendar_id, LIM.calendar_id, RAO.calendar_id]]
+
+    output = json.loads(CheckAvailabilityTool().run(date='2030-01-07', time='10:00', clinician='Dr Tan'))
+    assert output['status'] == 'busy'
+
+
+def test_booking_goes_to_the_first_free_clinician(service):
+    _busy(service, TAN, datetime(2030, 1, 7, 10))
+    output = BookAppointmentTool().run(date='2030-01-07', time='10:00', patient_email='pat@example.com', duration=60)
+    assert 'booked successfully with Dr Lim' in output
+    booked = [e for e in service._events.values() if e['attendees'][0]['email'] == 'pat@example.com']
+    assert [e['_calendar'] for e in booked] == [LIM.calendar_id]
+
+    # Wall-clock times are the clinician's own: 10:00 in Kolkata is 12:30 in Singapore.
+    BookAppointmentTool().run(date='2030-01-07', time='10:00', patient_email='pat@example.com', duration=60,
+                              clinician='rao')
+    event = next(e for e in service._events.values() if e['_calendar'] == RAO.calendar_id)
+    assert datetime.fromisoformat(event['start']['dateTime']).astimezone(SGT).time() == time(12, 30)
+
+
+def test_retried_bookings_stay_with_the_first_clinician(service, monkeypatch):
+    looked_up = []
+    get_events = GoogleCalendarBackend.get_events
+
+    def recording_get_events(self, event_ids, calendar_id='primary'):
+        looked_up.append(calendar_id)
+        return get_events(self, event_ids, calendar_id)
+
+    monkeypatch.setattr(GoogleCalendarBackend, 'get_events', recording_get_events)
+    monkeypatch.setattr(GoogleCalendarBackend, 'list_events',
+                        lambda *a, **k: pytest.fail("held bookings are fetched by id"))
+    book = BookAppointmentTool(session_id='s1')
+    args = dict(date='2030-01-07', time='10:00', patient_email='pat@example.com', duration=60)
+    assert 'booked successfully with Dr Tan' in book.run(**args)
+    # Nobody was busy, so no calendar was searched for an earlier booking.
+    assert looked_up == []
+    # Dr Tan is now busy with this very booking; the retry must not go to Dr Lim.
+    assert 'with Dr Tan was already booked' in book.run(**args)
+
+    series = BookSeriesTool(session_id='s1')
+    dates = ['2030-01-08', '2030-01-09', '2030-01-10']
+    first = json.loads(series.run(time='10:00', patient_email='pat@example.com', dates=dates))
+    again = json.loads(series.run(time='10:00', patient_email='pat@example.com', dates=dates))
+    assert first['clinician'] == again['clinician'] == 'Dr Tan'
+    assert [a['status'] for a in again['appointments']] == ['duplicate'] * 3
+    booked = [e for e in service._events.values() if e['attendees'][0]['email'] == 'pat@example.com']
+    assert len(booked) == 4 and {e['_calendar'] for e in booked} == {TAN.calendar_id}
+    # Only Dr Tan, busy with the earlier bookings, is checked for them.
+    assert set(looked_up) == {TAN.calendar_id}
+
+
+def test_search_merges_clinicians_earliest_first(service):
+    day = datetime(2030, 1, 7)
+    _busy(service, TAN, day.replace(hour=17), hours=4)
+    _busy(service, LIM, day.replace(hour=17), hours=1)
+    output = json.loads(FindFreeSlotsTool().run(start_date='2030-01-07', end_date='2030-01-07',
+                                                earliest_time='17:00', latest_time='21:00', max_results=3))
+    # Dr Rao's evening (Kolkata) starts 2.5 hours after Singapore's.
+    assert [(s['start'][11:16], s['clinician']) for s in output['slots']] == [
+        ('18:00', 'Dr Lim'), ('18:30', 'Dr Lim'), ('19:00', 'Dr Lim')]
+    assert len(service.freebusy_queries) == 1
+
+    output = json.loads(FindFreeSlotsTool().run(start_date='2030-01-07', end_date='2030-03-07'))
+    assert output['status'] == 'error' and len(service.freebusy_queries) == 1
+
+
+def test_merge_slot_sweeps_lists_each_start_once():
+    def at(hour):
+        return datetime(2030, 1, 7, hour, tzinfo=SGT)
+
+    sweeps = [iter([(at(11), at(12)), (at(12), at(13))]), iter([(at(9), at(10)), (at(11), at(12))])]
+    assert merge_slot_sweeps(sweeps, limit=3) == [(at(9), at(10), 1), (at(11), at(12), 0), (at(12), at(13), 0)]
+
+
+def test_fast_parser_names_clinicians():
+    registry = [TAN, LIM]
+    result = fast_parse("book dr lim tomorrow at 3pm, pat@example.com", '2030-01-07T09:00:00', clinicians=registry)
+    assert result.is_confident and result.parsed.clinician == 'Dr Lim'
+    # A title that matches nobody registered is left to the LLM.
+    assert not fast_parse("book dr wong tomorrow at 3pm", '2030-01-07T09:00:00', clinicians=registry).is_confident
+    assert fast_parse("book dr wong tomorrow at 3pm", '2030-01-07T09:00:00', clinicians=[TAN]).is_confident
+
+
+def test_replies_name_the_clinician():
+    state = SessionState(identity_status='known', info_completeness_status='complete', missing_info=[],
+                         next_action='check_availability')
+    parsed = UserInputParsed(intent='check_availability', start_time=datetime(2030, 1, 7, 10))
+    reply = render_response(state, parsed, json.dumps({'status': 'free', 'clinician': 'Dr Lim'}))
+    assert reply.startswith("Good news: Monday, 7 January at 10:00 AM is available with Dr Lim.")
@@ -0,0 +1,97 @@
+"""Tests for the compact (single LLM call) engine"""
+
+from datetime import datetime
+
+import pytest
+
+from benchmarks.fakes import SCENARIOS, ScriptedLLM
+from src.slotbot import calendar_backend
+from src.slotbot import crew as crew_module
+from src.slotbot.calendar_backend import SQLiteCalendarBackend
+from src.slotbot.compact import CompactEngine
+from src.slotbot.crew import TurnContext
+from src.slotbot.settings import Settings
+
+
+class CountingLLM(ScriptedLLM):
+    calls: int = 0
+    reply: str = ''
+
+    def call(self, messages, **kwargs):
+        self.calls += 1
+        if self.reply:
+            return self.reply
+        return super().call(messages, **kwargs)
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    backend = SQLiteCalendarBackend(str(tmp_path / 'calendar.db'))
+    monkeypatch.setattr(calendar_backend, '_backend', backend)
+    return CompactEngine(llm=CountingLLM(model='scripted/test'))
+
+
+def _turn(engine, message, **inputs):
+    context = TurnContext(session_id='compact-test')
+    events = []
+    context.on_event = lambda event, data: events.append(event)
+    reply = engine.kickoff({'user_message': message, 'current_date': datetime.now().isoformat(), **inputs}, context)
+    return context, reply, events
+
+
+@pytest.mark.parametrize('scenario', SCENARIOS, ids=lambda s: s.message[:20])
+def test_every_turn_makes_at_most_one_llm_call(engine, scenario):
+    context, reply, events = _turn(engine, scenario.message)
+    assert engine.llm.inner.calls <= 1
+    assert reply and context.artifacts['format_user_response']['output'] == reply
+    assert events[:2] == ['parsed', 'routed'] and events[-1] == 'token'
+    assert context.conversation.turns == 1 and context.conversation.last_parsed == context.parsed
+
+
+def test_search_and_booking_use_the_tools_directly(engine):
+    context, reply, _ = _turn(engine, SCENARIOS[1].message)
+    assert context.parse_path == 'compact' and context.session_state.next_action == 'search_availability'
+    assert reply.startswith("Here are the free slots I found:")
+
+    context, reply, _ = _turn(engine, "Book me in for tomorrow at 10am, my email is bench@example.com")
+    assert context.parse_path == 'fast' and engine.llm.inner.calls == 1
+    assert 'is booked' in reply and len(calendar_backend._backend) == 1
+    # Same session, same slot: nothing new is booked.
+    context, reply, _ = _turn(engine, "Book me in for tomorrow at 10am, my email is bench@example.com")
+    assert 'already booked' in reply and len(calendar_backend._backend) == 1
+
+
+def test_cancel_removes_only_this_sessions_booking(engine):
+    _turn(engine, "Book me in for tomorrow at 10am, my email is bench@example.com")
+    assert len(calendar_backend._backend) == 1
+
+    cancel = "Please cancel my appointment tomorrow at 10am, my email is bench@example.com"
+    context, reply, events = _turn(engine, cancel)
+    assert context.session_state.next_action == 'execute_operation' and 'calendar_checked' in events
+    assert reply.endswith("is cancelled.") and len(calendar_backend._backend) == 0
+
+    context, reply, _ = _turn(engine, cancel)
+    assert "nothing was cancelled" in reply
+
+
+def test_general_query_uses_the_draft_reply(engine, monkeypatch):
+    context, reply, _ = _turn(engine, "hello there")
+    assert context.response_path == 'llm' and reply == "Hello! How can I help you with your appointment?"
+
+    monkeypatch.setattr('src.slotbot.compact.get_settings', lambda: Settings(response_llm_fallback=False))
+    engine.llm.inner.calls = 0
+    context, reply, _ = _turn(engine, "hello", locale='ms')
+    assert context.parse_path == 'fast' and engine.llm.inner.calls == 0
+    assert reply.startswith("Saya boleh")
+
+
+def test_unreadable_llm_output_is_a_general_query(engine):
+    engine.llm.inner.reply = "sorry, I cannot help with that"
+    context, reply, _ = _turn(engine, SCENARIOS[0].message)
+    assert context.parsed.intent == 'general_query' and context.response_path == 'template'
+
+
+def test_engine_is_chosen_in_settings(monkeypatch):
+    monkeypatch.setattr(crew_module, 'get_settings', lambda: Settings(engine='compact'))
+    monkeypatch.setattr(crew_module, '_compiled', type(crew_module._compiled)())
+    assert isinstance(crew_module.get_compiled_crew(), CompactEngine)
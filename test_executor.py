@@ -0,0 +1,105 @@
+"""Tests for the bounded crew executor and the backpressure it puts on /chat"""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import executor as executor_module
+from api.dependencies import create_new_session
+from api.executor import CrewExecutor, ExecutorSaturated
+from api.routes import chat as chat_module
+
+
+def test_full_executor_rejects_then_recovers():
+    executor = CrewExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    def fail():
+        raise RuntimeError("turn failed")
+
+    async def scenario():
+        running = executor.submit(release.wait, 5)
+        queued = executor.submit(lambda: 'queued')
+        # One turn running and one waiting: the next is turned away without being queued.
+        with pytest.raises(ExecutorSaturated):
+            executor.submit(lambda: 'rejected')
+        release.set()
+        assert await running is True and await queued == 'queued'
+
+        # A failing turn gives its slot back like any other.
+        with pytest.raises(RuntimeError, match="turn failed"):
+            await executor.run(fail)
+        return await asyncio.gather(executor.run(lambda: 1), executor.run(lambda: 2))
+
+    assert asyncio.run(scenario()) == [1, 2]
+    executor.shutdown()
+
+
+@pytest.fixture
+def busy_api(monkeypatch):
+    executor = CrewExecutor(max_workers=1, max_queue=0)
+    monkeypatch.setattr(executor_module, '_executor', executor)
+    started, release = threading.Event(), threading.Event()
+
+    def run_turn(inputs, context):
+        if inputs['user_message'] == 'boom':
+            raise RuntimeError("crew crashed")
+        started.set()
+        release.wait(5)
+        return "done"
+
+    monkeypatch.setattr(chat_module, 'run_turn', run_turn)
+    from api.main import app
+
+    yield TestClient(app), started, release
+    release.set()
+    executor.shutdown()
+
+
+def test_chat_answers_503_while_saturated_and_serves_again_after(busy_api):
+    client, started, release = busy_api
+    session_id = create_new_session()
+
+    def chat(message):
+        return client.post('/chat', json={'session_id': session_id, 'user_message': message})
+
+    first = []
+    worker = threading.Thread(target=lambda: first.append(chat("hello")))
+    worker.start()
+    assert started.wait(5)
+
+    rejected = chat("hello again")
+    assert rejected.status_code == 503 and rejected.headers['Retry-After'] == '5'
+    streamed = client.post('/chat/stream', json={'session_id': session_id, 'user_message': "hello again"})
+    assert streamed.status_code == 503
+
+    release.set()
+    worker.join(5)
+    assert first[0].status_code == 200 and first[0].json()['chatbot_response'] == "done"
+
+    # The crashed turn is a 500 and frees the worker for the next one.
+    assert chat("boom").status_code == 500
+    assert chat("hello").status_code == 200
+
+
+def test_session_store_is_called_off_the_event_loop(monkeypatch):
+    def off_loop(fn):
+        def call(*args):
+            with pytest.raises(RuntimeError):
+                asyncio.get_running_loop()
+            return fn(*args)
+        return call
+
+    for name in ('create_new_session', 'get_conversation', 'save_conversation'):
+        monkeypatch.setattr(chat_module, name, off_loop(getattr(chat_module, name)))
+    monkeypatch.setattr(chat_module, 'run_turn', lambda inputs, context: "done")
+    from api.main import app
+
+    client = TestClient(app)
+    session_id = client.post('/start_chat').json()['session_id']
+    reply = client.post('/chat', json={'session_id': session_id, 'user_message': "hello"})
+    assert reply.status_code == 200 and reply.json()['chatbot_response'] == "done"
+    streamed = client.post('/chat/stream', json={'session_id': session_id, 'user_message': "hello"})
+    assert 'event: done' in streamed.text
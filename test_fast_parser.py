@@ -0,0 +1,66 @@
+"""Tests for the rule-based fast-path parser"""
+
+from datetime import datetime, timedelta, timezone
+
+from src.slotbot.fast_parser import fast_parse
+
+CURRENT_DATE = '2025-07-14T10:00:00'  # a Monday
+
+
+def test_simple_booking_is_resolved_locally():
+    result = fast_parse('Hi, I would like to book an appointment tuesday 5 pm, foo@bar.com.', CURRENT_DATE)
+    assert result.is_confident
+    assert result.parsed.intent == 'book'
+    assert result.parsed.patient_email == 'foo@bar.com'
+    assert result.parsed.start_time == datetime(2025, 7, 15, 17, 0)
+    assert result.parsed.end_time == datetime(2025, 7, 15, 18, 0)
+    assert result.parsed.missing_info == []
+
+
+def test_current_date_with_an_offset():
+    kl = timezone(timedelta(hours=8))
+    result = fast_parse('book me tuesday 5 pm, foo@bar.com', '2025-07-14T10:00:00+08:00')
+    assert result.is_confident and result.parsed.start_time == datetime(2025, 7, 15, 17, 0, tzinfo=kl)
+    result = fast_parse('book me today 9 am, foo@bar.com', '2025-07-14T10:00:00+08:00')
+    assert not result.is_confident and result.reasons == ['start_time in the past']
+
+
+def test_missing_email_is_reported():
+    result = fast_parse('book tomorrow at 9:30am', CURRENT_DATE)
+    assert result.is_confident
+    assert result.parsed.missing_info == ['patient_email']
+
+
+def test_availability_with_duration():
+    result = fast_parse('are you free on july 20 at 3pm for 30 minutes?', CURRENT_DATE)
+    assert result.is_confident
+    assert result.parsed.intent == 'check_availability'
+    assert result.parsed.end_time == datetime(2025, 7, 20, 15, 30)
+    result = fast_parse('book july 20 at 3pm for 2 hours, foo@bar.com', CURRENT_DATE)
+    assert result.is_confident and result.parsed.end_time == datetime(2025, 7, 20, 17, 0)
+
+
+def test_durations_the_rules_cannot_read_fall_back_to_llm():
+    for phrase, reason in [
+        ('for 1.5 hours', 'unresolved duration'),
+        ('for 1h30', 'unresolved duration'),
+        ('for half an hour', 'unresolved duration'),
+        ('for an hour and a half', 'unresolved duration'),
+        ('for a 2 hour session', 'unresolved duration'),
+        (', 2 hours', 'unresolved duration'),
+        ('for 1 hour and 30 minutes', 'unresolved duration'),
+        ('for 0 minutes', 'duration out of range: 0 minutes'),
+        ('for 999 hours', 'duration out of range: 59940 minutes'),
+    ]:
+        result = fast_parse(f'book july 20 at 3pm {phrase}, foo@bar.com', CURRENT_DATE)
+        assert not result.is_confident and result.reasons == [reason], phrase
+
+
+def test_ambiguous_messages_fall_back_to_llm():
+    for message in [
+        'any evening next week?',
+        'book tuesday',
+        'cancel tuesday 5pm and book wednesday 5pm',
+        'appointment tomorrow 5:30',
+    ]:
+        assert not fast_parse(message, CURRENT_DATE).is_confident, message
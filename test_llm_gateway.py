@@ -0,0 +1,183 @@
+"""Tests for the shared LLM gateway: quota buckets, priority lanes, backoff and de-duplication"""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from benchmarks.fakes import ScriptedLLM
+from src.slotbot import llm_gateway
+from src.slotbot.compact import CompactEngine
+from src.slotbot.crew import CalendarBookingCrew, TurnContext
+from src.slotbot.gateway_llm import gateway_llm
+from src.slotbot.llm_gateway import (LANE_BOOKING, LANE_NEW, LLMGateway, LLMUnavailable, TokenBucket,
+                                     classify_error, lane_for, llm_lane)
+from src.slotbot.models import CarriedSlots, ConversationState
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"provider returned {status_code}")
+        self.status_code = status_code
+
+
+class FailingLLM(ScriptedLLM):
+    failures: int = 0
+    status: int = 429
+    calls: int = 0
+
+    def call(self, messages, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ProviderError(self.status)
+        return super().call(messages, **kwargs)
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gw = LLMGateway(max_retries=2, backoff_base=0.01, backoff_max=0.05, max_wait=1.0)
+    monkeypatch.setattr(llm_gateway, '_gateway', gw)
+    return gw
+
+
+def test_token_bucket_refills_and_goes_into_debt():
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])
+    assert bucket.wait_time(60) == 0
+    bucket.take(70)
+    assert bucket.wait_time(1) == pytest.approx(11.0)
+    now[0] = 11.0
+    assert bucket.wait_time(1) == 0
+    # Asking for more than a minute's worth waits for a full bucket, not forever.
+    assert bucket.wait_time(1000) == pytest.approx(59.0)
+
+
+def test_classify_error():
+    assert classify_error(ProviderError(429)) == 'rate_limit'
+    assert classify_error(ProviderError(503)) == 'server'
+    assert classify_error(ValueError("Resource exhausted for model")) == 'rate_limit'
+    assert classify_error(ProviderError(400)) is None
+    try:
+        try:
+            raise ProviderError(429)
+        except ProviderError as e:
+            raise RuntimeError("wrapped") from e
+    except RuntimeError as wrapped:
+        assert classify_error(wrapped) == 'rate_limit'
+
+
+def test_lanes_follow_the_conversation():
+    assert lane_for(ConversationState()) == LANE_NEW
+    assert lane_for(ConversationState(turns=2)) == llm_gateway.LANE_ONGOING
+    assert lane_for(ConversationState(turns=1, slots=CarriedSlots(pending_intent='book'))) == LANE_BOOKING
+
+
+def test_booking_lane_is_admitted_before_new_conversations(gateway):
+    gateway.rpm = TokenBucket(600)
+    gateway.rpm.tokens = 0  # next request slot in 0.1s
+    order = []
+
+    def run(lane, name):
+        with llm_lane(lane):
+            gateway.call(lambda: order.append(name), tokens=10)
+
+    new = threading.Thread(target=run, args=(LANE_NEW, 'new'))
+    booking = threading.Thread(target=run, args=(LANE_BOOKING, 'booking'))
+    new.start()
+    time.sleep(0.02)
+    booking.start()
+    new.join()
+    booking.join()
+    assert order == ['booking', 'new']
+
+
+def test_quota_wait_beyond_the_limit_fails_fast(gateway):
+    gateway.tpm = TokenBucket(6000)
+    gateway.tpm.take(12000)  # a minute of debt, longer than max_wait
+    started = time.monotonic()
+    with pytest.raises(LLMUnavailable) as raised:
+        gateway.call(lambda: 'never', tokens=100)
+    assert time.monotonic() - started < 0.5 and raised.value.retry_after > 1.0
+
+
+def test_retries_with_backoff_then_succeeds(gateway):
+    llm = FailingLLM(model='scripted/test', failures=2, status=503)
+    assert gateway_llm(llm).call("hello") == "Thought: I now know the final answer\nFinal Answer: Here is the outcome of your request."
+    assert llm.calls == 3
+
+
+def test_exhausted_retries_fail_the_rest_of_the_turn_fast(gateway):
+    llm = FailingLLM(model='scripted/test', failures=100)
+    gated = gateway_llm(llm)
+    with llm_lane(LANE_NEW):
+        with pytest.raises(LLMUnavailable):
+            gated.call("hello")
+        assert llm.calls == 3
+        with pytest.raises(LLMUnavailable):
+            gated.call("hello again")
+        assert llm.calls == 3
+    # The next turn tries again.
+    with llm_lane(LANE_NEW), pytest.raises(LLMUnavailable):
+        gated.call("hello")
+    assert llm.calls == 6
+
+
+def test_identical_calls_in_flight_share_one_request(gateway):
+    release = threading.Event()
+    calls = []
+
+    def send():
+        calls.append(1)
+        release.wait(1)
+        return 'shared'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gateway.call(send, tokens=10, key='same')))
+               for _ in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+    assert results == ['shared'] * 3 and len(calls) == 1
+    # Once finished, the same prompt is sent again.
+    assert gateway.call(lambda: 'fresh', tokens=10, key='same') == 'fresh'
+
+
+def test_turn_fails_with_llm_unavailable(gateway):
+    engine = CompactEngine(llm=FailingLLM(model='scripted/test', failures=100))
+    context = TurnContext(session_id='gateway-test')
+    with pytest.raises(LLMUnavailable):
+        engine.kickoff({'user_message': 'hmm is the doctor around some time soon?',
+                        'current_date': datetime.now().isoformat()}, context)
+
+
+def test_crew_turn_fails_with_llm_unavailable_without_task_retries(gateway):
+    crew = CalendarBookingCrew()
+    crew.crew()
+    llm = FailingLLM(model='scripted/test', failures=100)
+    for agent in crew.agents:
+        agent.llm = gateway_llm(llm)
+    with pytest.raises(LLMUnavailable):
+        crew.kickoff({'user_message': 'hmm is the doctor around some time soon?',
+                      'current_date': datetime.now().isoformat()}, TurnContext(session_id='gateway-test'))
+    # One call plus two retries; CrewAI's task retries stop at the gateway.
+    assert llm.calls == 3
+
+
+def test_concurrent_calls_settle_their_own_usage(gateway, monkeypatch):
+    gateway.tpm = TokenBucket(1_000_000)
+    settled = []
+    monkeypatch.setattr(gateway, 'settle', lambda estimated, actual: settled.append(actual))
+    gated = gateway_llm(ScriptedLLM(model='scripted/test'))
+    prompts = ["hello", "hello " * 400]
+    threads = [threading.Thread(target=gated.call, args=(prompt,)) for prompt in prompts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    reply = len("Thought: I now know the final answer\nFinal Answer: Here is the outcome of your request.") // 4
+    # Each call is charged for its own prompt and reply, not the LLM's shared running total.
+    assert sorted(settled) == [len(p) // 4 + reply for p in prompts]
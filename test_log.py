@@ -0,0 +1,44 @@
+"""Tests for correlation-aware logging"""
+
+import logging
+
+from src.slotbot import log
+from src.slotbot.log import CorrelationFilter, correlation, is_verbose_session
+from src.slotbot.settings import Settings
+
+
+def test_records_carry_the_turn_correlation_id():
+    record = logging.LogRecord('slotbot', logging.INFO, __file__, 1, 'hello %s', ('there',), None)
+    with correlation('session-1', 3) as value:
+        CorrelationFilter().filter(record)
+    assert value == 'session-1:3'
+    assert record.correlation_id == 'session-1:3'
+
+    CorrelationFilter().filter(record)
+    assert record.correlation_id == '-'
+
+
+def test_verbose_output_is_opt_in_per_session(monkeypatch):
+    monkeypatch.setattr(log, 'get_settings', lambda: Settings(verbose_sessions=frozenset({'debug-me'})))
+    assert is_verbose_session('debug-me')
+    assert not is_verbose_session('someone-else')
+    assert not is_verbose_session(None)
+
+    monkeypatch.setattr(log, 'get_settings', lambda: Settings(verbose_sessions=frozenset({'*'})))
+    assert is_verbose_session('anyone')
+
+
+def test_verbose_switch_reaches_crewai_console_output():
+    from crewai.events.event_listener import EventListener
+    from src.slotbot.crew import CalendarBookingCrew
+
+    crew = CalendarBookingCrew()
+    crew.crew()
+    formatter = EventListener().formatter
+    try:
+        crew._set_verbose(True)
+        assert formatter.verbose and all(a.verbose for a in crew.agents)
+        crew._set_verbose(False)
+        assert not formatter.verbose and not any(a.verbose for a in crew.agents)
+    finally:
+        crew._set_verbose(False)
@@ -0,0 +1,90 @@
+"""Tests for bounded conversation memory and carried-forward details"""
+
+from datetime import datetime
+
+from benchmarks.fakes import ScriptedLLM
+from src.slotbot import calendar_backend
+from src.slotbot import crew as crew_module
+from src.slotbot.calendar_backend import SQLiteCalendarBackend
+from src.slotbot.fast_parser import fast_parse
+from src.slotbot.memory import apply_carried_slots, history_prompt, remember_turn
+from src.slotbot.models import CarriedSlots, ConversationState, UserInputParsed
+from src.slotbot.router import route_session
+
+NOW = '2030-01-07T09:00:00'
+
+
+def test_memory_stays_bounded():
+    conversation = ConversationState()
+    parsed = UserInputParsed(intent='general_query')
+    state = route_session(parsed)
+    sizes = []
+    for n in range(50):
+        conversation = remember_turn(conversation, f"message {n} " + "x" * 2000, "reply " * 400, parsed, state)
+        sizes.append(len(history_prompt(conversation)))
+    assert len(conversation.history) == 4 and len(conversation.summary) == 8
+    assert conversation.history[-1].user.startswith("message 49") and len(conversation.history[-1].user) == 500
+    assert conversation.summary[-1].startswith('general_query -> collect_info: patient said "message 45')
+    # Once the window is full the prompt block stops growing.
+    assert max(sizes[12:]) == min(sizes[12:])
+
+
+def test_follow_up_completes_the_pending_booking():
+    first = fast_parse("I'd like to book an appointment tomorrow at 4pm", NOW).parsed
+    conversation = remember_turn(ConversationState(), "...", "Could you please provide your email address?",
+                                 first, route_session(first))
+    assert conversation.slots.pending_intent == 'book'
+
+    reply = fast_parse("it's pat@example.com", NOW, pending_intent=conversation.slots.pending_intent)
+    assert reply.is_confident and reply.parsed.intent == 'book'
+    merged = apply_carried_slots(reply.parsed, conversation)
+    assert merged.start_time == datetime(2030, 1, 8, 16) and merged.missing_info == []
+    assert route_session(merged).next_action == 'execute_operation'
+
+    # Without a pending request the same message still goes to the LLM.
+    assert not fast_parse("it's pat@example.com", NOW).is_confident
+
+
+def test_new_details_win_over_carried_ones():
+    conversation = ConversationState(slots=CarriedSlots(patient_email='old@example.com',
+                                                        start_time=datetime(2030, 1, 8, 16)))
+    parsed = UserInputParsed(intent='check_availability', temporal_expression='next week evening')
+    assert apply_carried_slots(parsed, conversation).start_time is None
+    parsed = UserInputParsed(intent='book', patient_email='new@example.com', start_time=datetime(2030, 1, 9, 10))
+    assert apply_carried_slots(parsed, conversation).patient_email == 'new@example.com'
+    assert apply_carried_slots(UserInputParsed(intent='general_query'), conversation).start_time is None
+
+
+def test_booking_across_turns_without_repeating_details(tmp_path, monkeypatch):
+    monkeypatch.setattr(calendar_backend, '_backend', SQLiteCalendarBackend(str(tmp_path / 'calendar.db')))
+    compiled = crew_module.CalendarBookingCrew()
+    for agent in compiled.crew().agents:
+        agent.llm = ScriptedLLM(model='scripted/test')
+
+    conversation = ConversationState()
+    actions = []
+    for message in ["Are you free tomorrow at 3pm?", "great, book it", "my email is pat@example.com"]:
+        context = crew_module.TurnContext(conversation=conversation, session_id='memory-test')
+        compiled.kickoff({'user_message': message, 'current_date': datetime.now().isoformat()}, context)
+        conversation = context.conversation
+        actions.append(context.session_state.next_action)
+    assert actions == ['check_availability', 'collect_info', 'execute_operation']
+    assert len(calendar_backend._backend) == 1
+    assert conversation.turns == 3 and len(conversation.history) == 3
+
+
+def test_carried_request_needs_new_details_and_ends_when_executed():
+    conversation = ConversationState(slots=CarriedSlots(pending_intent='book', start_time=datetime(2030, 1, 8, 16),
+                                                        end_time=datetime(2030, 1, 8, 17), clinician='Dr Tan'))
+    # Small talk while a booking waits for the email does not become the booking.
+    assert apply_carried_slots(UserInputParsed(intent='general_query'), conversation).intent == 'general_query'
+    merged = apply_carried_slots(UserInputParsed(intent='general_query', patient_email='pat@example.com'),
+                                 conversation)
+    assert merged.intent == 'book' and merged.start_time == datetime(2030, 1, 8, 16)
+
+    state = route_session(merged)
+    assert state.next_action == 'execute_operation'
+    conversation = remember_turn(conversation, "it's pat@example.com", "Booked.", merged, state)
+    assert conversation.slots == CarriedSlots(patient_email='pat@example.com')
+    later = apply_carried_slots(UserInputParsed(intent='book'), conversation)
+    assert later.start_time is None and later.clinician is None and later.patient_email == 'pat@example.com'
@@ -0,0 +1,67 @@
+"""Tests for the in-process metrics registry"""
+
+from src.slotbot.metrics import Counter, Histogram
+
+
+def test_histogram_renders_cumulative_buckets_per_label_set():
+    h = Histogram('stage_seconds', 'Stage latency.', ('stage',), buckets=(0.1, 1.0))
+    h.observe(0.05, stage='parse_fast')
+    h.observe(0.5, stage='parse_fast')
+    h.observe(3.0, stage='parse_fast')
+    h.observe(0.2, stage='route')
+
+    lines = h.collect()
+    assert lines[:2] == ['# HELP stage_seconds Stage latency.', '# TYPE stage_seconds histogram']
+    assert 'stage_seconds_bucket{stage="parse_fast",le="0.1"} 1' in lines
+    assert 'stage_seconds_bucket{stage="parse_fast",le="1"} 2' in lines
+    assert 'stage_seconds_bucket{stage="parse_fast",le="+Inf"} 3' in lines
+    assert 'stage_seconds_sum{stage="parse_fast"} 3.55' in lines
+    assert 'stage_seconds_count{stage="route"} 1' in lines
+    assert h.count(stage='parse_fast') == 3
+
+
+def test_counter_tracks_each_label_set_and_escapes_values():
+    c = Counter('failures_total', 'Failures.', ('model',))
+    c.inc(model='gemini')
+    c.inc(2, model='gemini')
+    c.inc(model='say "hi"')
+
+    assert c.value(model='gemini') == 3
+    assert 'failures_total{model="gemini"} 3' in c.collect()
+    assert 'failures_total{model="say \\"hi\\""} 1' in c.collect()
+
+
+def test_crewai_events_record_llm_calls(monkeypatch):
+    from crewai.events import crewai_event_bus
+    from crewai.events.types.llm_events import (LLMCallCompletedEvent, LLMCallFailedEvent, LLMCallStartedEvent,
+                                                LLMCallType)
+    from src.slotbot import metrics
+    from src.slotbot.metrics import LLM_CALL_DURATION, LLM_FAILURES, LLM_TOKENS, install_crewai_listeners
+
+    install_crewai_listeners()
+    labels = dict(task='', model='events/test')
+    calls, failures = LLM_CALL_DURATION.count(**labels, outcome='ok'), LLM_FAILURES.value(**labels)
+    prompts = LLM_TOKENS.count(**labels, kind='prompt')
+
+    started = LLMCallStartedEvent(call_id='c1', model='events/test')
+    completed = LLMCallCompletedEvent(call_id='c1', model='events/test', response='hi',
+                                      call_type=LLMCallType.LLM_CALL,
+                                      usage={'prompt_tokens': 120, 'completion_tokens': 8})
+    # Handlers run on a pool, so the completion may be seen first.
+    crewai_event_bus.emit(None, completed)
+    crewai_event_bus.emit(None, started)
+    crewai_event_bus.emit(None, LLMCallStartedEvent(call_id='c2', model='events/test'))
+    crewai_event_bus.emit(None, LLMCallFailedEvent(call_id='c2', model='events/test', error='boom'))
+    crewai_event_bus.flush()
+    assert LLM_CALL_DURATION.count(**labels, outcome='ok') == calls + 1
+    assert LLM_TOKENS.count(**labels, kind='prompt') == prompts + 1
+    assert LLM_FAILURES.value(**labels) == failures + 1
+
+    # A call that never reports its end is evicted rather than kept forever, so a late
+    # event with its id finds nothing to pair with.
+    monkeypatch.setattr(metrics, 'PENDING_EVENT_MAX_AGE', 0.0)
+    crewai_event_bus.emit(None, LLMCallStartedEvent(call_id='c3', model='events/test'))
+    crewai_event_bus.flush()
+    crewai_event_bus.emit(None, LLMCallFailedEvent(call_id='c3', model='events/test', error='late'))
+    crewai_event_bus.flush()
+    assert LLM_FAILURES.value(**labels) == failures + 1
@@ -0,0 +1,65 @@
+"""Tests for the normalized parse-result cache"""
+
+from datetime import datetime
+
+from src.slotbot import parse_cache
+from src.slotbot.models import UserInputParsed
+from src.slotbot.parse_cache import ParseCache, cache_key, normalize_message
+
+NOW = '2030-03-04T09:00:00'
+
+
+def _booking(email, hour, minutes=60):
+    start = datetime(2030, 3, 5, hour)
+    return UserInputParsed(intent='book', patient_email=email, start_time=start,
+                           end_time=start.replace(hour=hour + minutes // 60, minute=minutes % 60))
+
+
+def test_normalize_templates_emails_numbers_and_punctuation():
+    template, emails, numbers = normalize_message("Book tomorrow at 10:30am, Jo@Example.com!")
+    assert template == 'book tomorrow at <n>:<n><m> <email>'
+    assert emails == ['Jo@Example.com']
+    assert numbers == ['10', '30am']
+    assert cache_key("book tomorrow at 11:00 p.m. ann@x.org", NOW) == '2030-03-04|' + template
+
+
+def test_hit_rehydrates_email_and_time():
+    cache = ParseCache()
+    cache.put("please book tomorrow 10am for me, a@x.com", NOW, _booking('a@x.com', 10))
+
+    parsed = cache.get("Please book tomorrow 2pm for me, b@y.org", NOW)
+    assert parsed.patient_email == 'b@y.org'
+    assert parsed.start_time == datetime(2030, 3, 5, 14)
+    assert parsed.end_time == datetime(2030, 3, 5, 15)
+    assert cache.stats()['hits'] == 1
+
+
+def test_miss_on_other_day_or_unexplained_numbers():
+    cache = ParseCache()
+    cache.put("please book tomorrow 10am for me, a@x.com", NOW, _booking('a@x.com', 10))
+    assert cache.get("please book tomorrow 10am for me, a@x.com", '2030-03-05T09:00:00') is None
+
+    # The cached start time doesn't follow from the message's numbers, so it can't be moved.
+    cache.put("i'd like room 7 please", NOW, _booking(None, 16))
+    assert cache.get("i'd like room 8 please", NOW) is None
+    assert cache.stats()['misses'] == 2
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(parse_cache.time, 'time', lambda: clock[0])
+    cache = ParseCache(max_entries=1, ttl_seconds=60)
+    cache.put("hello there", NOW, UserInputParsed(intent='general_query'))
+    cache.put("what can you do", NOW, UserInputParsed(intent='general_query'))
+    assert cache.get("hello there", NOW) is None
+    assert cache.stats()['evictions'] == 1
+
+    clock[0] += 61
+    assert cache.get("what can you do", NOW) is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_sqlite_backing_survives_a_new_cache(tmp_path):
+    path = str(tmp_path / 'parse_cache.db')
+    ParseCache(db_path=path).put("hello there", NOW, UserInputParsed(intent='general_query'))
+    assert ParseCache(db_path=path).get("Hello there!", NOW).intent == 'general_query'
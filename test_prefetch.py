@@ -0,0 +1,107 @@
+"""Tests for the speculative availability prefetch that overlaps the LLM parse"""
+
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from benchmarks.fakes import Scenario, ScriptedLLM
+from src.slotbot import calendar_backend, prefetch
+from src.slotbot.calendar_backend import SQLiteCalendarBackend, appointment_event
+from src.slotbot.clinicians import Clinician
+from src.slotbot.compact import CompactEngine
+from src.slotbot.crew import TurnContext
+from src.slotbot.fast_parser import candidate_dates
+from src.slotbot.metrics import PREFETCH_OUTCOMES
+from src.slotbot.models import ConversationState, SessionState, UserInputParsed
+from src.slotbot.settings import Settings
+from src.slotbot.tools.slot_search import choose_clinician, free_clinicians
+
+VAGUE = "is the doc around tomorrow, 3pm-ish maybe?"
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    backend = SQLiteCalendarBackend(str(tmp_path / 'calendar.db'))
+    backend.lookups = []
+    free_busy_many = backend.free_busy_many
+
+    def counting(start, end, calendar_ids):
+        backend.lookups.append((start, end))
+        return free_busy_many(start, end, calendar_ids)
+
+    monkeypatch.setattr(backend, 'free_busy_many', counting)
+    monkeypatch.setattr(calendar_backend, '_backend', backend)
+    monkeypatch.setattr(prefetch, 'get_settings', lambda: Settings(prefetch_enabled=True))
+    return backend
+
+
+def test_candidate_dates():
+    assert candidate_dates("hmm, maybe tomorrow or friday? a@b.co", '2030-01-07T09:00:00') == [
+        date(2030, 1, 8), date(2030, 1, 11)]
+    assert candidate_dates("31 february please", '2030-01-07T09:00:00') == []
+    assert candidate_dates("tomorrow", 'not a date') == []
+
+
+def test_prefetch_answers_the_check_the_llm_parse_asks_for(backend):
+    tomorrow = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+    backend.insert(appointment_event(tomorrow.replace(hour=15), tomorrow.replace(hour=16), 'other@example.com'))
+    engine = CompactEngine(llm=ScriptedLLM(model='scripted/test', scenarios=[
+        Scenario(VAGUE, 'check_availability', days_ahead=1, hour=15)]))
+    used = PREFETCH_OUTCOMES.value(outcome='used')
+
+    context = TurnContext(session_id='prefetch-test')
+    reply = engine.kickoff({'user_message': VAGUE, 'current_date': datetime.now().isoformat()}, context)
+    assert context.parse_path == 'compact' and 'already taken' in reply
+    # The whole day was read once, while the LLM ran; the tool's check reused it.
+    assert len(backend.lookups) == 1 and backend.lookups[0][1] - backend.lookups[0][0] == timedelta(days=1)
+    assert PREFETCH_OUTCOMES.value(outcome='used') == used + 1
+
+
+def test_prefetch_is_dropped_when_the_parse_goes_elsewhere(backend):
+    conversation = ConversationState()
+    assert prefetch.start_prefetch("hello there", '2030-01-07T09:00:00', conversation) is None
+    assert prefetch.start_prefetch("monday or the 30th of january", '2030-01-07T09:00:00', conversation) is None
+
+    speculative = prefetch.start_prefetch("maybe tomorrow", '2030-01-07T09:00:00', conversation)
+    assert speculative.days == [date(2030, 1, 8)]
+    other_day = UserInputParsed(intent='check_availability', start_time=datetime(2030, 1, 9, 15))
+    assert not speculative.match(other_day, SessionState(identity_status='unknown',
+                                                         info_completeness_status='complete',
+                                                         missing_info=[], next_action='check_availability'))
+    with prefetch.serving(speculative):
+        slot = Clinician('default', 'the clinician', 'primary').localize(datetime(2030, 1, 8, 15))
+        assert prefetch.prefetched_busy(slot, slot + timedelta(hours=1), ['primary']) is None
+    speculative.close()
+
+
+def test_lookups_outside_the_window_go_live(backend):
+    speculative = prefetch.start_prefetch("tomorrow please", '2030-01-07T09:00:00', ConversationState())
+    clinician = Clinician('default', 'the clinician', 'primary')
+    inside = clinician.localize(datetime(2030, 1, 8, 15))
+    outside = clinician.localize(datetime(2030, 1, 9, 15))
+    assert speculative.busy(inside, inside + timedelta(hours=1), ['primary']) == {'primary': []}
+    assert speculative.busy(outside, outside + timedelta(hours=1), ['primary']) is None
+    assert speculative.busy(inside, inside + timedelta(hours=1), ['other@example.com']) is None
+    speculative.close()
+
+
+def test_booking_paths_read_live_and_a_slow_prefetch_is_not_awaited(backend, monkeypatch):
+    speculative = prefetch.start_prefetch("tomorrow please", '2030-01-07T09:00:00', ConversationState())
+    tan, lim = Clinician('tan', 'Dr Tan', 'tan@example.com'), Clinician('lim', 'Dr Lim', 'lim@example.com')
+    speculative.calendar_ids = [tan.calendar_id, lim.calendar_id]
+    speculative._future = Future()
+    speculative._future.set_result({tan.calendar_id: [], lim.calendar_id: []})
+    # Booked after the prefetch read the day: only a live lookup sees it.
+    start = tan.localize(datetime(2030, 1, 8, 15))
+    event = appointment_event(start, start + timedelta(hours=1), 'other@example.com')
+    backend.insert(event, calendar_id=tan.calendar_id)
+    with prefetch.serving(speculative):
+        assert free_clinicians([tan, lim], start, timedelta(hours=1))[0][2] is tan
+        assert free_clinicians([tan, lim], start, timedelta(hours=1), use_prefetch=False)[0][2] is lim
+        assert choose_clinician([tan, lim], [start], timedelta(hours=1)) is lim
+
+    monkeypatch.setattr(prefetch, 'PREFETCH_WAIT_SECONDS', 0.01)
+    speculative._future = Future()
+    assert speculative.busy(start, start + timedelta(hours=1), [tan.calendar_id]) is None
+    speculative.close()
@@ -0,0 +1,88 @@
+"""Tests for templated replies and the turns that skip the response LLM"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks.fakes import SCENARIOS, ScriptedLLM
+from src.slotbot import calendar_backend
+from src.slotbot import crew as crew_module
+from src.slotbot.calendar_backend import SQLiteCalendarBackend
+from src.slotbot.models import SessionState, UserInputParsed
+from src.slotbot.responses import classify_action_output, render_missing_info, render_response
+from src.slotbot.settings import Settings
+
+SGT = timezone(timedelta(hours=8))
+PARSED = UserInputParsed(intent='book', start_time=datetime(2030, 1, 8, 17), end_time=datetime(2030, 1, 8, 18))
+
+
+def _state(next_action, missing=()):
+    return SessionState(identity_status='known', info_completeness_status='complete',
+                        missing_info=list(missing), next_action=next_action)
+
+
+def test_known_outcomes_are_templated():
+    free = render_response(_state('check_availability'), PARSED, '```json\n{"status": "free"}\n```')
+    assert free == "Good news: Tuesday, 8 January at 5:00 PM is available. Would you like me to book it?"
+
+    booked = render_response(_state('execute_operation'), PARSED,
+                             "Appointment booked successfully! You can view it at: https://cal.example/e?eid=x1.")
+    assert booked.endswith("is booked. You can view it here: https://cal.example/e?eid=x1")
+    failed = classify_action_output('execute_operation', "The requested time slot is not available, "
+                                    "so nothing was booked. Status: failed", PARSED)
+    assert failed.kind == 'booking_failed'
+    assert classify_action_output('execute_operation', "This appointment was already booked; no new booking "
+                                  "was made. Booking reference: abc", PARSED).kind == 'already_booked'
+
+    slots = json.dumps({'status': 'found', 'slots': [{'start': '2030-01-08T17:00:00+08:00'},
+                                                     {'start': '2030-01-08T17:30:00+08:00'}]})
+    assert render_response(_state('search_availability'), PARSED, slots, 'ms').splitlines()[1:3] == [
+        "- Selasa, 8 Januari pukul 17:00", "- Selasa, 8 Januari pukul 17:30"]
+
+    series = json.dumps({'status': 'partial', 'appointments': [
+        {'start': '2030-01-07T10:00:00+08:00', 'status': 'booked'},
+        {'start': '2030-01-14T10:00:00+08:00', 'status': 'conflict'}]})
+    assert render_response(_state('execute_operation'), PARSED, series).startswith("I booked 1 of 2 appointments")
+
+
+def test_unrecognised_results_are_left_to_the_llm():
+    assert render_response(_state('check_availability'), PARSED, "I think the doctor might be free.") is None
+    assert render_response(_state('collect_info', ['intent']), None, None) is None
+    assert render_missing_info(['start_time', 'end_time', 'patient_email'], 'en-SG') == (
+        "Could you please provide the date and time you would like and your email address?")
+
+
+@pytest.fixture
+def scripted_crew(tmp_path, monkeypatch):
+    monkeypatch.setattr(calendar_backend, '_backend', SQLiteCalendarBackend(str(tmp_path / 'calendar.db')))
+    compiled = crew_module.CalendarBookingCrew()
+    llm = ScriptedLLM(model='scripted/test')
+    for agent in compiled.crew().agents:
+        agent.llm = llm
+    return compiled
+
+
+def _turn(compiled, message):
+    context = crew_module.TurnContext(session_id='responses-test')
+    result = compiled.kickoff({'user_message': message, 'current_date': datetime.now().isoformat()}, context)
+    return context, result.raw
+
+
+@pytest.mark.parametrize('scenario', [s for s in SCENARIOS if s.intent != 'general_query'], ids=lambda s: s.intent)
+def test_structured_turns_skip_the_response_llm(scripted_crew, scenario):
+    context, reply = _turn(scripted_crew, scenario.message)
+    assert context.response_path == 'template'
+    assert 'format_user_response' not in context.timings
+    assert context.artifacts['format_user_response']['agent'] == 'response_templates'
+    assert reply == context.artifacts['format_user_response']['output']
+
+
+def test_general_queries_use_the_llm_unless_the_fallback_is_off(scripted_crew, monkeypatch):
+    context, reply = _turn(scripted_crew, "hello there")
+    assert context.response_path == 'llm' and 'format_user_response' in context.timings
+
+    monkeypatch.setattr(crew_module, 'get_settings', lambda: Settings(response_llm_fallback=False))
+    context, reply = _turn(scripted_crew, "hello there")
+    assert context.response_path == 'template'
+    assert reply.startswith("I can check whether a time is free")
@@ -0,0 +1,37 @@
+"""Tests for the deterministic session router"""
+
+from datetime import datetime
+
+from src.slotbot.models import UserInputParsed
+from src.slotbot.router import route_session
+
+START = datetime(2025, 7, 15, 17, 0)
+END = datetime(2025, 7, 15, 18, 0)
+
+
+def test_complete_booking_executes():
+    state = route_session(UserInputParsed(intent='book', patient_email='a@b.co', start_time=START, end_time=END))
+    assert state.identity_status == 'known'
+    assert state.info_completeness_status == 'complete'
+    assert state.next_action == 'execute_operation'
+
+
+def test_booking_without_email_collects_info():
+    state = route_session(UserInputParsed(intent='book', start_time=START, end_time=END, missing_info=['patient_email']))
+    assert state.identity_status == 'unknown'
+    assert state.next_action == 'collect_info'
+    assert state.missing_info == ['patient_email']
+
+
+def test_availability_routes_on_start_time():
+    assert route_session(UserInputParsed(intent='check_availability', start_time=START)).next_action == 'check_availability'
+    assert route_session(UserInputParsed(intent='check_availability', temporal_expression='next week')).next_action == 'search_availability'
+    state = route_session(UserInputParsed(intent='check_availability'))
+    assert state.next_action == 'collect_info'
+    assert state.missing_info == ['start_time']
+
+
+def test_general_query_asks_for_intent():
+    state = route_session(UserInputParsed(intent='general_query'))
+    assert state.next_action == 'collect_info'
+    assert state.missing_info == ['intent']
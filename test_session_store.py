@@ -0,0 +1,52 @@
+"""Tests for the chat session stores"""
+
+from api import session_store
+from api.session_store import InMemorySessionStore, SQLiteSessionStore
+from src.slotbot.models import ConversationState, SessionState
+
+
+def _state(turns):
+    return ConversationState(turns=turns, last_state=SessionState(
+        identity_status='unknown', info_completeness_status='incomplete',
+        missing_info=['start_time'], next_action='collect_info'))
+
+
+def test_memory_store_round_trip_and_lru_eviction():
+    store = InMemorySessionStore(ttl_seconds=60, max_sessions=2)
+    first = store.create()
+    second = store.create()
+    store.save(first, _state(1))
+    assert store.get(first) == _state(1)
+
+    # `first` was used most recently, so creating a third session evicts `second`.
+    third = store.create()
+    assert first in store and third in store
+    assert second not in store
+    assert len(store) == 2
+
+
+def test_memory_store_expires_idle_sessions(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(session_store.time, 'monotonic', lambda: clock[0])
+    store = InMemorySessionStore(ttl_seconds=60)
+    session_id = store.create()
+    clock[0] += 59
+    assert store.get(session_id) == ConversationState()
+    clock[0] += 61
+    assert store.get(session_id) is None
+
+
+def test_sqlite_store_is_shared_and_expires(tmp_path, monkeypatch):
+    path = str(tmp_path / 'sessions.db')
+    writer = SQLiteSessionStore(path, ttl_seconds=60)
+    session_id = writer.create()
+    writer.save(session_id, _state(3))
+
+    # A second store on the same file stands in for another worker process.
+    reader = SQLiteSessionStore(path, ttl_seconds=60)
+    assert reader.get(session_id) == _state(3)
+
+    now = session_store.time.time()
+    monkeypatch.setattr(session_store.time, 'time', lambda: now + 120)
+    assert reader.get(session_id) is None
+    assert len(reader) == 0
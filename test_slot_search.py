@@ -0,0 +1,74 @@
+"""Tests for the range-based free-slot sweep"""
+
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from fastapi import HTTPException
+
+from api.routes.availability import find_free_slots as free_slots_route
+from api.schemas import FreeSlotsRequest
+from src.slotbot.tools.calendar_tools import FindFreeSlotsArgs
+from src.slotbot.tools.slot_search import MAX_SEARCH_DAYS, find_free_slots, merge_intervals
+
+SGT = timezone(timedelta(hours=8))
+HOUR = timedelta(hours=1)
+
+
+def _at(day, hour, minute=0):
+    return datetime(2030, 1, day, hour, minute, tzinfo=SGT)
+
+
+def test_merge_intervals():
+    merged = merge_intervals([(_at(1, 10), _at(1, 11)), (_at(1, 9), _at(1, 10)), (_at(1, 13), _at(1, 14))])
+    assert merged == [(_at(1, 9), _at(1, 11)), (_at(1, 13), _at(1, 14))]
+
+
+def test_sweep_skips_busy_intervals_and_respects_working_hours():
+    busy = [(_at(1, 17), _at(1, 18, 15)), (_at(1, 19), _at(1, 20))]
+    slots = find_free_slots(
+        busy, _at(1, 0), _at(3, 0), duration=HOUR, granularity=timedelta(minutes=30),
+        working_hours=(time(17), time(21)), limit=4,
+    )
+    assert slots == [
+        (_at(1, 20), _at(1, 21)),
+        (_at(2, 17), _at(2, 18)),
+        (_at(2, 17, 30), _at(2, 18, 30)),
+        (_at(2, 18), _at(2, 19)),
+    ]
+
+
+def test_busy_intervals_in_utc_align_to_local_grid():
+    busy = [(datetime(2030, 1, 1, 1, 0, tzinfo=timezone.utc), datetime(2030, 1, 1, 2, 10, tzinfo=timezone.utc))]
+    slots = find_free_slots(busy, _at(1, 9), _at(1, 12), duration=HOUR, granularity=timedelta(minutes=30), limit=1)
+    assert slots == [(_at(1, 10, 30), _at(1, 11, 30))]
+
+
+def test_weekday_filter():
+    # 2030-01-05 is a Saturday.
+    slots = find_free_slots([], _at(5, 0), _at(8, 0), duration=HOUR, granularity=HOUR,
+                            working_hours=(time(9), time(10)), weekdays=range(5))
+    assert slots == [(_at(7, 9), _at(7, 10))]
+
+
+def test_out_of_range_weekdays_are_rejected():
+    with pytest.raises(ValueError, match="weekdays"):
+        find_free_slots([], _at(5, 0), _at(8, 0), duration=HOUR, granularity=HOUR, weekdays=[7])
+    with pytest.raises(ValidationError):
+        FreeSlotsRequest(window_start=_at(5, 0), window_end=_at(8, 0), weekdays=[0, -1])
+    assert FreeSlotsRequest(window_start=_at(5, 0), window_end=_at(8, 0), weekdays=[0, 6]).weekdays == [0, 6]
+
+
+def test_non_positive_steps_and_long_windows_are_rejected():
+    for duration, granularity in [(HOUR, timedelta(0)), (-HOUR, HOUR), (HOUR, -HOUR)]:
+        with pytest.raises(ValueError, match="positive"):
+            find_free_slots([], _at(5, 0), _at(8, 0), duration=duration, granularity=granularity)
+    for field in ('duration', 'granularity', 'max_results'):
+        with pytest.raises(ValidationError):
+            FindFreeSlotsArgs(start_date='2030-01-05', end_date='2030-01-08', **{field: 0})
+
+    too_long = FreeSlotsRequest(window_start=_at(1, 0), window_end=_at(1, 0) + timedelta(days=MAX_SEARCH_DAYS + 1))
+    with pytest.raises(HTTPException) as rejected:
+        free_slots_route(too_long)
+    assert rejected.value.status_code == 422
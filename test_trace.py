@@ -0,0 +1,64 @@
+"""Tests for the background trace sinks"""
+
+import json
+import sqlite3
+import threading
+import time
+
+from src.slotbot.trace import JsonlTraceSink, SQLiteTraceSink, TraceSink, turn_records
+
+ARTIFACTS = {
+    'parse_user_input': {'agent': 'fast_parser', 'output': '{"intent": "book"}'},
+    'format_user_response': {'agent': 'Response Agent', 'output': 'Booked!'},
+}
+
+
+def test_jsonl_sink_tags_records_and_rotates(tmp_path):
+    path = tmp_path / 'traces' / 'turns.jsonl'
+    for turn in (1, 2, 3):
+        # One sink per turn so each turn is flushed as its own batch.
+        sink = JsonlTraceSink(str(path), max_bytes=1, backups=2)
+        for record in turn_records('s-1', turn, ARTIFACTS):
+            sink.record(record)
+        sink.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(r['session_id'], r['turn_id'], r['task']) for r in lines] == [
+        ('s-1', 3, task) for task in ARTIFACTS]
+    # Older turns were rotated out to numbered backups, never beyond `backups`.
+    assert json.loads((tmp_path / 'traces' / 'turns.jsonl.1').read_text().splitlines()[0])['turn_id'] == 2
+    assert (tmp_path / 'traces' / 'turns.jsonl.2').exists()
+    assert not (tmp_path / 'traces' / 'turns.jsonl.3').exists()
+
+
+def test_sqlite_sink_writes_queryable_rows(tmp_path):
+    path = tmp_path / 'traces.db'
+    sink = SQLiteTraceSink(str(path))
+    for record in turn_records('s-2', 4, ARTIFACTS):
+        sink.record(record)
+    sink.close()
+
+    rows = sqlite3.connect(str(path)).execute(
+        "SELECT task, agent, output FROM traces WHERE session_id = ? AND turn_id = ? ORDER BY task",
+        ('s-2', 4)).fetchall()
+    assert rows == [('format_user_response', 'Response Agent', 'Booked!'),
+                    ('parse_user_input', 'fast_parser', '{"intent": "book"}')]
+
+
+def test_close_does_not_hang_on_a_stuck_writer():
+    release = threading.Event()
+
+    class StuckSink(TraceSink):
+        def _write(self, batch):
+            release.wait(5)
+
+    sink = StuckSink(max_pending=1)
+    sink.record({'n': 1})
+    while not sink._queue.empty():  # the writer took the first record and is stuck writing it
+        time.sleep(0.01)
+    sink.record({'n': 2})
+    sink.record({'n': 3})
+    started = time.monotonic()
+    sink.close(timeout=0.2)
+    assert time.monotonic() - started < 1 and sink.dropped == 2
+    release.set()
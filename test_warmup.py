@@ -0,0 +1,83 @@
+"""Tests for lazy API startup, the background warm-up and the readiness/liveness probes"""
+
+import subprocess
+import sys
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import warmup as warmup_module
+from api.executor import CrewExecutor
+from api.warmup import Warmup, WarmupStep
+
+
+def test_api_import_leaves_heavy_dependencies_unloaded():
+    heavy = ('crewai', 'litellm', 'googleapiclient', 'google_auth_oauthlib')
+    out = subprocess.run(
+        [sys.executable, '-c', f"import sys, api.main; print([m for m in {heavy!r} if m in sys.modules])"],
+        capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
+
+
+def test_required_and_optional_failures():
+    def boom():
+        raise RuntimeError("no token")
+
+    ran = []
+    warmup = Warmup([WarmupStep('a', lambda: ran.append('a')), WarmupStep('calendar', boom, required=False),
+                     WarmupStep('b', lambda: ran.append('b'))])
+    warmup.run()
+    assert ran == ['a', 'b'] and warmup.ready and warmup.status()['errors'] == {'calendar': 'no token'}
+
+    warmup = Warmup([WarmupStep('pipeline', boom)])
+    warmup.run()
+    assert warmup.state == 'failed' and not warmup.ready
+
+
+def test_run_on_each_worker_runs_once_per_thread():
+    executor = CrewExecutor(max_workers=3, max_queue=0)
+    seen = []
+    executor.run_on_each_worker(lambda: seen.append(threading.get_ident()), timeout=5)
+    assert 1 <= len(seen) <= 3 and len(set(seen)) == len(seen)
+    executor.shutdown()
+
+
+def test_run_on_each_worker_does_not_wait_for_busy_workers():
+    executor = CrewExecutor(max_workers=2, max_queue=0)
+    release = threading.Event()
+    turn = executor._pool.submit(release.wait, 5)
+    executor._slots.acquire()
+    turn.add_done_callback(executor._release)
+
+    # With one worker serving a turn, warm-up takes the free slot only and returns
+    # without waiting for the busy worker.
+    warmed = []
+    executor.run_on_each_worker(lambda: warmed.append(threading.get_ident()), timeout=5)
+    assert len(warmed) == 1 and not turn.done()
+    release.set()
+    turn.result(5)
+
+    # The error from `fn` surfaces and every slot is free again afterwards.
+    def boom():
+        raise RuntimeError("no model")
+    with pytest.raises(RuntimeError, match="no model"):
+        executor.run_on_each_worker(boom, timeout=5)
+    assert all(executor._slots.acquire(blocking=False) for _ in range(2))
+    executor.shutdown()
+
+
+def test_live_before_ready(monkeypatch):
+    release = threading.Event()
+    warmup = Warmup([WarmupStep('crews', lambda: release.wait(5))])
+    monkeypatch.setattr(warmup_module, '_warmup', warmup)
+    from api.main import app
+
+    with TestClient(app) as client:
+        assert client.get('/health/live').status_code == 200
+        response = client.get('/health/ready')
+        assert response.status_code == 503 and response.json()['state'] == 'running'
+        release.set()
+        assert warmup.wait(5)
+        response = client.get('/health/ready')
+        assert response.status_code == 200 and 'crews' in response.json()['timings']